@@ -0,0 +1 @@
+"""Benchmarks for the validator hot paths"""
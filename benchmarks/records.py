@@ -0,0 +1,177 @@
+"""Synthetic records and a local DocDB stand-in for benchmarks"""
+
+import copy
+import json
+import random
+import time
+from pathlib import Path
+
+from aind_metadata_validator.mappings import CORE_FILES
+
+SAMPLE_RECORD_PATH = (
+    Path(__file__).parent.parent / "tests" / "resources" / "metadata.json"
+)
+
+VARIANTS = ["valid", "partially_invalid", "missing_core_files", "huge_lists"]
+
+# List fields that are repeated to build huge_lists records
+HUGE_LIST_FIELDS = [
+    ("acquisition", "stimulus_epochs"),
+    ("procedures", "subject_procedures"),
+]
+
+
+def load_sample_record() -> dict:
+    """Load the sample record used as the base for every variant"""
+    with open(SAMPLE_RECORD_PATH) as f:
+        return json.load(f)
+
+
+def _invalidate(record: dict, rng: random.Random) -> None:
+    """Break a few fields of a record in place"""
+    breakages = [
+        lambda r: r["data_description"].__setitem__("project_name", 5),
+        lambda r: r["subject"].__setitem__("subject_id", None),
+        lambda r: r["acquisition"].__setitem__("unexpected_field", 1),
+        lambda r: r["instrument"].__setitem__("modalities", "not a list"),
+        lambda r: r["procedures"]["subject_procedures"].append({"bad": 1}),
+    ]
+    for breakage in rng.sample(breakages, k=2):
+        breakage(record)
+
+
+def _drop_core_files(record: dict, rng: random.Random) -> None:
+    """Remove or empty a few core files of a record in place"""
+    present = [name for name in CORE_FILES if record.get(name)]
+    for core_file_name in rng.sample(present, k=min(3, len(present))):
+        if rng.random() < 0.5:
+            del record[core_file_name]
+        else:
+            record[core_file_name] = None
+
+
+def _grow_lists(record: dict, factor: int) -> None:
+    """Repeat the items of large list fields of a record in place"""
+    for core_file_name, field_name in HUGE_LIST_FIELDS:
+        items = record[core_file_name][field_name]
+        record[core_file_name][field_name] = items * factor
+
+
+def generate_records(
+    n: int,
+    variants: list = None,
+    seed: int = 0,
+    list_factor: int = 20,
+    base_record: dict = None,
+) -> list:
+    """Generate n records by mutating the sample record
+
+    Parameters
+    ----------
+    n : int
+        Number of records
+    variants : list
+        Variants to cycle through, see VARIANTS. Defaults to all of them.
+    seed : int
+        Seed for the random mutations, the same seed gives the same records
+    list_factor : int
+        How many times list fields are repeated in huge_lists records
+    base_record : dict
+        Record to mutate, defaults to the sample record
+
+    Returns
+    -------
+    list
+        Records, each with a unique _id, name and location and a
+        "_variant" key naming the variant
+    """
+    variants = variants or VARIANTS
+    base_record = base_record or load_sample_record()
+    rng = random.Random(seed)
+
+    records = []
+    for i in range(n):
+        variant = variants[i % len(variants)]
+        record = copy.deepcopy(base_record)
+        record["_id"] = f"synthetic-{seed}-{i}"
+        record["name"] = f"{base_record['name']}_synthetic_{i}"
+        record["location"] = f"s3://synthetic-bucket/{record['name']}"
+        record["_variant"] = variant
+
+        if variant == "partially_invalid":
+            _invalidate(record, rng)
+        elif variant == "missing_core_files":
+            _drop_core_files(record, rng)
+        elif variant == "huge_lists":
+            _grow_lists(record, list_factor)
+        records.append(record)
+    return records
+
+
+class FakeMetadataDbClient:
+    """Local stand-in for MetadataDbClient serving records from memory
+
+    Records are kept as JSON and decoded on every request, like the real
+    client does with responses. Supports the location $in filters, _id
+    ranges, sorting by _id, limits and the projections used by the sync,
+    and counts the requests it serves. Each request can be made to take
+    request_latency seconds, plus match_latency seconds per location in
+    a $in filter, to model the server.
+    """
+
+    def __init__(
+        self,
+        records: list,
+        request_latency: float = 0.0,
+        match_latency: float = 0.0,
+    ):
+        """Serve the given records"""
+        self.records = [json.dumps(record) for record in records]
+        self.locations = [record["location"] for record in records]
+        self.ids = [record["_id"] for record in records]
+        self.request_latency = request_latency
+        self.match_latency = match_latency
+        self.requests = 0
+
+    def _after_id(self, filter_query: dict):
+        """Get the lower _id bound of a filter, if any"""
+        for query in (filter_query or {}).get("$and", []):
+            if "_id" in query:
+                return query["_id"]["$gt"]
+        return None
+
+    def retrieve_docdb_records(
+        self,
+        filter_query: dict = None,
+        projection: dict = None,
+        sort: dict = None,
+        limit: int = 0,
+        **kwargs,
+    ) -> list:
+        """Return freshly decoded records matching the filter"""
+        self.requests += 1
+        locations = (filter_query or {}).get("location", {}).get("$in")
+        if locations is not None:
+            locations = set(locations)
+        after_id = self._after_id(filter_query)
+        time.sleep(
+            self.request_latency + self.match_latency * len(locations or ())
+        )
+
+        matches = [
+            i
+            for i, (location, _id) in enumerate(zip(self.locations, self.ids))
+            if (locations is None or location in locations)
+            and (after_id is None or _id > after_id)
+        ]
+        if sort:
+            matches.sort(key=lambda i: self.ids[i])
+        if limit:
+            matches = matches[:limit]
+        matches = [json.loads(self.records[i]) for i in matches]
+        if projection:
+            return [
+                {key: record.get(key) for key in projection}
+                for record in matches
+            ]
+        return matches
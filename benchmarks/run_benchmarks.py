@@ -0,0 +1,257 @@
+"""Benchmark the validator hot paths and write the timings as JSON
+
+Run from the repository root:
+
+    python -m benchmarks.run_benchmarks --records 8 --output bench.json
+"""
+
+import argparse
+import copy
+import json
+import logging
+import platform
+import time
+import warnings
+from datetime import datetime, timezone
+from importlib.metadata import version as package_version
+from typing import Callable
+from unittest.mock import patch
+
+from aind_metadata_validator import __version__ as validator_version
+from aind_metadata_validator import sync
+from aind_metadata_validator.core_validator import validate_core_metadata
+from aind_metadata_validator.fetch import iter_record_chunks
+from aind_metadata_validator.field_validator import (
+    FIELD_VALIDATORS,
+    validate_field,
+    validate_field_metadata,
+)
+from aind_metadata_validator.mappings import CORE_FILES, SECOND_LAYER_MAPPING
+from aind_metadata_validator.metadata_validator import validate_metadata
+from aind_metadata_validator.utils import FileRequirement
+from benchmarks.records import (
+    VARIANTS,
+    FakeMetadataDbClient,
+    generate_records,
+)
+
+
+def time_calls(
+    name: str, func: Callable, inputs: list, repeat: int = 1
+) -> dict:
+    """Time func over every input, repeat times
+
+    Returns
+    -------
+    dict
+        name, number of calls, total/mean/min seconds per call and calls
+        per second
+    """
+    timings = []
+    for _ in range(repeat):
+        for item in inputs:
+            start = time.perf_counter()
+            func(item)
+            timings.append(time.perf_counter() - start)
+    total = sum(timings)
+    return {
+        "name": name,
+        "calls": len(timings),
+        "total_s": total,
+        "mean_s": total / len(timings) if timings else 0.0,
+        "min_s": min(timings) if timings else 0.0,
+        "per_s": len(timings) / total if total else 0.0,
+    }
+
+
+def bench_validate_metadata(records: list, repeat: int) -> list:
+    """Benchmark validate_metadata per variant and engine"""
+    results = []
+    for engine in ["legacy", "single_pass"]:
+        for variant in VARIANTS:
+            # Validation can modify records in place, give each run a copy
+            inputs = copy.deepcopy(
+                [r for r in records if r["_variant"] == variant]
+            )
+            results.append(
+                time_calls(
+                    f"validate_metadata[{engine},{variant}]",
+                    lambda record: validate_metadata(record, engine=engine),
+                    inputs,
+                    repeat,
+                )
+            )
+    return results
+
+
+def bench_core_and_fields(records: list, repeat: int) -> list:
+    """Benchmark validate_core_metadata and validate_field_metadata"""
+    results = []
+    for core_file_name in CORE_FILES:
+        inputs = [
+            r[core_file_name]
+            for r in records
+            if isinstance(r.get(core_file_name), dict)
+        ]
+        results.append(
+            time_calls(
+                f"validate_core_metadata[{core_file_name}]",
+                lambda data: validate_core_metadata(
+                    core_file_name, data, FileRequirement.REQUIRED
+                ),
+                copy.deepcopy(inputs),
+                repeat,
+            )
+        )
+        results.append(
+            time_calls(
+                f"validate_field_metadata[{core_file_name}]",
+                lambda data: validate_field_metadata(core_file_name, data),
+                inputs,
+                repeat,
+            )
+        )
+    return results
+
+
+def bench_field_dispatch(repeat: int) -> list:
+    """Benchmark per-field dispatch, compiled validators vs validate_field
+
+    Every field is validated with empty data, so the timings are dominated
+    by the type dispatch rather than by pydantic.
+    """
+    fields = [
+        (core_file_name, field_name, expected_class)
+        for core_file_name, mapping in SECOND_LAYER_MAPPING.items()
+        for field_name, expected_class in mapping.items()
+    ]
+
+    def _dynamic(_):
+        """Dispatch on the type of every field"""
+        for _, _, expected_class in fields:
+            validate_field(
+                None,
+                getattr(expected_class, "__origin__", None),
+                expected_class,
+            )
+
+    def _compiled(_):
+        """Call the compiled validator of every field"""
+        for core_file_name, field_name, _ in fields:
+            FIELD_VALIDATORS[core_file_name][field_name](None)
+
+    inputs = [None] * 100
+    return [
+        time_calls("field_dispatch[validate_field]", _dynamic, inputs, repeat),
+        time_calls("field_dispatch[compiled]", _compiled, inputs, repeat),
+    ]
+
+
+def bench_build_results(records: list, repeat: int) -> list:
+    """Benchmark sync._build_results against a local fake DB client"""
+    client = FakeMetadataDbClient(records)
+    locations = [record["location"] for record in records]
+    results = []
+    for name, kwargs in [
+        ("serial", {}),
+        ("prefetch", {"prefetch_depth": 2}),
+    ]:
+        with patch.object(sync, "client", client):
+            result = time_calls(
+                f"sync._build_results[{name}]",
+                lambda _: sync._build_results(
+                    locations, {}, force=True, **kwargs
+                ),
+                [None],
+                repeat,
+            )
+        result["records"] = len(records)
+        results.append(result)
+    return results
+
+
+def bench_fetch_strategies(
+    n_records: int = 5000,
+    repeat: int = 1,
+    request_latency: float = 0.002,
+    match_latency: float = 0.00002,
+) -> list:
+    """Benchmark fetching every record with each fetch strategy
+
+    The fake DB takes request_latency seconds per request and
+    match_latency seconds per location of a $in filter. Records only hold
+    an _id and a location, so the timings are dominated by the requests.
+    """
+    records = [
+        {"_id": f"id-{i:08d}", "location": f"s3://bucket/record-{i}"}
+        for i in range(n_records)
+    ]
+    locations = [record["location"] for record in records]
+    results = []
+    for name, kwargs in [
+        ("location", {"page_size": 50, "concurrency": 1}),
+        ("location,concurrent", {"page_size": 50, "concurrency": 4}),
+        ("id_range", {"strategy": "id_range", "page_size": 500}),
+    ]:
+        client = FakeMetadataDbClient(records, request_latency, match_latency)
+        result = time_calls(
+            f"fetch[{name}]",
+            lambda _: sum(
+                len(chunk)
+                for chunk in iter_record_chunks(client, locations, **kwargs)
+            ),
+            [None],
+            repeat,
+        )
+        result["records"] = n_records
+        result["requests"] = client.requests // repeat
+        results.append(result)
+    return results
+
+
+def run_benchmarks(n_records: int = 8, repeat: int = 1, seed: int = 0):
+    """Run every benchmark and return a JSON-serializable report"""
+    records = generate_records(n_records, seed=seed)
+    results = []
+    results.extend(bench_validate_metadata(records, repeat))
+    results.extend(bench_core_and_fields(records, repeat))
+    results.extend(bench_field_dispatch(repeat))
+    results.extend(bench_build_results(records, repeat))
+    results.extend(bench_fetch_strategies(repeat=repeat))
+    return {
+        "validator_version": validator_version,
+        "aind_data_schema_version": package_version("aind-data-schema"),
+        "python_version": platform.python_version(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "records": n_records,
+        "repeat": repeat,
+        "seed": seed,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--records", help="Number of synthetic records", type=int, default=8
+    )
+    parser.add_argument(
+        "--repeat", help="Number of times to repeat", type=int, default=1
+    )
+    parser.add_argument(
+        "--seed", help="Seed for the synthetic records", type=int, default=0
+    )
+    parser.add_argument(
+        "--output", help="File to write the JSON report to", default=None
+    )
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    warnings.simplefilter("ignore")
+    report = run_benchmarks(args.records, args.repeat, args.seed)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
@@ -0,0 +1,116 @@
+"""Cached pydantic TypeAdapters used to validate data in a single call"""
+
+import inspect
+from functools import lru_cache
+from typing import Annotated, Union
+
+from pydantic import BaseModel, Field, TypeAdapter
+
+
+def is_model_class(expected_class) -> bool:
+    """Check whether a type is a pydantic model class"""
+    return inspect.isclass(expected_class) and issubclass(
+        expected_class, BaseModel
+    )
+
+
+@lru_cache(maxsize=None)
+def get_type_adapter(annotation) -> TypeAdapter:
+    """Get a TypeAdapter for an annotation, built once per annotation
+
+    Parameters
+    ----------
+    annotation : Type
+        Any type pydantic can validate, e.g. a model class, list[Model] or
+        Union[ModelA, ModelB]
+
+    Returns
+    -------
+    TypeAdapter
+    """
+    return TypeAdapter(annotation)
+
+
+class DeferredTypeAdapter:
+    """Stand-in for the TypeAdapter of an annotation, built on first use
+
+    Building a TypeAdapter generates the pydantic schema of the annotation,
+    which for the large unions of aind-data-schema takes far longer than
+    anything else done when compiling validators.
+    """
+
+    def __init__(self, annotation):
+        """Create the stand-in
+
+        Parameters
+        ----------
+        annotation : Type
+            Any type pydantic can validate, see get_type_adapter
+        """
+        self.annotation = annotation
+        self._adapter = None
+
+    @property
+    def adapter(self) -> TypeAdapter:
+        """The TypeAdapter, built the first time it is needed"""
+        if self._adapter is None:
+            self._adapter = get_type_adapter(self.annotation)
+        return self._adapter
+
+    def validate_python(self, data):
+        """Validate data with the TypeAdapter"""
+        return self.adapter.validate_python(data)
+
+
+@lru_cache(maxsize=None)
+def left_to_right_union(members: tuple):
+    """Get the annotation of a union validated left to right
+
+    pydantic's default smart mode validates data against every member to
+    pick the best match, left to right mode stops at the first member
+    that validates. Both accept the same data. The annotation is built
+    once per order of members, so that its TypeAdapter is only built once.
+
+    Parameters
+    ----------
+    members : tuple
+        Union members, in the order they are tried
+
+    Returns
+    -------
+    Type
+        Annotated union, or the only member
+    """
+    if len(members) == 1:
+        return members[0]
+    return Annotated[Union[members], Field(union_mode="left_to_right")]
+
+
+def shallow_copy(data):
+    """Copy the top level of dict data, or of each dict in list data
+
+    Some validators modify the dictionaries they are given in place,
+    copying keeps the caller's data unchanged, as expected_class(**data)
+    does.
+    """
+    if isinstance(data, dict):
+        return dict(data)
+    if isinstance(data, list):
+        return [
+            dict(item) if isinstance(item, dict) else item for item in data
+        ]
+    return data
+
+
+def validate_copy(adapter: TypeAdapter, data):
+    """Validate a shallow copy of data, see shallow_copy"""
+    return adapter.validate_python(shallow_copy(data))
+
+
+def validates(adapter: TypeAdapter, data) -> bool:
+    """Check whether data validates, without keeping the result"""
+    try:
+        validate_copy(adapter, data)
+        return True
+    except Exception:
+        return False
@@ -0,0 +1,418 @@
+"""Validate many records, in this process or in a pool of worker processes
+
+Compiled field validators and the validation cache are shared by every
+record of a batch. Importing this module does not import aind-data-schema,
+the validator is imported when the first record is validated.
+"""
+
+import math
+import multiprocessing
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    as_completed,
+    wait,
+)
+from itertools import islice
+from typing import Iterable, Iterator, Mapping, Optional
+
+from aind_metadata_validator.cache import ValidationCache
+from aind_metadata_validator.logs import events
+from aind_metadata_validator.timing import timer
+from aind_metadata_validator.utils import ValidationEngine, result_version
+
+# Validation cache of a worker process, created by its first batch
+_worker_cache = None
+# Module loaded by each worker before its first task
+_VALIDATOR_MODULE = "aind_metadata_validator.metadata_validator"
+
+
+def is_current(
+    prev: Optional[dict],
+    last_modified,
+    engine: ValidationEngine = ValidationEngine.LEGACY,
+) -> bool:
+    """Check whether a previous result is current for a record
+
+    Parameters
+    ----------
+    prev : Optional[dict]
+        Previous result of the record's location
+    last_modified : Any
+        _last_modified of the record
+    engine : ValidationEngine
+        Engine the record would be validated with, see result_version
+
+    Returns
+    -------
+    bool
+        Whether the record is unchanged and was validated by this version
+        and engine
+    """
+    return (
+        prev is not None
+        and prev.get("_last_modified") == last_modified
+        and prev.get("validator_version") == result_version(engine)
+    )
+
+
+def iter_chunks(items: Iterable, chunk_size: int) -> Iterator[list]:
+    """Group items into lists of up to chunk_size items"""
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def validate_record(
+    record: dict,
+    engine: ValidationEngine = ValidationEngine.LEGACY,
+    cache: Optional[ValidationCache] = None,
+    core_files: Optional[list] = None,
+    prev: Optional[dict] = None,
+) -> dict:
+    """Validate a record and tag the result with its location
+
+    See validate_metadata for the engine, cache and core_files. prev is
+    the previous result the states of core_files are merged into, it is
+    only used with core_files.
+    """
+    # Imported here so that importing batch does not import aind-data-schema
+    from aind_metadata_validator.metadata_validator import validate_metadata
+
+    prev = prev if core_files is not None else None
+    with timer.record(record.get("location")):
+        result = validate_metadata(
+            record, prev, engine=engine, cache=cache, core_files=core_files
+        )
+    result["location"] = record.get("location")
+    return result
+
+
+def _validate_records(
+    records: list,
+    engine: ValidationEngine,
+    core_files: Optional[list] = None,
+    prevs: Optional[list] = None,
+    timing: bool = False,
+) -> dict:
+    """Validate records in a worker process, with the worker's cache
+
+    prevs holds the previous result of each record, see validate_record.
+    With timing, the worker's timer is enabled, see timing.py.
+
+    Returns
+    -------
+    dict
+        The results of the records and the events counted and timings
+        taken while validating them, see _task_results
+    """
+    global _worker_cache
+    if _worker_cache is None:
+        _worker_cache = ValidationCache()
+    timer.enabled = timing
+    prevs = prevs or [None] * len(records)
+    results = [
+        validate_record(record, engine, _worker_cache, core_files, prev)
+        for record, prev in zip(records, prevs)
+    ]
+    return {
+        "results": results,
+        "events": events.take(),
+        "timings": timer.take(),
+    }
+
+
+def _task_results(output: dict) -> list:
+    """Merge the events and timings of a worker task into this process's
+    and return its results"""
+    events.merge(output["events"])
+    timer.merge(output["timings"])
+    return output["results"]
+
+
+def _previous(prev_map: Optional[Mapping], record: dict) -> Optional[dict]:
+    """Previous result of a record's location"""
+    return None if prev_map is None else prev_map.get(record.get("location"))
+
+
+def _reuse_current(
+    chunk: list,
+    prev_map: Optional[Mapping],
+    core_files=None,
+    engine: ValidationEngine = ValidationEngine.LEGACY,
+) -> tuple:
+    """Take the current previous results of a chunk of records
+
+    Nothing is reused with core_files, the selected core files are
+    validated again for every record.
+
+    Returns
+    -------
+    tuple
+        (results, to_validate): results holds the previous result of each
+        current record and None for the others, whose indices are in
+        to_validate
+    """
+    results = [None] * len(chunk)
+    to_validate = []
+    for i, record in enumerate(chunk):
+        prev = _previous(prev_map, record)
+        if core_files is None and is_current(
+            prev, record.get("_last_modified"), engine
+        ):
+            results[i] = prev
+        else:
+            to_validate.append(i)
+    return results, to_validate
+
+
+def _iter_in_process(
+    chunks: Iterable[list],
+    prev_map: Optional[Mapping],
+    engine: ValidationEngine,
+    cache: Optional[ValidationCache],
+    core_files: Optional[list] = None,
+) -> Iterator[list]:
+    """Validate chunks of records one after the other in this process"""
+    for chunk in chunks:
+        with timer.stage("validate"):
+            results, to_validate = _reuse_current(
+                chunk, prev_map, core_files, engine
+            )
+            for i in to_validate:
+                results[i] = validate_record(
+                    chunk[i],
+                    engine,
+                    cache,
+                    core_files,
+                    _previous(prev_map, chunk[i]),
+                )
+        yield results
+
+
+def _submit(
+    executor, chunk, prev_map, engine, workers, core_files=None
+) -> tuple:
+    """Submit the records of a chunk that need validation to the pool
+
+    The records are split into one task per worker, so that a single chunk
+    is validated by every worker.
+
+    Returns
+    -------
+    tuple
+        (results, to_validate, futures), see _reuse_current
+    """
+    results, to_validate = _reuse_current(chunk, prev_map, core_files, engine)
+    records = [chunk[i] for i in to_validate]
+    # Previous results are only sent to the workers when they are merged
+    prevs = [
+        _previous(prev_map, record) if core_files is not None else None
+        for record in records
+    ]
+    size = max(1, math.ceil(len(records) / workers))
+    futures = [
+        executor.submit(
+            _validate_records,
+            task_records,
+            engine,
+            core_files,
+            task_prevs,
+            timer.enabled,
+        )
+        for task_records, task_prevs in zip(
+            iter_chunks(records, size), iter_chunks(prevs, size)
+        )
+    ]
+    return results, to_validate, futures
+
+
+def _collect(job: tuple) -> list:
+    """Wait for the tasks of a submitted chunk and fill in its results"""
+    results, to_validate, futures = job
+    with timer.stage("validate"):
+        validated = [
+            result
+            for future in futures
+            for result in _task_results(future.result())
+        ]
+    for i, result in zip(to_validate, validated):
+        results[i] = result
+    return results
+
+
+def _init_worker() -> None:
+    """Load the validator and aind-data-schema when a worker starts"""
+    import aind_metadata_validator.metadata_validator  # noqa: F401
+
+
+def _pool_context():
+    """Multiprocessing context of the worker pool
+
+    The pool starts while fetch threads are running (see fetch.py), and a
+    child forked while a thread holds a lock (logging, urllib3, ssl) can
+    deadlock. forkserver starts the workers from a single-threaded server
+    process that has loaded the validator, spawn is used where forkserver
+    isn't available.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([_VALIDATOR_MODULE])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def _iter_in_pool(
+    chunks: Iterable[list],
+    prev_map: Optional[Mapping],
+    engine: ValidationEngine,
+    workers: int,
+    ordered: bool,
+    core_files: Optional[list] = None,
+) -> Iterator[list]:
+    """Validate chunks of records in a pool of worker processes
+
+    Up to 2 * workers tasks are pending at a time, so chunks are only
+    taken from the iterable as the workers catch up. The events counted
+    and timings taken by the workers are merged into logs.events and
+    timing.timer as their tasks complete.
+    """
+    max_pending = 2 * workers
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=_pool_context(),
+        initializer=_init_worker,
+    )
+    jobs = deque()
+    futures = set()
+    try:
+        for chunk in chunks:
+            job = _submit(
+                executor, chunk, prev_map, engine, workers, core_files
+            )
+            if ordered:
+                jobs.append(job)
+                while sum(len(pending[2]) for pending in jobs) > max_pending:
+                    yield _collect(jobs.popleft())
+                continue
+
+            results, _, job_futures = job
+            yield [result for result in results if result is not None]
+            futures.update(job_futures)
+            while len(futures) > max_pending:
+                done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield _task_results(future.result())
+
+        while jobs:
+            yield _collect(jobs.popleft())
+        for future in as_completed(futures):
+            yield _task_results(future.result())
+    finally:
+        # Drop the tasks that haven't started if the consumer stopped early
+        executor.shutdown(cancel_futures=True)
+
+
+def iter_validated_chunks(
+    chunks: Iterable[list],
+    prev_map: Optional[Mapping] = None,
+    workers: int = 1,
+    engine: ValidationEngine = ValidationEngine.LEGACY,
+    cache: Optional[ValidationCache] = None,
+    ordered: bool = True,
+    core_files: Optional[list] = None,
+) -> Iterator[list]:
+    """Validate chunks of records, reusing current previous results
+
+    Parameters
+    ----------
+    chunks : Iterable[list]
+        Lists of records, e.g. fetched from DocDB
+    prev_map : Optional[Mapping]
+        Location -> previous result. The previous result is reused for
+        records that are unchanged and were validated by this version and
+        engine.
+    workers : int
+        With more than one, records are validated in a pool of that many
+        worker processes. Each worker keeps its own validation cache.
+    engine : ValidationEngine
+        See validate_metadata
+    cache : Optional[ValidationCache]
+        Cache used for records validated in this process
+    ordered : bool
+        Yield the results of each chunk in the order of its records. If
+        False, results from the pool are yielded as they complete, in
+        lists that don't follow the chunks.
+    core_files : Optional[list]
+        Only validate these core files, see validate_metadata. Their new
+        states are merged into the previous results of prev_map.
+
+    Yields
+    ------
+    list
+        Results, tagged with the location of their record
+    """
+    engine = ValidationEngine(engine)
+    if workers > 1:
+        return _iter_in_pool(
+            chunks, prev_map, engine, workers, ordered, core_files
+        )
+    return _iter_in_process(chunks, prev_map, engine, cache, core_files)
+
+
+def validate_many(
+    records: Iterable[dict],
+    prev_map: Optional[Mapping] = None,
+    workers: int = 1,
+    chunk_size: int = 50,
+    engine: ValidationEngine = ValidationEngine.LEGACY,
+    cache: Optional[ValidationCache] = None,
+    ordered: bool = True,
+    core_files: Optional[list] = None,
+) -> Iterator[dict]:
+    """Validate records lazily, one result per record
+
+    Records are taken from the iterable chunk_size at a time, so it can be
+    a generator that fetches them. See iter_validated_chunks.
+
+    Parameters
+    ----------
+    records : Iterable[dict]
+        Records to validate
+    prev_map : Optional[Mapping]
+        Location -> previous result, reused for current records
+    workers : int
+        Number of worker processes, validate in this process with 1
+    chunk_size : int
+        Number of records taken from the iterable at a time
+    engine : ValidationEngine
+        See validate_metadata
+    cache : Optional[ValidationCache]
+        Cache shared by the records validated in this process, a new
+        cache for the batch by default
+    ordered : bool
+        Yield results in the order of the records, or as they complete
+    core_files : Optional[list]
+        Only validate these core files, see iter_validated_chunks
+
+    Yields
+    ------
+    dict
+        The result of each record, tagged with its location
+    """
+    if cache is None:
+        cache = ValidationCache()
+    for results in iter_validated_chunks(
+        iter_chunks(records, chunk_size),
+        prev_map,
+        workers,
+        engine,
+        cache,
+        ordered,
+        core_files,
+    ):
+        yield from results
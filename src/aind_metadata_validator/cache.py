@@ -0,0 +1,134 @@
+"""Content-hash cache of core file and field validation states"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from importlib.metadata import version as package_version
+from pathlib import Path
+from typing import Optional
+
+from aind_metadata_validator import __version__ as version
+from aind_metadata_validator.logs import logger
+from aind_metadata_validator.utils import MetadataState
+
+SCHEMA_VERSION = package_version("aind-data-schema")
+
+
+def content_hash(data) -> str:
+    """Hash data by its canonical JSON form
+
+    Dictionaries with the same content hash the same regardless of key
+    order.
+    """
+    canonical = json.dumps(
+        data, sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
+
+class ValidationCache:
+    """LRU cache of core file states and per-field states
+
+    Entries are keyed by (core file name, content hash, engine, validator
+    version, aind-data-schema version), so records sharing a byte-identical
+    core file (e.g. sessions on the same rig) are validated once, and
+    upgrading either package invalidates the entries.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        """Create an empty cache
+
+        Parameters
+        ----------
+        maxsize : int
+            Number of entries kept, the least recently used are evicted
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        """Number of entries"""
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(core_file_name: str, data: dict, engine: str) -> tuple:
+        """Build the cache key of a core file's data"""
+        return (
+            core_file_name,
+            content_hash(data),
+            str(engine),
+            version,
+            SCHEMA_VERSION,
+        )
+
+    def get(self, key: tuple) -> Optional[tuple]:
+        """Get the (core state, field states) of a key, None on a miss"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        core_state, field_states = entry
+        return MetadataState(core_state), {
+            field: MetadataState(state)
+            for field, state in field_states.items()
+        }
+
+    def put(
+        self, key: tuple, core_state: MetadataState, field_states: dict
+    ) -> None:
+        """Store the states of a key, evicting the oldest entry if full"""
+        self._entries[key] = (
+            int(core_state),
+            {field: int(state) for field, state in field_states.items()},
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Get the hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def save(self, path: Path) -> None:
+        """Write the entries to a JSON file, least recently used first"""
+        with open(path, "w") as f:
+            json.dump(
+                [[list(key), entry] for key, entry in self._entries.items()],
+                f,
+            )
+
+    def load(self, path: Path) -> int:
+        """Add the entries of a file written by save()
+
+        Entries from other validator or aind-data-schema versions are
+        dropped. A missing or unreadable file adds nothing.
+
+        Returns
+        -------
+        int
+            Number of entries loaded
+        """
+        try:
+            with open(path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.info("(METADATA_VALIDATOR): No cache loaded: %s", e)
+            return 0
+
+        loaded = 0
+        for key, (core_state, field_states) in entries:
+            key = tuple(key)
+            if key[3:] == (version, SCHEMA_VERSION):
+                self.put(key, core_state, field_states)
+                loaded += 1
+        return loaded
@@ -0,0 +1,177 @@
+"""Journal of the results of a sync run, used to resume a run that died"""
+
+import json
+import os
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from aind_metadata_validator import __version__ as version
+from aind_metadata_validator import mappings
+from aind_metadata_validator.mappings import ID_COLUMNS
+from aind_metadata_validator.results import encode_id, encode_state
+from aind_metadata_validator.utils import MetadataState
+
+
+class CheckpointJournal:
+    """Results of a run appended to a JSON lines file, one chunk per line
+
+    The first line holds the validator version and the identifier and
+    state columns. Each following line holds the index of a completed
+    chunk, its last location (the cursor) and its results, each a list of
+    its values in the order of the header's columns, with states as ints.
+    Lines are flushed to disk as they are written, so a run that dies
+    keeps every completed chunk.
+    """
+
+    def __init__(self, path: Path, chunks: list):
+        """Use open() or create()"""
+        self.path = Path(path)
+        self.chunks = chunks
+        self._file = open(self.path, "a")
+
+    @classmethod
+    def create(cls, path: Path) -> "CheckpointJournal":
+        """Start a new journal, replacing any previous one"""
+        header = {
+            "validator_version": version,
+            "id_columns": ID_COLUMNS,
+            "state_columns": mappings.STATE_COLUMNS,
+        }
+        with open(path, "w") as f:
+            f.write(json.dumps(header) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        return cls(path, [])
+
+    @classmethod
+    def open(cls, path: Path) -> Optional["CheckpointJournal"]:
+        """Open the journal of a previous run to resume it
+
+        A line cut short by a crash is dropped.
+
+        Returns
+        -------
+        Optional[CheckpointJournal]
+            None if there is no journal or it was written by another
+            validator version or with other columns
+        """
+        path = Path(path)
+        if not path.exists():
+            return None
+        header = None
+        chunks = []
+        valid_size = 0
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                if header is None:
+                    header = entry
+                else:
+                    # Results are read back from the file when needed
+                    chunks.append(
+                        {"chunk": entry["chunk"], "cursor": entry["cursor"]}
+                    )
+                valid_size += len(line)
+        if header is None or header.get("validator_version") != version:
+            return None
+        if header.get("id_columns") != ID_COLUMNS:
+            return None
+        if header.get("state_columns") != mappings.STATE_COLUMNS:
+            return None
+        os.truncate(path, valid_size)
+        return cls(path, chunks)
+
+    @property
+    def cursor(self) -> Optional[str]:
+        """Last location of the last completed chunk"""
+        return self.chunks[-1]["cursor"] if self.chunks else None
+
+    def append(self, results: list) -> None:
+        """Write the results of a completed chunk"""
+        entry = {
+            "chunk": len(self.chunks),
+            "cursor": results[-1].get("location") if results else None,
+            "results": [_encode(result) for result in results],
+        }
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.chunks.append(
+            {"chunk": entry["chunk"], "cursor": entry["cursor"]}
+        )
+
+    def results(self) -> Iterable[dict]:
+        """Read back the journaled results, states as MetadataState"""
+        with open(self.path) as f:
+            header = json.loads(next(f))
+            for line in f:
+                for result in json.loads(line)["results"]:
+                    yield _decode(
+                        result, header["id_columns"], header["state_columns"]
+                    )
+
+    def remaining(self, locations: Iterable) -> Iterator:
+        """Skip the locations that have a journaled result
+
+        Locations that had no record are fetched again, they return no
+        records.
+
+        Parameters
+        ----------
+        locations : Iterable
+            Locations of the run, e.g. streamed from DocDB again
+        """
+        done = {result.get("location") for result in self.results()}
+        return (location for location in locations if location not in done)
+
+    def close(self) -> None:
+        """Close the journal file"""
+        self._file.close()
+
+    def remove(self) -> None:
+        """Close and delete the journal, once the run is done"""
+        self.close()
+        self.path.unlink()
+
+    def __enter__(self):
+        """Enter the context"""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Close the journal when leaving the context"""
+        self.close()
+
+
+def _encode(result: dict) -> list:
+    """Convert a result to its values in the order of ID_COLUMNS then
+    STATE_COLUMNS, with None where it has no value, dropping other keys"""
+    return [encode_id(result.get(column)) for column in ID_COLUMNS] + [
+        encode_state(result.get(column)) for column in mappings.STATE_COLUMNS
+    ]
+
+
+def _decode(encoded: list, id_columns: list, state_columns: list) -> dict:
+    """Convert a journaled result back to a result dictionary
+
+    Parameters
+    ----------
+    encoded : list
+        Values of the result, see _encode
+    id_columns : list
+        Identifier columns of the journal's header
+    state_columns : list
+        State columns of the journal's header
+    """
+    result = {
+        column: value
+        for column, value in zip(id_columns, encoded)
+        if value is not None
+    }
+    first_state = len(id_columns)
+    for column, state in zip(state_columns, encoded[first_state:]):
+        if state is not None:
+            result[column] = MetadataState(state)
+    return result
@@ -1,11 +1,25 @@
 """Core metadata validation functions"""
 
+from aind_metadata_validator.adapters import get_type_adapter, validate_copy
+from aind_metadata_validator.logs import events
 from aind_metadata_validator.utils import MetadataState
 from aind_metadata_validator.mappings import FIRST_LAYER_MAPPING
 from aind_metadata_validator.utils import FileRequirement
 import logging
 
 
+def log_invalid_core_file(core_file_name: str, error: Exception) -> None:
+    """Count an invalid core file, logging the error the first times"""
+    events.event(
+        logging.ERROR,
+        "invalid_core_file",
+        core_file_name,
+        "(METADATA_VALIDATOR): Error validating core file %s: %s",
+        core_file_name,
+        error,
+    )
+
+
 def validate_core_metadata(
     core_file_name: str, data: dict, requirement
 ) -> MetadataState:
@@ -43,10 +57,8 @@ def validate_core_metadata(
             raise ValueError(f"Invalid requirement: {requirement}")
 
     try:
-        expected_class(**data)
+        validate_copy(get_type_adapter(expected_class), data)
         return MetadataState.VALID
     except Exception as e:
-        logging.error(
-            f"(METADATA_VALIDATOR): Error validating core file {core_file_name}: {e}"
-        )
+        log_invalid_core_file(core_file_name, e)
         return MetadataState.PRESENT
@@ -0,0 +1,632 @@
+"""Functions for fetching records from DocDB"""
+
+import asyncio
+import queue
+import threading
+import time
+from itertools import islice
+from typing import AsyncIterator, Iterable, Iterator, Optional, Union
+
+from aind_metadata_validator.logs import logger
+
+# Marks the end of the stream in the prefetch buffer
+_DONE = object()
+
+
+def _retrieve(client, retries: int, backoff: float, **query) -> list:
+    """Retrieve records, retrying failed requests with exponential
+    backoff"""
+    for attempt in range(retries + 1):
+        try:
+            return client.retrieve_docdb_records(**query)
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = backoff * 2**attempt
+            logger.warning(
+                "(METADATA_VALIDATOR): Fetching a page failed (%s), "
+                "retrying in %.1fs",
+                e,
+                delay,
+            )
+            time.sleep(delay)
+
+
+def iter_id_pages(
+    client,
+    page_size: int = 1000,
+    projection: Optional[dict] = None,
+    filter_query: Optional[dict] = None,
+    retries: int = 0,
+    backoff: float = 0.5,
+) -> Iterator[list]:
+    """Page through records in _id order
+
+    Each page is requested with an _id greater than the last _id of the
+    previous page, so the server never skips over earlier pages and pages
+    stay consistent while records are added.
+
+    Parameters
+    ----------
+    client : MetadataDbClient
+        Client used to retrieve records
+    page_size : int
+        Number of records per request
+    projection : Optional[dict]
+        Fields to return, _id is always returned
+    filter_query : Optional[dict]
+        Filter on the records, combined with the _id range
+    retries : int
+        Number of times a failed request is retried before giving up
+    backoff : float
+        Seconds waited before the first retry, doubled for each retry
+
+    Yields
+    ------
+    list
+        The records of each page
+    """
+    last_id = None
+    while True:
+        query = dict(filter_query or {})
+        if last_id is not None:
+            query = {"$and": [query, {"_id": {"$gt": last_id}}]}
+        page = _retrieve(
+            client,
+            retries,
+            backoff,
+            filter_query=query,
+            projection=projection,
+            sort={"_id": 1},
+            limit=page_size,
+        )
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        last_id = page[-1]["_id"]
+
+
+def iter_unique_locations(pages: Iterable[list]) -> Iterator[str]:
+    """Yield each location of pages of records the first time it appears
+
+    Parameters
+    ----------
+    pages : Iterable[list]
+        Pages of records with a location, see iter_id_pages
+
+    Yields
+    ------
+    str
+        Unique locations, in the order of the records
+    """
+    seen = set()
+    for page in pages:
+        for record in page:
+            location = record.get("location")
+            if location is not None and location not in seen:
+                seen.add(location)
+                yield location
+
+
+def fetch_last_modified(
+    client, page_size: int = 5000, retries: int = 0, backoff: float = 0.5
+) -> dict:
+    """Fetch the _last_modified of every record without the record contents
+
+    Records are read in pages sorted by _id, see iter_id_pages.
+
+    Parameters
+    ----------
+    client : MetadataDbClient
+        Client used to retrieve records
+    page_size : int
+        Number of records per request
+    retries : int
+        Number of times a failed request is retried before giving up
+    backoff : float
+        Seconds waited before the first retry, doubled for each retry
+
+    Returns
+    -------
+    dict
+        Location -> _last_modified. Locations shared by records with
+        different _last_modified values map to None.
+    """
+    pages = iter_id_pages(
+        client,
+        page_size,
+        projection={"_id": 1, "location": 1, "_last_modified": 1},
+        retries=retries,
+        backoff=backoff,
+    )
+    last_modified = {}
+    for page in pages:
+        for record in page:
+            location = record.get("location")
+            value = record.get("_last_modified")
+            if last_modified.get(location, value) != value:
+                value = None
+            last_modified[location] = value
+    return last_modified
+
+
+def fetch_ids_with_fields(
+    client,
+    fields: Iterable[str],
+    page_size: int = 5000,
+    retries: int = 0,
+    backoff: float = 0.5,
+) -> dict:
+    """Fetch the _id of every record that has each field, without the
+    field contents
+
+    A field set to null counts as present, as it does for field in record.
+    Each field is a pass over the records in _id pages, see iter_id_pages.
+
+    Parameters
+    ----------
+    client : MetadataDbClient
+        Client used to retrieve records
+    fields : Iterable[str]
+        Top-level fields to look for
+    page_size : int
+        Number of records per request
+    retries : int
+        Number of times a failed request is retried before giving up
+    backoff : float
+        Seconds waited before the first retry, doubled for each retry
+
+    Returns
+    -------
+    dict
+        Field -> set of the _id of the records that have it
+    """
+    ids = {}
+    for field in fields:
+        pages = iter_id_pages(
+            client,
+            page_size,
+            projection={"_id": 1},
+            filter_query={field: {"$exists": True}},
+            retries=retries,
+            backoff=backoff,
+        )
+        ids[field] = {record["_id"] for page in pages for record in page}
+    return ids
+
+
+def _put(buffer: queue.Queue, stop: threading.Event, item) -> bool:
+    """Put an item in the buffer, giving up if the consumer stopped."""
+    while not stop.is_set():
+        try:
+            buffer.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _produce(items: Iterable, buffer: queue.Queue, stop: threading.Event):
+    """Produce items into the buffer until exhausted, failed, or stopped."""
+    try:
+        for item in items:
+            if not _put(buffer, stop, (item, None)):
+                return
+    except Exception as e:
+        _put(buffer, stop, (_DONE, e))
+        return
+    _put(buffer, stop, (_DONE, None))
+
+
+def prefetch(items: Iterable, depth: int) -> Iterator:
+    """Pull items from an iterable in a background thread
+
+    Up to depth items are buffered ahead of the consumer, after which the
+    background thread blocks until the consumer catches up. Exceptions
+    raised while producing items are re-raised in the consumer.
+
+    Parameters
+    ----------
+    items : Iterable
+        Items to produce, e.g. a generator of fetched chunks
+    depth : int
+        Maximum number of items buffered ahead of the consumer
+
+    Yields
+    ------
+    Any
+        The items, in order
+    """
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=_produce, args=(items, buffer, stop), daemon=True
+    )
+    thread.start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+class AdaptiveChunkSize:
+    """Number of locations per request, adapted to the observed latency
+
+    After each request the size moves towards the number of locations
+    that would be fetched in target_seconds at the observed rate, at most
+    doubling or halving per request. Requests that return more records
+    than locations (e.g. locations shared by several records) count as
+    that many locations.
+    """
+
+    def __init__(
+        self,
+        initial: int = 50,
+        minimum: int = 1,
+        maximum: int = 500,
+        target_seconds: float = 2.0,
+    ):
+        """Start at the initial size
+
+        Parameters
+        ----------
+        initial : int
+            Size of the first requests
+        minimum : int
+            Smallest size
+        maximum : int
+            Largest size
+        target_seconds : float
+            Latency the size is adapted to
+        """
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_seconds = target_seconds
+        self.size = max(minimum, min(maximum, initial))
+
+    def update(self, locations: int, records: int, seconds: float) -> int:
+        """Adapt the size to a finished request
+
+        Parameters
+        ----------
+        locations : int
+            Number of locations requested
+        records : int
+            Number of records returned
+        seconds : float
+            Latency of the request
+
+        Returns
+        -------
+        int
+            The new size
+        """
+        requested = max(locations, records, 1)
+        if seconds > 0:
+            wanted = int(requested * self.target_seconds / seconds)
+        else:
+            wanted = 2 * self.size
+        wanted = max(self.size // 2, min(2 * self.size, wanted))
+        self.size = max(self.minimum, min(self.maximum, wanted))
+        return self.size
+
+
+async def _fetch_chunk(
+    client,
+    chunk: list,
+    retries: int,
+    backoff: float,
+    projection: Optional[dict] = None,
+) -> tuple:
+    """Fetch the records of a chunk of locations in a thread, retrying
+    failed requests with exponential backoff
+
+    Returns
+    -------
+    tuple
+        (chunk, records, seconds) where seconds is the latency of the
+        request that succeeded
+    """
+    query = {"filter_query": {"location": {"$in": chunk}}, "limit": 0}
+    if projection is not None:
+        query["projection"] = projection
+    for attempt in range(retries + 1):
+        start = time.perf_counter()
+        try:
+            records = await asyncio.to_thread(
+                client.retrieve_docdb_records, **query
+            )
+            return chunk, records, time.perf_counter() - start
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = backoff * 2**attempt
+            logger.warning(
+                "(METADATA_VALIDATOR): Fetching %d locations failed (%s), "
+                "retrying in %.1fs",
+                len(chunk),
+                e,
+                delay,
+            )
+            await asyncio.sleep(delay)
+
+
+async def aiter_location_chunks(
+    client,
+    locations: Iterable,
+    chunk_size: Union[int, AdaptiveChunkSize] = 50,
+    concurrency: int = 4,
+    retries: int = 3,
+    backoff: float = 0.5,
+    ordered: bool = True,
+    projection: Optional[dict] = None,
+) -> AsyncIterator[list]:
+    """Fetch the records for locations with concurrent requests
+
+    Up to concurrency requests run at a time, each in a thread since the
+    client is synchronous. Locations are taken from the iterable as
+    requests are started, also in a thread, so it can be a generator that
+    pages through DocDB (see iter_unique_locations).
+
+    Parameters
+    ----------
+    client : MetadataDbClient
+        Client used to retrieve records
+    locations : Iterable
+        Record locations to fetch
+    chunk_size : Union[int, AdaptiveChunkSize]
+        Number of locations per request, fixed or adapted to the latency
+    concurrency : int
+        Maximum number of requests running at a time
+    retries : int
+        Number of times a failed request is retried before giving up
+    backoff : float
+        Seconds waited before the first retry, doubled for each retry
+    ordered : bool
+        Yield chunks in the order of the locations. If False, chunks are
+        yielded as their request finishes.
+    projection : Optional[dict]
+        Fields of the records to fetch, all fields by default
+
+    Yields
+    ------
+    list
+        The records for each chunk of locations
+    """
+    if isinstance(chunk_size, int):
+        chunk_size = AdaptiveChunkSize(
+            chunk_size, minimum=chunk_size, maximum=chunk_size
+        )
+    locations = iter(locations)
+    exhausted = False
+    pending = []
+    try:
+        while not exhausted or pending:
+            while not exhausted and len(pending) < concurrency:
+                chunk = await asyncio.to_thread(
+                    list, islice(locations, chunk_size.size)
+                )
+                exhausted = len(chunk) < chunk_size.size
+                if chunk:
+                    pending.append(
+                        asyncio.create_task(
+                            _fetch_chunk(
+                                client, chunk, retries, backoff, projection
+                            )
+                        )
+                    )
+            if not pending:
+                return
+            for task in await _next_done(pending, ordered):
+                chunk, records, seconds = task.result()
+                chunk_size.update(len(chunk), len(records), seconds)
+                yield records
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _next_done(pending: list, ordered: bool) -> list:
+    """Wait for the first pending task, or for any task if not ordered,
+    and remove the finished tasks from pending, in the order they were
+    started"""
+    if ordered:
+        await asyncio.wait(pending[:1])
+        return [pending.pop(0)]
+    finished, _ = await asyncio.wait(
+        pending, return_when=asyncio.FIRST_COMPLETED
+    )
+    done = [task for task in pending if task in finished]
+    pending[:] = [task for task in pending if task not in finished]
+    return done
+
+
+def iter_concurrent_chunks(
+    client,
+    locations: Iterable,
+    chunk_size: Union[int, AdaptiveChunkSize] = 50,
+    concurrency: int = 4,
+    retries: int = 3,
+    backoff: float = 0.5,
+    ordered: bool = True,
+    projection: Optional[dict] = None,
+) -> Iterator[list]:
+    """Fetch records with concurrent requests, see aiter_location_chunks
+
+    The event loop only runs while the next chunk is awaited, but requests
+    run in threads, so they continue while the consumer works on the
+    previous chunk.
+
+    Yields
+    ------
+    list
+        The records for each chunk of locations
+    """
+    loop = asyncio.new_event_loop()
+    chunks = aiter_location_chunks(
+        client,
+        locations,
+        chunk_size,
+        concurrency,
+        retries,
+        backoff,
+        ordered,
+        projection,
+    )
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(chunks.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        loop.run_until_complete(chunks.aclose())
+        loop.run_until_complete(loop.shutdown_default_executor())
+        loop.close()
+
+
+def iter_id_range_chunks(
+    client,
+    locations: Iterable,
+    page_size: int = 500,
+    projection: Optional[dict] = None,
+    retries: int = 3,
+    backoff: float = 0.5,
+) -> Iterator[list]:
+    """Fetch the records of locations by paging through every record in
+    _id order, see iter_id_pages
+
+    Each request is a plain _id range instead of a list of locations to
+    match, so full runs take fewer and cheaper requests. Given locations
+    are read in full first to keep the records of those locations only,
+    and every page is fetched, so use the location strategy for runs
+    over a few locations. Without locations every record is kept, which
+    spares full runs listing the locations first. Pages are fetched one
+    at a time since each starts after the previous one.
+
+    Parameters
+    ----------
+    client : MetadataDbClient
+        Client used to retrieve records
+    locations : Optional[Iterable]
+        Record locations to fetch, None for every record with a location
+    page_size : int
+        Number of records per request
+    projection : Optional[dict]
+        Fields of the records to fetch, _id and location are always
+        fetched
+    retries : int
+        Number of times a failed request is retried before giving up
+    backoff : float
+        Seconds waited before the first retry, doubled for each retry
+
+    Yields
+    ------
+    list
+        The records of the locations in each page, pages without any are
+        skipped
+    """
+    if locations is not None:
+        locations = set(locations)
+    if projection is not None:
+        projection = {**projection, "_id": 1, "location": 1}
+    for page in iter_id_pages(
+        client, page_size, projection, retries=retries, backoff=backoff
+    ):
+        records = [
+            record
+            for record in page
+            if record.get("location") is not None
+            and (locations is None or record["location"] in locations)
+        ]
+        if records:
+            yield records
+
+
+def _iter_location_strategy(
+    client, locations, page_size, projection, concurrency, retries
+) -> Iterator[list]:
+    """Fetch records by lists of locations, see iter_concurrent_chunks"""
+    return iter_concurrent_chunks(
+        client,
+        locations,
+        page_size,
+        concurrency,
+        retries,
+        projection=projection,
+    )
+
+
+def _iter_id_range_strategy(
+    client, locations, page_size, projection, concurrency, retries
+) -> Iterator[list]:
+    """Fetch records by _id ranges, see iter_id_range_chunks"""
+    return iter_id_range_chunks(
+        client, locations, page_size, projection, retries
+    )
+
+
+FETCH_STRATEGIES = {
+    "location": _iter_location_strategy,
+    "id_range": _iter_id_range_strategy,
+}
+
+
+def iter_record_chunks(
+    client,
+    locations: Optional[Iterable],
+    strategy: str = "location",
+    page_size: Union[int, AdaptiveChunkSize] = 50,
+    projection: Optional[dict] = None,
+    concurrency: int = 4,
+    retries: int = 3,
+) -> Iterator[list]:
+    """Fetch the records of locations with a fetch strategy
+
+    Parameters
+    ----------
+    client : MetadataDbClient
+        Client used to retrieve records
+    locations : Optional[Iterable]
+        Record locations to fetch, None fetches every record with
+        "id_range"
+    strategy : str
+        "location" requests lists of locations concurrently (see
+        iter_concurrent_chunks), "id_range" pages through the records in
+        _id order (see iter_id_range_chunks)
+    page_size : Union[int, AdaptiveChunkSize]
+        Locations per request for "location", fixed or adapted to the
+        latency, records per request for "id_range"
+    projection : Optional[dict]
+        Fields of the records to fetch, all fields by default
+    concurrency : int
+        Maximum number of requests running at a time, for "location"
+    retries : int
+        Number of times a failed request is retried before giving up
+
+    Yields
+    ------
+    list
+        Records, in chunks
+
+    Raises
+    ------
+    ValueError
+        If the strategy is unknown, or locations are missing for
+        "location"
+    """
+    if strategy not in FETCH_STRATEGIES:
+        raise ValueError(f"Invalid fetch strategy: {strategy}")
+    if locations is None and strategy == "location":
+        raise ValueError("The location fetch strategy needs locations")
+    return FETCH_STRATEGIES[strategy](
+        client, locations, page_size, projection, concurrency, retries
+    )
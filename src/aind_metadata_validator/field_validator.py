@@ -1,11 +1,35 @@
 """Functions for validating metadata fields against expected classes and types"""
 
+from collections import Counter
 from enum import Enum
+from functools import partial
 import types
-from typing import Annotated, Optional, Union, get_args, get_origin
+from typing import (
+    Annotated,
+    Callable,
+    Iterable,
+    Literal,
+    Optional,
+    Union,
+    get_args,
+    get_origin,
+)
 import logging
+from aind_metadata_validator.adapters import (
+    DeferredTypeAdapter,
+    get_type_adapter,
+    is_model_class,
+    left_to_right_union,
+    validate_copy,
+    validates,
+)
+from aind_metadata_validator.logs import events
 from aind_metadata_validator.utils import MetadataState
-from aind_metadata_validator.mappings import SECOND_LAYER_MAPPING, EXTRA_FIELDS
+from aind_metadata_validator.mappings import (
+    EXTRA_FIELDS,
+    LazyCoreMapping,
+    SECOND_LAYER_MAPPING,
+)
 
 
 def validate_field_metadata(
@@ -38,26 +62,63 @@ def validate_field_metadata(
     if not isinstance(data, dict):
         return {field: MetadataState.MISSING for field in expected_classes}
 
+    field_validators = FIELD_VALIDATORS[core_file_name]
     out = {}
+    for field_name, field_data, _ in iter_expected_fields(
+        core_file_name, data, expected_classes
+    ):
+        out[field_name] = field_validators[field_name](field_data)
+
+    return out
+
+
+def iter_expected_fields(
+    core_file_name: str, data: dict, expected_classes: dict
+):
+    """Iterate over the fields of a core file that have an expected class
+
+    Ignored fields (see EXTRA_FIELDS) and fields that are missing from the
+    mapping are skipped. Each is logged once as an event and counted by
+    core_file.field, see logs.EventLog.
+
+    Parameters
+    ----------
+    core_file_name : str
+        Name of the core file the data belongs to
+    data : dict
+        Core file data in dictionary format
+    expected_classes : dict
+        Mapping of field names to expected classes for this core file
+
+    Yields
+    ------
+    tuple
+        (field_name, field_data, expected_class)
+    """
     for field_name, field_data in data.items():
-        if any([ignore_field in field_name for ignore_field in EXTRA_FIELDS]):
-            logging.info(f"Skipping ignored field: {field_name}")
+        if any(ignore_field in field_name for ignore_field in EXTRA_FIELDS):
+            key = f"{core_file_name}.{field_name}"
+            events.event(
+                logging.INFO,
+                "ignored_field",
+                key,
+                "Skipping ignored field: %s",
+                key,
+            )
             continue
 
         if field_name not in expected_classes:
-            logging.warning(
-                f"Field name: {field_name} is missing from the expected_classes file"
+            key = f"{core_file_name}.{field_name}"
+            events.event(
+                logging.WARNING,
+                "unknown_field",
+                key,
+                "Field name: %s is missing from the expected_classes file",
+                key,
             )
             continue
 
-        expected_class = expected_classes[field_name]
-        origin_type = getattr(expected_class, "__origin__", None)
-
-        out[field_name] = validate_field(
-            field_data, origin_type, expected_class
-        )
-
-    return out
+        yield field_name, field_data, expected_classes[field_name]
 
 
 def validate_field(field_data, origin_type, expected_class) -> MetadataState:
@@ -115,10 +176,11 @@ def validate_field_list(field_data, expected_class):
     item_type = get_args(expected_class)[0]
     origin_type = get_origin(item_type)
 
-    statuses = [
-        validate_field(item, origin_type, item_type) for item in field_data
-    ]
-    if all(status == MetadataState.VALID for status in statuses):
+    # Stops at the first item that isn't VALID
+    if all(
+        validate_field(item, origin_type, item_type) == MetadataState.VALID
+        for item in field_data
+    ):
         return MetadataState.VALID
     else:
         return MetadataState.PRESENT
@@ -132,13 +194,29 @@ def validate_field_optional(field_data, expected_class):
 
 
 def validate_field_union(field_data, expected_classes):
-    """Validate Union[type, type] fields"""
-    states = [try_instantiate(field_data, cls) for cls in expected_classes]
-    if MetadataState.VALID in states:
-        return MetadataState.VALID
-    if MetadataState.PRESENT in states:
+    """Validate Union[type, type] fields
+
+    Members are tried in order until one is VALID, see union_state.
+    """
+    return union_state(
+        try_instantiate(field_data, cls) for cls in expected_classes
+    )
+
+
+def union_state(states: Iterable[MetadataState]) -> MetadataState:
+    """Get the state of a union from the states of its members
+
+    VALID if any member is VALID, which stops the iteration, otherwise
+    PRESENT, OPTIONAL or MISSING, in that order of preference.
+    """
+    seen = set()
+    for state in states:
+        if state == MetadataState.VALID:
+            return state
+        seen.add(state)
+    if MetadataState.PRESENT in seen:
         return MetadataState.PRESENT
-    if MetadataState.OPTIONAL in states:
+    if MetadataState.OPTIONAL in seen:
         return MetadataState.OPTIONAL
     return MetadataState.MISSING
 
@@ -155,7 +233,10 @@ def try_instantiate(field_data, expected_class):
     # Special cases
     try:
         if isinstance(field_data, dict):
-            expected_class(**field_data)
+            if is_model_class(expected_class):
+                validate_copy(get_type_adapter(expected_class), field_data)
+            else:
+                expected_class(**field_data)
             return MetadataState.VALID
         elif isinstance(field_data, expected_class):
             return MetadataState.VALID
@@ -168,3 +249,412 @@ def try_instantiate(field_data, expected_class):
         return MetadataState.VALID
     except Exception:
         return MetadataState.PRESENT
+
+
+def compile_field(origin_type, expected_class) -> Callable:
+    """Build a validator for a field, resolving the type dispatch once
+
+    The returned callable takes the field data and returns the same state
+    as validate_field(field_data, origin_type, expected_class).
+
+    Parameters
+    ----------
+    origin_type : Type
+        The type of the field being validated.
+    expected_class : Type
+        The expected class/type for validation.
+
+    Returns
+    -------
+    Callable
+        Validator taking the field data and returning a MetadataState
+    """
+    try:
+        return _compile_field(origin_type, expected_class)
+    except Exception:
+        # Types that can't be resolved up front are dispatched on each call
+        return partial(
+            validate_field,
+            origin_type=origin_type,
+            expected_class=expected_class,
+        )
+
+
+def _compile_field(origin_type, expected_class) -> Callable:
+    """Build a validator following the same dispatch as validate_field"""
+    if origin_type is None:
+        return partial(try_instantiate, expected_class=expected_class)
+
+    if origin_type is Annotated:
+        tagged = TaggedModelUnion.from_annotation(expected_class)
+        expected_class = get_args(expected_class)[0]
+        validator = _compile_field(get_origin(expected_class), expected_class)
+        if tagged is not None:
+            return partial(
+                _validate_tagged_union, tagged=tagged, fallback=validator
+            )
+        return validator
+
+    if origin_type is list:
+        item_type = get_args(expected_class)[0]
+        item_validator = _compile_field(get_origin(item_type), item_type)
+        item_models = _model_members(item_type)
+        if item_models:
+            return partial(
+                _validate_model_list,
+                union=ModelUnion(item_models, many=True),
+                item_validator=item_validator,
+                tagged=TaggedModelUnion.from_annotation(item_type),
+            )
+        return partial(_validate_list_items, item_validator=item_validator)
+
+    if origin_type is Optional:
+        return partial(validate_field_optional, expected_class=expected_class)
+
+    if origin_type is Union or (
+        hasattr(types, "UnionType") and origin_type is types.UnionType
+    ):
+        union_types = get_args(expected_class)
+        empty_state = _empty_union_state(union_types)
+        union_models = _union_model_members(union_types)
+        if union_models:
+            return partial(
+                _validate_model_union,
+                union_types=union_types,
+                union=ModelUnion(union_models),
+                empty_state=empty_state,
+            )
+        return partial(
+            _validate_adaptive_union,
+            members=UnionMembers(union_types),
+            empty_state=empty_state,
+        )
+
+    return _present
+
+
+# Calls between reorderings of union members by their number of matches
+UNION_REORDER_INTERVAL = 256
+
+
+class UnionMembers:
+    """Members of a union, ordered by how often each one matched
+
+    Matches are counted with count(). Every UNION_REORDER_INTERVAL calls
+    to tick() the members are sorted by their matches, most first, so the
+    member most likely to match is tried first. Ties keep the order of
+    the union.
+    """
+
+    def __init__(self, members: tuple):
+        """Start with the members in the order of the union"""
+        self.members = tuple(members)
+        self.hits = Counter()
+        self.calls = 0
+
+    def count(self, member) -> None:
+        """Count a match of a member"""
+        self.hits[member] += 1
+
+    def tick(self) -> bool:
+        """Count a call and reorder the members if it's time to
+
+        Returns
+        -------
+        bool
+            Whether the order of the members changed
+        """
+        self.calls += 1
+        if self.calls % UNION_REORDER_INTERVAL:
+            return False
+        members = tuple(
+            sorted(self.members, key=lambda member: -self.hits[member])
+        )
+        changed = members != self.members
+        self.members = members
+        return changed
+
+
+class ModelUnion:
+    """Union of models validated in a single pydantic call
+
+    The union is validated left to right and stops at the first member
+    that validates (see left_to_right_union), with the members that
+    matched most often first (see UnionMembers). The class of each
+    validated model tells which member matched. With many, the adapter
+    validates a list of the union.
+    """
+
+    def __init__(self, models: tuple, many: bool = False):
+        """Create the union, its adapter is built on first use
+
+        Parameters
+        ----------
+        models : tuple
+            Model classes of the union
+        many : bool
+            Validate lists of the union instead of single values
+        """
+        self.members = UnionMembers(models)
+        self.many = many
+        self.adapter = self._adapter()
+
+    def _adapter(self) -> DeferredTypeAdapter:
+        """Adapter for the current order of the members"""
+        annotation = left_to_right_union(self.members.members)
+        return DeferredTypeAdapter(
+            list[annotation] if self.many else annotation
+        )
+
+    def validates(self, data) -> bool:
+        """Check whether data validates, counting the matching members"""
+        if self.members.tick():
+            self.adapter = self._adapter()
+        try:
+            validated = validate_copy(self.adapter, data)
+        except Exception:
+            return False
+        for model in validated if self.many else (validated,):
+            self.members.count(type(model))
+        return True
+
+
+class TaggedModelUnion:
+    """Discriminated union of models
+
+    Each member has a Literal discriminator field, so data whose
+    discriminator is one of the tags can only validate against the member
+    with that tag. pydantic validates such data against that member
+    directly instead of trying the members in turn.
+    """
+
+    def __init__(self, annotation, field: str, tags: set):
+        """Create the union, its adapters are built on first use
+
+        Parameters
+        ----------
+        annotation : Type
+            Annotated union with the discriminator
+        field : str
+            Discriminator field
+        tags : set
+            Discriminator values of the members
+        """
+        self.field = field
+        self.tags = tags
+        self.adapter = DeferredTypeAdapter(annotation)
+        self.list_adapter = DeferredTypeAdapter(list[annotation])
+
+    @classmethod
+    def from_annotation(cls, annotation) -> Optional["TaggedModelUnion"]:
+        """Get the discriminated union of an annotation
+
+        Returns None unless the annotation is a union of models annotated
+        with a discriminator field that is a Literal of every member.
+        """
+        if get_origin(annotation) is not Annotated:
+            return None
+        union_type, *metadata = get_args(annotation)
+        fields = [
+            info.discriminator
+            for info in metadata
+            if isinstance(getattr(info, "discriminator", None), str)
+        ]
+        models = _model_members(union_type)
+        if not fields or not models:
+            return None
+
+        tags = set()
+        for model in models:
+            info = model.model_fields.get(fields[0])
+            if info is None or get_origin(info.annotation) is not Literal:
+                return None
+            tags.update(get_args(info.annotation))
+        return cls(annotation, fields[0], tags)
+
+    def has_tag(self, field_data) -> bool:
+        """Check for model data whose discriminator is a member's tag"""
+        if not _is_model_data(field_data):
+            return False
+        tag = field_data.get(self.field)
+        return isinstance(tag, str) and tag in self.tags
+
+
+def _model_members(expected_class) -> Optional[tuple]:
+    """Get the model classes validate_field would try for expected_class
+
+    Follows validate_field's dispatch for a list item. Returns None unless
+    the data would only be validated against pydantic models.
+    """
+    origin_type = get_origin(expected_class)
+    if origin_type is Annotated:
+        return _model_members(get_args(expected_class)[0])
+    if origin_type is None:
+        return (expected_class,) if is_model_class(expected_class) else None
+    if origin_type is Union or (
+        hasattr(types, "UnionType") and origin_type is types.UnionType
+    ):
+        return _union_model_members(get_args(expected_class))
+    return None
+
+
+def _union_model_members(union_types: tuple) -> Optional[tuple]:
+    """Get the model classes of a union, None if it has other members"""
+    members = tuple(cls for cls in union_types if cls is not type(None))
+    if members and all(is_model_class(cls) for cls in members):
+        return members
+    return None
+
+
+def _is_model_data(field_data) -> bool:
+    """Check for data that try_instantiate validates as a model"""
+    return isinstance(field_data, dict) and bool(field_data)
+
+
+def _empty_union_state(union_types: tuple) -> MetadataState:
+    """State of a union for empty data, resolved when it is compiled
+
+    try_instantiate gives the same state for every empty value, OPTIONAL
+    for NoneType and MISSING for other classes, so the state of the union
+    doesn't depend on the data.
+    """
+    return union_state(try_instantiate(None, cls) for cls in union_types)
+
+
+def _validate_adaptive_union(
+    field_data, members, empty_state
+) -> MetadataState:
+    """Validate a union as validate_field_union does, trying the members
+    that were VALID most often first
+
+    Empty data gets the empty_state of the union without trying members.
+    """
+    if not field_data:
+        return empty_state
+    members.tick()
+    states = set()
+    for cls in members.members:
+        state = try_instantiate(field_data, cls)
+        if state == MetadataState.VALID:
+            members.count(cls)
+            return state
+        states.add(state)
+    return union_state(states)
+
+
+def _validate_model_union(
+    field_data, union_types, union, empty_state
+) -> MetadataState:
+    """Validate a union of models in a single pydantic call
+
+    For model data, validate_field_union returns VALID if any member
+    validates and PRESENT otherwise, which the union decides in one call.
+    Empty data gets the empty_state of the union, other data goes through
+    validate_field_union.
+    """
+    if not field_data:
+        return empty_state
+    if not _is_model_data(field_data):
+        return validate_field_union(field_data, union_types)
+    if union.validates(field_data):
+        return MetadataState.VALID
+    return MetadataState.PRESENT
+
+
+def _validate_tagged_union(field_data, tagged, fallback) -> MetadataState:
+    """Validate tagged model data against the member its tag selects,
+    other data with the fallback validator"""
+    if not tagged.has_tag(field_data):
+        return fallback(field_data)
+    if validates(tagged.adapter, field_data):
+        return MetadataState.VALID
+    return MetadataState.PRESENT
+
+
+def _validate_model_list(
+    field_data, union, item_validator, tagged=None
+) -> MetadataState:
+    """Validate a list of models in a single pydantic call
+
+    If every item is model data the whole list is validated at once, by
+    the discriminated union if every item has a tag and by the model union
+    otherwise. Other lists go through the item validator.
+    """
+    if not (
+        isinstance(field_data, list)
+        and field_data
+        and all(_is_model_data(item) for item in field_data)
+    ):
+        return _validate_list_items(field_data, item_validator)
+
+    if tagged is not None and all(tagged.has_tag(i) for i in field_data):
+        valid = validates(tagged.list_adapter, field_data)
+    else:
+        valid = union.validates(field_data)
+    return MetadataState.VALID if valid else MetadataState.PRESENT
+
+
+def _present(field_data) -> MetadataState:
+    """Validator for types that validate_field doesn't handle"""
+    return MetadataState.PRESENT
+
+
+def _validate_list_items(field_data, item_validator) -> MetadataState:
+    """Validate a list of data with a compiled item validator"""
+    if not isinstance(field_data, list):
+        return MetadataState.PRESENT
+
+    # Stops at the first item that isn't VALID
+    if all(item_validator(item) == MetadataState.VALID for item in field_data):
+        return MetadataState.VALID
+    else:
+        return MetadataState.PRESENT
+
+
+def compile_core_file_validators(expected_classes: dict) -> dict:
+    """Compile a validator for every field of a core file
+
+    Parameters
+    ----------
+    expected_classes : dict
+        Field name -> expected class, see SECOND_LAYER_MAPPING
+
+    Returns
+    -------
+    dict
+        Field name -> validator
+    """
+    return {
+        field_name: compile_field(
+            getattr(expected_class, "__origin__", None), expected_class
+        )
+        for field_name, expected_class in expected_classes.items()
+    }
+
+
+def compile_field_validators(mapping: dict) -> dict:
+    """Compile a validator for every field of every core file in a mapping
+
+    Parameters
+    ----------
+    mapping : dict
+        Core file name -> field name -> expected class, see
+        SECOND_LAYER_MAPPING
+
+    Returns
+    -------
+    dict
+        Core file name -> field name -> validator
+    """
+    return {
+        core_file_name: compile_core_file_validators(expected_classes)
+        for core_file_name, expected_classes in mapping.items()
+    }
+
+
+# Compiled per core file on first access
+FIELD_VALIDATORS = LazyCoreMapping(
+    lambda core_file_name: compile_core_file_validators(
+        SECOND_LAYER_MAPPING[core_file_name]
+    )
+)
@@ -0,0 +1,189 @@
+"""Logging for the validator: a package logger, repeated event counts and
+command line configuration"""
+
+import json
+import logging
+import os
+from collections import Counter
+from typing import Optional
+
+# Library modules log here, applications configure handlers and levels
+logger = logging.getLogger("aind_metadata_validator")
+
+
+class EventLog:
+    """Log repeated events a limited number of times and count the rest
+
+    Each event has a kind (e.g. "unknown_field") and a key (e.g. the field
+    name). The first `limit` occurrences of each (kind, key) are logged at
+    their level, later ones only at DEBUG. summary() and flush() report how
+    often each event happened, e.g. once per run. Worker processes send the
+    events counted since their last take() to the parent, which merges them
+    before flushing.
+    """
+
+    def __init__(self, limit: int = 1):
+        """Create an empty event log
+
+        Parameters
+        ----------
+        limit : int
+            Occurrences of each event logged at their own level
+        """
+        self.limit = limit
+        self.counts = Counter()
+        self.levels = {}
+        # Counts at the last take()
+        self.taken = Counter()
+
+    def event(self, level: int, kind: str, key: str, msg: str, *args):
+        """Count an event and log it unless it has been logged limit times
+
+        The message is formatted lazily with args, as in logging.log.
+        """
+        event_key = (kind, key)
+        self.counts[event_key] += 1
+        self.levels[event_key] = level
+        if self.counts[event_key] > self.limit:
+            level = logging.DEBUG
+        if logger.isEnabledFor(level):
+            logger.log(level, msg, *args, extra={"event": kind, "key": key})
+
+    def summary(self) -> list:
+        """Get the event counts, most frequent first
+
+        Returns
+        -------
+        list
+            Dictionaries with the event kind, key, level name and count
+        """
+        return self._summarize(self.counts)
+
+    def _summarize(self, counts: Counter) -> list:
+        """Summary of counts of this log's events, see summary()"""
+        return [
+            {
+                "event": kind,
+                "key": key,
+                "level": logging.getLevelName(self.levels[(kind, key)]),
+                "count": count,
+            }
+            for (kind, key), count in counts.most_common()
+        ]
+
+    def flush(self) -> list:
+        """Log one line per event with its count, then reset the counts
+
+        Returns
+        -------
+        list
+            The summary that was logged, see summary()
+        """
+        summary = self.summary()
+        for item in summary:
+            logger.log(
+                self.levels[(item["event"], item["key"])],
+                "(METADATA_VALIDATOR): %s %s, %d occurrences",
+                item["event"],
+                item["key"],
+                item["count"],
+                extra={"event": item["event"], "key": item["key"]},
+            )
+        self.reset()
+        return summary
+
+    def take(self) -> list:
+        """Get the events counted since the last take, most frequent first
+
+        Unlike flush(), nothing is logged or forgotten, so events that
+        were already logged are not logged again.
+
+        Returns
+        -------
+        list
+            Summary of the new occurrences, see summary()
+        """
+        new = self.counts - self.taken
+        self.taken = Counter(self.counts)
+        return self._summarize(new)
+
+    def merge(self, summary: list) -> None:
+        """Add the counts of a summary, e.g. taken in a worker process
+
+        Parameters
+        ----------
+        summary : list
+            Events with their kind, key, level name and count, see summary()
+        """
+        for item in summary:
+            event_key = (item["event"], item["key"])
+            self.counts[event_key] += item["count"]
+            self.levels[event_key] = logging.getLevelName(item["level"])
+
+    def reset(self) -> None:
+        """Forget all events"""
+        self.counts.clear()
+        self.levels.clear()
+        self.taken.clear()
+
+
+# Events of the current process
+events = EventLog(limit=int(os.getenv("VALIDATOR_LOG_LIMIT", "1")))
+
+
+class StructuredFormatter(logging.Formatter):
+    """Format records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Format a record as JSON, with its event and key if it has them"""
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in ("event", "key"):
+            if hasattr(record, field):
+                entry[field] = getattr(record, field)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+def configure_logging(
+    level: int = logging.INFO,
+    quiet: bool = False,
+    structured: bool = False,
+    handler: Optional[logging.Handler] = None,
+) -> logging.Handler:
+    """Configure logging for a command line run
+
+    Parameters
+    ----------
+    level : int
+        Level of the root logger
+    quiet : bool
+        Only log warnings and errors from the validator, for high
+        throughput runs. Repeated events are still counted, see EventLog.
+    structured : bool
+        Log JSON lines instead of plain text
+    handler : Optional[logging.Handler]
+        Handler to log to, a StreamHandler by default
+
+    Returns
+    -------
+    logging.Handler
+        The configured handler
+    """
+    handler = handler or logging.StreamHandler()
+    if structured:
+        handler.setFormatter(StructuredFormatter())
+    else:
+        handler.setFormatter(
+            logging.Formatter(
+                "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+            )
+        )
+    logging.basicConfig(level=level, handlers=[handler], force=True)
+    logger.setLevel(logging.WARNING if quiet else logging.NOTSET)
+    return handler
@@ -1,17 +1,15 @@
 """Mappings of metadata fields to expected classes and types for validation"""
 
-from typing import Annotated, get_args, Union, get_origin, get_type_hints
-
-from aind_data_schema.core.metadata import Metadata
-from aind_data_schema.core.acquisition import Acquisition
-from aind_data_schema.core.data_description import DataDescription
-from aind_data_schema.core.instrument import Instrument
-from aind_data_schema.core.procedures import Procedures
-from aind_data_schema.core.processing import Processing
-from aind_data_schema.core.quality_control import QualityControl
-from aind_data_schema.core.subject import Subject
-from aind_data_schema.core.model import Model
-from aind_data_schema.core.metadata import CORE_FILES
+from collections.abc import MutableMapping
+from functools import lru_cache
+from typing import (
+    Annotated,
+    Callable,
+    get_args,
+    Union,
+    get_origin,
+    get_type_hints,
+)
 
 EXTRA_FIELDS = [
     "describedBy",
@@ -23,20 +21,108 @@ EXTRA_FIELDS = [
 ]
 
 
+@lru_cache(maxsize=None)
+def get_core_files() -> list:
+    """Get the core file names, importing aind-data-schema on first use"""
+    from aind_data_schema.core.metadata import CORE_FILES
+
+    return CORE_FILES
+
+
+class LazyCoreMapping(MutableMapping):
+    """Mapping of core file names to values built on first access
+
+    Every core file name is a key, the value of a core file is only built
+    (with build(core_file_name)) the first time it is looked up. Values can
+    be replaced or added like in a dict, deleting a core file's value makes
+    it be built again on the next lookup.
+    """
+
+    def __init__(self, build: Callable):
+        """Create the mapping
+
+        Parameters
+        ----------
+        build : Callable
+            Function building the value of a core file name
+        """
+        self._build = build
+        self._values = {}
+
+    def __getitem__(self, key):
+        """Get the value of a key, building it if needed"""
+        if key not in self._values:
+            if key not in get_core_files():
+                raise KeyError(key)
+            self._values[key] = self._build(key)
+        return self._values[key]
+
+    def __setitem__(self, key, value):
+        """Set the value of a key"""
+        self._values[key] = value
+
+    def __delitem__(self, key):
+        """Drop the value of a key"""
+        del self._values[key]
+
+    def __contains__(self, key) -> bool:
+        """Check for a key without building its value"""
+        return key in self._values or key in get_core_files()
+
+    def __iter__(self):
+        """Iterate over the core file names, then any added keys"""
+        return iter(dict.fromkeys([*get_core_files(), *self._values]))
+
+    def __len__(self) -> int:
+        """Number of keys"""
+        return len(dict.fromkeys([*get_core_files(), *self._values]))
+
+    def clear(self) -> None:
+        """Drop all values, core file values are built again when used"""
+        self._values.clear()
+
+    def copy(self) -> dict:
+        """Build every value and return them as a dict"""
+        return dict(self.items())
+
+
+def get_first_layer_class(core_file_name: str):
+    """Get the class of a core file from the Metadata annotations"""
+    from aind_data_schema.core.metadata import Metadata
+
+    field_type = Metadata.__annotations__[core_file_name]
+
+    # If the type is Union it's because it was set as Optional[Class],
+    # so we grab just the class and drop the None
+    if getattr(field_type, "__origin__") is Union:
+        field_type = get_args(field_type)[0]
+
+    return field_type
+
+
 def gen_first_layer_mapping():
     """Generate a mapping of the first layer of metadata models"""
+    from aind_data_schema.core.metadata import Metadata
+
     mapping = {}
-    for field_name, field_type in Metadata.__annotations__.items():
+    for field_name in Metadata.__annotations__.keys():
 
-        if field_name in CORE_FILES:
+        if field_name in get_core_files():
+            mapping[field_name] = get_first_layer_class(field_name)
 
-            # If the type is Union it's because it was set as Optional[Class],
-            # so we grab just the class and drop the None
-            if getattr(field_type, "__origin__") is Union:
-                field_type = get_args(field_type)[0]
+    return mapping
 
-            mapping[field_name] = field_type
 
+def get_second_layer_fields(model_class) -> dict:
+    """Get the expected class of each field of a metadata core class"""
+    mapping = {}
+    for field_name, field_type in get_type_hints(
+        model_class, include_extras=True
+    ).items():
+        if field_name in EXTRA_FIELDS:
+            continue
+
+        mapping[field_name] = unwrap_annotated(field_type)
     return mapping
 
 
@@ -51,16 +137,9 @@ def gen_second_layer_mapping(model_class_list):
     mappings = {}
 
     for model_class in model_class_list:
-        mapping = {}
-        for field_name, field_type in get_type_hints(
-            model_class, include_extras=True
-        ).items():
-            if field_name in EXTRA_FIELDS:
-                continue
-
-            mapping[field_name] = unwrap_annotated(field_type)
-
-        mappings[model_class.default_filename().replace(".json", "")] = mapping
+        mappings[model_class.default_filename().replace(".json", "")] = (
+            get_second_layer_fields(model_class)
+        )
 
     return mappings
 
@@ -72,17 +151,56 @@ def unwrap_annotated(field_type):
     return field_type
 
 
-FIRST_LAYER_MAPPING = gen_first_layer_mapping()
+# Built per core file on first access, so that importing this module does
+# not import aind-data-schema
+FIRST_LAYER_MAPPING = LazyCoreMapping(get_first_layer_class)
 
-SECOND_LAYER_MAPPING = gen_second_layer_mapping(
-    [
-        Acquisition,
-        DataDescription,
-        Instrument,
-        Procedures,
-        Processing,
-        QualityControl,
-        Subject,
-        Model,
-    ]
+SECOND_LAYER_MAPPING = LazyCoreMapping(
+    lambda core_file_name: get_second_layer_fields(
+        FIRST_LAYER_MAPPING[core_file_name]
+    )
 )
+
+
+def gen_state_columns() -> list:
+    """Generate the result columns holding validation states
+
+    In the order validate_metadata adds them: metadata, core files, then
+    core_file.field for the fields of each core file.
+    """
+    core_files = get_core_files()
+    columns = ["metadata"] + list(core_files)
+    for core_file_name in core_files:
+        columns.extend(
+            f"{core_file_name}.{field_name}"
+            for field_name in SECOND_LAYER_MAPPING[core_file_name]
+        )
+    return columns
+
+
+def gen_result_columns() -> list:
+    """Generate all result columns, the state columns between the ids"""
+    return (
+        ["_id"]
+        + gen_state_columns()
+        + ["_last_modified", "validator_version", "location"]
+    )
+
+
+# Result columns holding record identifiers rather than validation states
+ID_COLUMNS = ["_id", "_last_modified", "validator_version", "location"]
+
+# Module attributes computed on first access, see __getattr__
+_LAZY_ATTRIBUTES = {
+    "CORE_FILES": get_core_files,
+    "STATE_COLUMNS": gen_state_columns,
+    "RESULT_COLUMNS": gen_result_columns,
+}
+
+
+def __getattr__(name: str):
+    """Compute CORE_FILES, STATE_COLUMNS and RESULT_COLUMNS on first access"""
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = globals()[name] = _LAZY_ATTRIBUTES[name]()
+    return value
@@ -1,89 +1,410 @@
 """Main module for metadata validation"""
 
-from aind_metadata_validator import __version__ as version
-from aind_metadata_validator.core_validator import validate_core_metadata
-from aind_metadata_validator.field_validator import validate_field_metadata
+from aind_metadata_validator.cache import ValidationCache
+from aind_metadata_validator.core_validator import (
+    log_invalid_core_file,
+    validate_core_metadata,
+)
+from aind_metadata_validator.logs import events, logger
+from aind_metadata_validator.timing import timer
+from aind_metadata_validator.field_validator import (
+    FIELD_VALIDATORS,
+    iter_expected_fields,
+    validate_field_metadata,
+)
 from aind_data_schema.core.metadata import Metadata
 from aind_metadata_validator.mappings import CORE_FILES
 from aind_data_schema.core.metadata import REQUIRED_FILE_SETS
 from aind_metadata_validator.utils import (
     MetadataState,
     FileRequirement,
+    ValidationEngine,
+    result_version,
 )
-from aind_metadata_validator.mappings import SECOND_LAYER_MAPPING
+from aind_metadata_validator.mappings import (
+    FIRST_LAYER_MAPPING,
+    SECOND_LAYER_MAPPING,
+)
+from pydantic import ValidationError
+from pydantic_core import from_json
 import logging
-from typing import Optional
+from typing import Iterable, Optional, Union
+
+# State given to a missing or empty core file (and its fields)
+REQUIREMENT_STATES = {
+    FileRequirement.REQUIRED: MetadataState.MISSING,
+    FileRequirement.OPTIONAL: MetadataState.OPTIONAL,
+}
+
+
+# Requirements of a record that has none of the REQUIRED_FILE_SETS fields
+DEFAULT_FILE_REQUIREMENTS = {
+    core_file_name: FileRequirement.OPTIONAL for core_file_name in CORE_FILES
+}
+
+
+def select_core_files(core_files: Iterable[str]) -> list:
+    """Check a selection of core files and put it in CORE_FILES order
+
+    Raises
+    ------
+    ValueError
+        If a name is not a core file
+    """
+    core_files = set(core_files)
+    unknown = core_files - set(CORE_FILES)
+    if unknown:
+        raise ValueError(f"Unknown core files: {sorted(unknown)}")
+    return [name for name in CORE_FILES if name in core_files]
+
+
+def core_file_projection(core_files: Iterable[str]) -> dict:
+    """Projection of the fields needed to validate a selection of core files
+
+    The core files that make others required are not fetched unless they
+    are selected, only whether a record has them matters, see
+    requirement_files.
+    """
+    fields = ["_id", "name", "location", "_last_modified"]
+    fields.extend(select_core_files(core_files))
+    return {field: 1 for field in fields}
+
+
+def requirement_files(core_files: Iterable[str]) -> list:
+    """Core files that make others required (see REQUIRED_FILE_SETS) and
+    are not in a selection of core files
+
+    Data validated with core_files must have these keys when the record
+    has them, with any value, to determine the file requirements.
+    """
+    selected = select_core_files(core_files)
+    return [name for name in REQUIRED_FILE_SETS if name not in selected]
 
 
 def _get_file_requirements(data: dict) -> dict:
     """Determine file requirements based on modalities present in data."""
-    file_requirements = {
-        core_file_name: FileRequirement.OPTIONAL
-        for core_file_name in CORE_FILES
-    }
-    for field in data.keys():
-        if field in REQUIRED_FILE_SETS.keys():
-            for core_file_name in REQUIRED_FILE_SETS[field]:
+    file_requirements = dict(DEFAULT_FILE_REQUIREMENTS)
+    for field, core_file_names in REQUIRED_FILE_SETS.items():
+        if field in data:
+            for core_file_name in core_file_names:
                 file_requirements[core_file_name] = FileRequirement.REQUIRED
     return file_requirements
 
 
 def _validate_core_files(
-    data: dict, results: dict, file_requirements: dict
+    data: dict,
+    results: dict,
+    file_requirements: dict,
+    cached: Optional[dict] = None,
+    core_file_names: Optional[list] = None,
 ) -> None:
-    """Populate results with per-core-file validation states."""
-    for core_file_name in CORE_FILES:
-        logging.info(
-            f"(METADATA_VALIDATOR): Core file: {core_file_name} is {file_requirements[core_file_name].value}"
+    """Populate results with per-core-file validation states.
+
+    Core files in cached (core file name -> (core state, field states))
+    take their state from there instead of being validated. Only
+    core_file_names are validated if given.
+    """
+    cached = cached or {}
+    for core_file_name in core_file_names or CORE_FILES:
+        logger.debug(
+            "(METADATA_VALIDATOR): Core file: %s is %s",
+            core_file_name,
+            file_requirements[core_file_name].value,
         )
-        if core_file_name in data:
-            results[core_file_name] = validate_core_metadata(
-                core_file_name,
-                data[core_file_name],
-                file_requirements[core_file_name],
-            )
+        if core_file_name in cached:
+            results[core_file_name] = cached[core_file_name][0]
+        elif core_file_name in data:
+            with timer.stage("core", core_file_name):
+                results[core_file_name] = validate_core_metadata(
+                    core_file_name,
+                    data[core_file_name],
+                    file_requirements[core_file_name],
+                )
         elif file_requirements[core_file_name] == FileRequirement.REQUIRED:
             results[core_file_name] = MetadataState.MISSING
         elif file_requirements[core_file_name] == FileRequirement.OPTIONAL:
             results[core_file_name] = MetadataState.OPTIONAL
         else:
-            logging.error(
-                f"(METADATA_VALIDATOR): Unknown file requirement for {core_file_name}"
+            logger.error(
+                "(METADATA_VALIDATOR): Unknown file requirement for %s",
+                core_file_name,
             )
 
 
 def _validate_fields(
-    data: dict, results: dict, file_requirements: dict
+    data: dict,
+    results: dict,
+    file_requirements: dict,
+    cached: Optional[dict] = None,
+    core_file_names: Optional[list] = None,
 ) -> None:
-    """Populate results with per-field validation states for each core file."""
-    for core_file_name in CORE_FILES:
-        logging.info(
-            f"(METADATA_VALIDATOR): Field checks for: {core_file_name}"
+    """Populate results with per-field validation states for each core file.
+
+    Core files in cached take their field states from there, see
+    _validate_core_files.
+    """
+    cached = cached or {}
+    for core_file_name in core_file_names or CORE_FILES:
+        logger.debug(
+            "(METADATA_VALIDATOR): Field checks for: %s", core_file_name
         )
         if core_file_name not in data:
             continue
 
         expected_fields = SECOND_LAYER_MAPPING[core_file_name]
-        if data[core_file_name]:
-            field_results = validate_field_metadata(
-                core_file_name, data[core_file_name]
-            )
+        if core_file_name in cached:
+            field_results = cached[core_file_name][1]
+        elif data[core_file_name]:
+            with timer.stage("fields", core_file_name):
+                field_results = validate_field_metadata(
+                    core_file_name, data[core_file_name]
+                )
         else:
             requirement = file_requirements[core_file_name]
-            state_map = {
-                FileRequirement.REQUIRED: MetadataState.MISSING,
-                FileRequirement.OPTIONAL: MetadataState.OPTIONAL,
-            }
             field_results = {
-                field: state_map[requirement] for field in expected_fields
+                field: REQUIREMENT_STATES[requirement]
+                for field in expected_fields
             }
 
         for field_name, field_state in field_results.items():
             results[f"{core_file_name}.{field_name}"] = field_state
 
 
+def _parse_core_file(core_file_name: str, core_data: dict):
+    """Validate a core file once against its expected class.
+
+    Returns the model (constructed without validation if the data is
+    invalid, as Metadata does) and the pydantic error locations. The error
+    locations are None if validation failed with a non-pydantic error.
+    """
+    expected_class = FIRST_LAYER_MAPPING[core_file_name]
+    try:
+        return expected_class.model_validate(dict(core_data)), []
+    except ValidationError as e:
+        log_invalid_core_file(core_file_name, e)
+        error_locs = [error["loc"] for error in e.errors()]
+    except Exception as e:
+        log_invalid_core_file(core_file_name, e)
+        return None, None
+
+    return expected_class.model_construct(**core_data), error_locs
+
+
+def _field_states_from_errors(
+    core_file_name: str, core_data: dict, error_locs: list
+) -> dict:
+    """Derive per-field states from the error locations of a core file.
+
+    Fields with data are VALID unless a pydantic error points into them, in
+    which case they are PRESENT. Empty fields are resolved by the compiled
+    field validators, which never instantiate a class for empty data.
+    """
+    invalid_fields = {loc[0] for loc in error_locs if loc}
+    field_validators = FIELD_VALIDATORS[core_file_name]
+    field_results = {}
+    for field_name, field_data, _ in iter_expected_fields(
+        core_file_name, core_data, SECOND_LAYER_MAPPING[core_file_name]
+    ):
+        if not field_data:
+            field_results[field_name] = field_validators[field_name](
+                field_data
+            )
+        elif field_name in invalid_fields:
+            field_results[field_name] = MetadataState.PRESENT
+        else:
+            field_results[field_name] = MetadataState.VALID
+    return field_results
+
+
+def _validate_single_pass(
+    data: dict,
+    file_requirements: dict,
+    cached: Optional[dict] = None,
+    core_file_names: Optional[list] = None,
+) -> tuple:
+    """Validate each core file once and derive core and field states.
+
+    Core files in cached take their states from there, see
+    _validate_core_files. They are left as dictionaries in metadata_input.
+    Only core_file_names are validated if given.
+
+    Returns
+    -------
+    tuple
+        (core_results, field_results, metadata_input) where metadata_input
+        is a copy of data with each parsed core file replaced by its model,
+        so that Metadata validation does not validate it again.
+    """
+    cached = cached or {}
+    core_results = {}
+    field_results = {}
+    metadata_input = dict(data)
+    for core_file_name in core_file_names or CORE_FILES:
+        core_data = data.get(core_file_name)
+        expected_fields = SECOND_LAYER_MAPPING[core_file_name]
+
+        if core_file_name in cached:
+            core_results[core_file_name], core_field_results = cached[
+                core_file_name
+            ]
+        elif not core_data:
+            state = REQUIREMENT_STATES[file_requirements[core_file_name]]
+            core_results[core_file_name] = state
+            if core_file_name in data:
+                core_field_results = {
+                    field: state for field in expected_fields
+                }
+            else:
+                core_field_results = {}
+        elif not isinstance(core_data, dict):
+            core_results[core_file_name] = MetadataState.PRESENT
+            core_field_results = validate_field_metadata(
+                core_file_name, core_data
+            )
+        else:
+            with timer.stage("core", core_file_name):
+                model, error_locs = _parse_core_file(core_file_name, core_data)
+            if model is not None:
+                metadata_input[core_file_name] = model
+
+            if error_locs is None:
+                # No error locations to work from, check each field instead
+                core_results[core_file_name] = MetadataState.PRESENT
+                core_field_results = validate_field_metadata(
+                    core_file_name, core_data
+                )
+            else:
+                core_results[core_file_name] = (
+                    MetadataState.PRESENT
+                    if error_locs
+                    else MetadataState.VALID
+                )
+                core_field_results = _field_states_from_errors(
+                    core_file_name, core_data, error_locs
+                )
+
+        for field_name, field_state in core_field_results.items():
+            field_results[f"{core_file_name}.{field_name}"] = field_state
+
+    return core_results, field_results, metadata_input
+
+
+def _lookup_cache(
+    data: dict,
+    cache: ValidationCache,
+    engine,
+    core_file_names: Optional[list] = None,
+) -> tuple:
+    """Look up the cached states of each non-empty core file of a record,
+    or of core_file_names if given.
+
+    Returns
+    -------
+    tuple
+        (cached, keys) where cached maps core file names to the cached
+        (core state, field states) and keys maps every cacheable core file
+        name to its cache key
+    """
+    cached = {}
+    keys = {}
+    for core_file_name in core_file_names or CORE_FILES:
+        core_data = data.get(core_file_name)
+        if not core_data or not isinstance(core_data, dict):
+            continue
+        key = cache.make_key(core_file_name, core_data, engine)
+        keys[core_file_name] = key
+        entry = cache.get(key)
+        if entry is not None:
+            cached[core_file_name] = entry
+    return cached, keys
+
+
+def _store_cache(
+    cache: ValidationCache, keys: dict, cached: dict, results: dict
+) -> None:
+    """Store the states of the core files that were not cached yet."""
+    for core_file_name, key in keys.items():
+        if core_file_name in cached:
+            continue
+        prefix = f"{core_file_name}."
+        field_states = {
+            column.split(".", 1)[1]: state
+            for column, state in results.items()
+            if column.startswith(prefix)
+        }
+        cache.put(key, results[core_file_name], field_states)
+
+
+def _validate_full_metadata(data: dict, results: dict) -> None:
+    """Populate results with the state of the full Metadata model."""
+    logger.debug("(METADATA_VALIDATOR): Full metadata")
+    try:
+        with timer.stage("metadata"):
+            metadata = Metadata.model_validate(data)
+        if metadata:
+            results["metadata"] = MetadataState.VALID
+    except Exception as e:
+        events.event(
+            logging.ERROR,
+            "invalid_metadata",
+            "metadata",
+            "(METADATA_VALIDATOR): Error validating metadata: %s",
+            e,
+        )
+        results["metadata"] = MetadataState.PRESENT
+
+
+def _is_current(
+    prev_validation: Optional[dict], data: dict, engine: ValidationEngine
+) -> bool:
+    """Check whether previous results are for this record, version and
+    engine, see result_version"""
+    return (
+        bool(prev_validation)
+        and "validator_version" in prev_validation
+        and prev_validation["validator_version"] == result_version(engine)
+        and prev_validation["_last_modified"] == data["_last_modified"]
+    )
+
+
+def _previous_states(
+    prev_validation: Optional[dict], core_file_names: list
+) -> dict:
+    """Take the previous results of the core files that are not selected
+
+    The states of the selected core files and their fields are dropped,
+    they are replaced by the new states.
+    """
+    selected = tuple(core_file_names)
+    prefixes = tuple(f"{name}." for name in core_file_names)
+    return {
+        column: value
+        for column, value in (prev_validation or {}).items()
+        if column not in selected and not column.startswith(prefixes)
+    }
+
+
+def _merged_last_modified(
+    prev_validation: Optional[dict], data: dict, engine: ValidationEngine
+):
+    """_last_modified of results merged into previous results
+
+    The states of the core files that were not validated are only up to
+    date if the previous results are current for the record, version and
+    engine. Otherwise _last_modified is cleared, so that the next full run
+    validates the record again.
+    """
+    if _is_current(prev_validation, data, engine):
+        return data["_last_modified"]
+    return None
+
+
 def validate_metadata(
-    data: dict, prev_validation: Optional[dict] = None
+    data: dict,
+    prev_validation: Optional[dict] = None,
+    engine: ValidationEngine = ValidationEngine.LEGACY,
+    cache: Optional[ValidationCache] = None,
+    core_files: Optional[Iterable[str]] = None,
 ) -> dict:
     """Validate metadata
 
@@ -91,47 +412,149 @@ def validate_metadata(
     ----------
     data : dict
         Data in dictionary format
+    prev_validation : Optional[dict]
+        Previous results for this record, returned as-is if the record,
+        validator version and engine are unchanged
+    engine : ValidationEngine
+        LEGACY validates the full metadata, every core file and every field
+        separately. SINGLE_PASS validates each core file once and derives
+        the field states from the pydantic error locations. The two engines
+        agree on core file states, SINGLE_PASS reports fields that validate
+        as part of their core file as VALID where LEGACY's per-field checks
+        can fall back to PRESENT (e.g. dates and lists of strings). The
+        engine is part of the validator_version of the results, see
+        result_version.
+    cache : Optional[ValidationCache]
+        Cache of core file and field states by content
+    core_files : Optional[Iterable[str]]
+        Only validate these core files and their fields, e.g. after a
+        schema change in one core file. data only needs the fields of
+        core_file_projection and the keys of requirement_files. The new
+        states are merged into prev_validation, which is not returned
+        as-is, and the full metadata is not validated, its previous state
+        is kept. _last_modified is cleared unless prev_validation is
+        current, so that the next full run validates the record again.
 
     Returns
     -------
     dict
         Returns a dictionary with the results of the validation
-    """
-    logging.basicConfig(
-        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-    )
 
-    if prev_validation and "validator_version" in prev_validation:
-        if (
-            prev_validation["validator_version"] == version
-            and prev_validation["_last_modified"] == data["_last_modified"]
-        ):
-            logging.info(
-                f"(METADATA_VALIDATOR): Skipping validation for _id {data['_id']}"
-                f"name {data['name']} as it has already been validated"
-            )
-            return prev_validation
+    Raises
+    ------
+    ValueError
+        If core_files holds names that are not core files
+    """
+    if core_files is None and _is_current(prev_validation, data, engine):
+        logger.debug(
+            "(METADATA_VALIDATOR): Skipping validation for _id %s name %s "
+            "as it has already been validated",
+            data["_id"],
+            data["name"],
+        )
+        return prev_validation
 
-    logging.info(
-        f"(METADATA_VALIDATOR): Running for _id {data['_id']} name {data['name']}"
+    logger.debug(
+        "(METADATA_VALIDATOR): Running for _id %s name %s",
+        data["_id"],
+        data["name"],
     )
 
-    results = {"_id": data["_id"]}
+    core_file_names = CORE_FILES
+    results = {}
+    if core_files is not None:
+        core_file_names = select_core_files(core_files)
+        results = _previous_states(prev_validation, core_file_names)
+    results["_id"] = data["_id"]
     file_requirements = _get_file_requirements(data)
+    engine = ValidationEngine(engine)
+    cached, cache_keys = (
+        _lookup_cache(data, cache, engine, core_file_names)
+        if cache is not None
+        else ({}, {})
+    )
 
-    logging.info("(METADATA_VALIDATOR): Full metadata")
-    try:
-        metadata = Metadata.model_validate(data)
-        if metadata:
-            results["metadata"] = MetadataState.VALID
-    except Exception as e:
-        logging.error(f"(METADATA_VALIDATOR): Error validating metadata: {e}")
-        results["metadata"] = MetadataState.PRESENT
+    if engine == ValidationEngine.SINGLE_PASS:
+        core_results, field_results, metadata_input = _validate_single_pass(
+            data, file_requirements, cached, core_file_names
+        )
+        if core_files is None:
+            _validate_full_metadata(metadata_input, results)
+        results.update(core_results)
+        results.update(field_results)
+    else:
+        if core_files is None:
+            _validate_full_metadata(data, results)
+        _validate_core_files(
+            data, results, file_requirements, cached, core_file_names
+        )
+        _validate_fields(
+            data, results, file_requirements, cached, core_file_names
+        )
 
-    _validate_core_files(data, results, file_requirements)
-    _validate_fields(data, results, file_requirements)
+    if cache is not None:
+        _store_cache(cache, cache_keys, cached, results)
 
-    results["_last_modified"] = data["_last_modified"]
-    results["validator_version"] = version
+    results["_last_modified"] = (
+        data["_last_modified"]
+        if core_files is None
+        else _merged_last_modified(prev_validation, data, engine)
+    )
+    results["validator_version"] = result_version(engine)
 
     return results
+
+
+def validate_metadata_json(
+    raw: Union[bytes, str],
+    prev_validation: Optional[dict] = None,
+    engine: ValidationEngine = ValidationEngine.LEGACY,
+    cache: Optional[ValidationCache] = None,
+    core_files: Optional[Iterable[str]] = None,
+) -> dict:
+    """Validate metadata from a raw JSON document
+
+    The document is decoded with pydantic-core's JSON parser and then
+    validated as in validate_metadata.
+
+    Parameters
+    ----------
+    raw : Union[bytes, str]
+        JSON document of a single record
+    prev_validation : Optional[dict]
+        See validate_metadata
+    engine : ValidationEngine
+        See validate_metadata
+    cache : Optional[ValidationCache]
+        See validate_metadata
+    core_files : Optional[Iterable[str]]
+        See validate_metadata
+
+    Returns
+    -------
+    dict
+        Returns a dictionary with the results of the validation, metadata
+        and every core file are CORRUPT if the document can't be decoded
+        into a JSON object
+    """
+    try:
+        with timer.stage("decode"):
+            data = from_json(raw)
+    except ValueError as e:
+        events.event(
+            logging.ERROR,
+            "corrupt_record",
+            "metadata",
+            "(METADATA_VALIDATOR): Error decoding metadata: %s",
+            e,
+        )
+        data = None
+
+    if not isinstance(data, dict):
+        results = {"metadata": MetadataState.CORRUPT}
+        for core_file_name in CORE_FILES:
+            results[core_file_name] = MetadataState.CORRUPT
+        results["validator_version"] = result_version(engine)
+        return results
+
+    return validate_metadata(data, prev_validation, engine, cache, core_files)
@@ -0,0 +1,209 @@
+"""Push validation results to the results table only when they changed"""
+
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+from biodata_cache import registry
+
+from aind_metadata_validator import mappings
+from aind_metadata_validator.logs import logger
+from aind_metadata_validator.mappings import ID_COLUMNS
+
+# Columns read back to verify a push, a small projection of the table
+VERIFY_COLUMNS = ["location", "_last_modified", "validator_version"]
+
+
+def normalize_results(df: pd.DataFrame) -> pd.DataFrame:
+    """Bring results to RESULT_COLUMNS with canonical dtypes
+
+    Identifier columns become strings and state columns nullable Int8, so
+    the same results hash the same whether they come from result
+    dictionaries, a CSV or a Parquet file. Missing columns are added as
+    missing values.
+    """
+    df = df.reindex(columns=mappings.RESULT_COLUMNS)
+    normalized = {}
+    for column in mappings.RESULT_COLUMNS:
+        if column in ID_COLUMNS:
+            normalized[column] = df[column].astype("string")
+        else:
+            normalized[column] = pd.to_numeric(
+                df[column].astype(object), errors="coerce"
+            ).astype("Int8")
+    return pd.DataFrame(normalized)
+
+
+def row_checksums(
+    df: pd.DataFrame, columns: Optional[list] = None
+) -> pd.Series:
+    """Hash each row of a results table
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Results, one row per location
+    columns : Optional[list]
+        Columns included in the hash, all RESULT_COLUMNS by default
+
+    Returns
+    -------
+    pd.Series
+        uint64 row hashes indexed by location
+    """
+    normalized = normalize_results(df)
+    checksums = pd.util.hash_pandas_object(
+        normalized[columns or mappings.RESULT_COLUMNS], index=False
+    )
+    checksums.index = normalized["location"]
+    return checksums
+
+
+def table_checksum(checksums: pd.Series) -> int:
+    """Combine row checksums into one checksum independent of row order"""
+    return int(checksums.to_numpy(dtype=np.uint64).sum(dtype=np.uint64))
+
+
+def diff_results(prev_checksums: pd.Series, checksums: pd.Series) -> dict:
+    """Find the locations that were inserted, updated or deleted
+
+    Parameters
+    ----------
+    prev_checksums : pd.Series
+        Row checksums of the previous snapshot, see row_checksums
+    checksums : pd.Series
+        Row checksums of the new results
+
+    Returns
+    -------
+    dict
+        "inserted", "updated" and "deleted" lists of locations
+    """
+    prev = prev_checksums[~prev_checksums.index.duplicated(keep="last")]
+    new = checksums[~checksums.index.duplicated(keep="last")]
+    common = new.index.intersection(prev.index)
+    changed = new[common] != prev[common]
+    return {
+        "inserted": new.index.difference(prev.index).tolist(),
+        "updated": common[changed.to_numpy()].tolist(),
+        "deleted": prev.index.difference(new.index).tolist(),
+    }
+
+
+def snapshot_checksums(results: Iterable[dict]) -> pd.Series:
+    """Row checksums of a previous snapshot held as result dictionaries"""
+    return row_checksums(pd.DataFrame(list(results)))
+
+
+def _read_projection(backend, table_name: str) -> pd.DataFrame:
+    """Read the VERIFY_COLUMNS of a table, the whole table if the backend
+    can't read projections."""
+    try:
+        return backend.read_filtered(
+            table_name, columns=VERIFY_COLUMNS, limit=None
+        )
+    except NotImplementedError:
+        return backend.read(table_name).reindex(columns=VERIFY_COLUMNS)
+
+
+def verify_push(table_name: str, df: pd.DataFrame, backend=None) -> bool:
+    """Check that a table holds the given results
+
+    Only VERIFY_COLUMNS are read back, the row count and a checksum of
+    those columns are compared.
+
+    Parameters
+    ----------
+    table_name : str
+        Results table
+    df : pd.DataFrame
+        Results that were pushed
+    backend : Optional[Backend]
+        biodata_cache backend, the configured backend by default
+
+    Returns
+    -------
+    bool
+        Whether the table matches
+    """
+    backend = backend or registry.BACKEND
+    try:
+        stored = _read_projection(backend, table_name)
+    except Exception as e:
+        logger.error(
+            "(METADATA VALIDATOR) Error reading from table %s: %s",
+            table_name,
+            e,
+        )
+        return False
+    if len(stored) != len(df):
+        logger.error(
+            "(METADATA VALIDATOR) Mismatch in number of rows between input "
+            "and output: %d vs %d",
+            len(df),
+            len(stored),
+        )
+        return False
+
+    expected = table_checksum(row_checksums(df, VERIFY_COLUMNS))
+    actual = table_checksum(row_checksums(stored, VERIFY_COLUMNS))
+    if expected != actual:
+        logger.error(
+            "(METADATA VALIDATOR) Checksum mismatch between input and output"
+        )
+        return False
+    return True
+
+
+def push_delta(
+    table_name: str,
+    df: pd.DataFrame,
+    prev_checksums: pd.Series,
+    backend=None,
+) -> dict:
+    """Push results only if they differ from the previous snapshot
+
+    The backend stores each table as a single object, so when anything
+    changed the table is written in full. When nothing was inserted,
+    updated or deleted, the table is only verified, and written if it
+    doesn't match (e.g. after an earlier failed push).
+
+    Parameters
+    ----------
+    table_name : str
+        Results table
+    df : pd.DataFrame
+        New results
+    prev_checksums : pd.Series
+        Row checksums of the previous snapshot, see row_checksums
+    backend : Optional[Backend]
+        biodata_cache backend, the configured backend by default
+
+    Returns
+    -------
+    dict
+        The delta (see diff_results), with "pushed" and "verified" flags
+    """
+    backend = backend or registry.BACKEND
+    delta = diff_results(prev_checksums, row_checksums(df))
+    logger.info(
+        "(METADATA VALIDATOR) %d inserted, %d updated, %d deleted",
+        len(delta["inserted"]),
+        len(delta["updated"]),
+        len(delta["deleted"]),
+    )
+    if not any(delta.values()):
+        if verify_push(table_name, df, backend):
+            logger.info("(METADATA VALIDATOR) No changes, skipping push")
+            return {**delta, "pushed": False, "verified": True}
+        logger.info(
+            "(METADATA VALIDATOR) Table differs from the previous snapshot, "
+            "pushing"
+        )
+
+    backend.write(table_name, df)
+    return {
+        **delta,
+        "pushed": True,
+        "verified": verify_push(table_name, df, backend),
+    }
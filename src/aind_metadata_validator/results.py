@@ -0,0 +1,153 @@
+"""Compact storage for validation results"""
+
+import math
+from enum import Enum
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from aind_metadata_validator import mappings
+from aind_metadata_validator.mappings import ID_COLUMNS
+from aind_metadata_validator.utils import MetadataState
+
+# Stored for columns that have no state, MetadataState values are -3..2
+NO_STATE = np.iinfo(np.int8).min
+
+
+def _is_missing(value) -> bool:
+    """Check for values that should be stored as missing"""
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def encode_state(value):
+    """Encode a state as a plain int, None if it is missing"""
+    if _is_missing(value):
+        return None
+    if isinstance(value, Enum):
+        return int(value.value)
+    return int(value)
+
+
+def encode_id(value):
+    """Encode an identifier as a string, None if it is missing"""
+    if _is_missing(value):
+        return None
+    return str(value)
+
+
+class ResultTable:
+    """Validation results stored as one int8 row per record
+
+    States are held in a (records x STATE_COLUMNS) int8 array, with
+    NO_STATE where a record has no state for a column. The identifier
+    columns (ID_COLUMNS) are held as lists of strings. Keys of a result
+    dictionary that are not result columns are dropped.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        """Create an empty table
+
+        Parameters
+        ----------
+        capacity : int
+            Number of rows to allocate up front, grown as needed
+        """
+        self.column_index = {
+            column: i for i, column in enumerate(mappings.STATE_COLUMNS)
+        }
+        self._states = np.full(
+            (max(capacity, 1), len(mappings.STATE_COLUMNS)),
+            NO_STATE,
+            dtype=np.int8,
+        )
+        self._ids = {column: [] for column in ID_COLUMNS}
+        self._length = 0
+
+    @classmethod
+    def from_results(cls, results: Iterable[dict]) -> "ResultTable":
+        """Build a table from result dictionaries"""
+        if not isinstance(results, list):
+            results = list(results)
+        table = cls(capacity=len(results))
+        table.extend(results)
+        return table
+
+    def __len__(self) -> int:
+        """Number of records"""
+        return self._length
+
+    @property
+    def states(self) -> np.ndarray:
+        """The (records x STATE_COLUMNS) int8 state array"""
+        return self._states[: self._length]
+
+    def append(self, result: dict) -> None:
+        """Append a result dictionary as a row"""
+        if self._length == len(self._states):
+            grown = np.full_like(self._states, NO_STATE)
+            self._states = np.concatenate([self._states, grown])
+
+        row = self._states[self._length]
+        for key, value in result.items():
+            i = self.column_index.get(key)
+            if i is not None:
+                state = encode_state(value)
+                if state is not None:
+                    row[i] = state
+
+        for column in ID_COLUMNS:
+            self._ids[column].append(encode_id(result.get(column)))
+        self._length += 1
+
+    def extend(self, results: Iterable[dict]) -> None:
+        """Append result dictionaries as rows"""
+        for result in results:
+            self.append(result)
+
+    def to_dict(self, i: int) -> dict:
+        """Convert row i back to a result dictionary
+
+        Columns without a value are left out, states are MetadataState.
+        """
+        result = {}
+        for column in ID_COLUMNS:
+            value = self._ids[column][i]
+            if value is not None:
+                result[column] = value
+        for column, state in zip(
+            mappings.STATE_COLUMNS, self._states[i].tolist()
+        ):
+            if state != NO_STATE:
+                result[column] = MetadataState(state)
+        return result
+
+    def to_dicts(self) -> list:
+        """Convert all rows back to result dictionaries"""
+        return [self.to_dict(i) for i in range(self._length)]
+
+    def state_values(self, column: str) -> tuple:
+        """Get a state column as (int8 values, missing mask) arrays"""
+        values = self.states[:, self.column_index[column]].copy()
+        return values, values == NO_STATE
+
+    def state_column(self, column: str) -> pd.arrays.IntegerArray:
+        """Get a state column as a nullable Int8 array"""
+        return pd.arrays.IntegerArray(*self.state_values(column))
+
+    def id_column(self, column: str) -> list:
+        """Get an identifier column as a list of strings (or None)"""
+        return self._ids[column]
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Convert to a DataFrame with RESULT_COLUMNS
+
+        State columns use the nullable Int8 dtype, so missing states are NA.
+        """
+        data = {}
+        for column in mappings.RESULT_COLUMNS:
+            if column in self.column_index:
+                data[column] = self.state_column(column)
+            else:
+                data[column] = pd.array(self._ids[column], dtype=object)
+        return pd.DataFrame(data)
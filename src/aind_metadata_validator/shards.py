@@ -0,0 +1,185 @@
+"""Split a sync run into shards of locations and merge their results
+
+Each shard validates the locations whose stable hash falls in it and
+writes a partial results file with a manifest next to it. The merge step
+checks that every shard is there exactly once and combines the partials
+into the final table.
+"""
+
+import json
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, Iterator, List
+
+import pandas as pd
+
+from aind_metadata_validator import __version__ as version
+from aind_metadata_validator.sinks import read_results
+
+
+def shard_of(location: str, num_shards: int) -> int:
+    """Get the shard of a location
+
+    Uses CRC-32 of the location, which unlike hash() is the same in every
+    process and on every node.
+    """
+    return zlib.crc32(str(location).encode("utf-8")) % num_shards
+
+
+def select_shard(locations: Iterable, shard: int, num_shards: int) -> Iterator:
+    """Keep the locations of a shard, lazily
+
+    Raises
+    ------
+    ValueError
+        If shard is not in [0, num_shards)
+    """
+    if not 0 <= shard < num_shards:
+        raise ValueError(f"Invalid shard {shard} of {num_shards} shards")
+    return (
+        location
+        for location in locations
+        if shard_of(location, num_shards) == shard
+    )
+
+
+def shard_name(shard: int, num_shards: int) -> str:
+    """Suffix of the files written by a shard"""
+    return f"shard-{shard}-of-{num_shards}"
+
+
+def write_manifest(
+    results_path: Path,
+    shard: int,
+    num_shards: int,
+    rows: int,
+    output_format: str = "csv",
+) -> Path:
+    """Describe a partial results file in a manifest next to it
+
+    Parameters
+    ----------
+    results_path : Path
+        Partial results file written by the shard
+    shard : int
+        Index of the shard
+    num_shards : int
+        Number of shards of the run
+    rows : int
+        Number of rows in the results file
+    output_format : str
+        Format of the results file, "csv" or "parquet"
+
+    Returns
+    -------
+    Path
+        The manifest file
+    """
+    results_path = Path(results_path)
+    manifest_path = results_path.with_name(
+        f"{results_path.stem}.manifest.json"
+    )
+    manifest = {
+        "shard": shard,
+        "num_shards": num_shards,
+        "validator_version": version,
+        "results": results_path.name,
+        "output_format": output_format,
+        "rows": rows,
+    }
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest_path
+
+
+def find_manifests(folder: Path) -> List[Path]:
+    """Find the shard manifests in a folder and its subfolders, e.g. the
+    results of several capsules attached to the merging capsule"""
+    return sorted(Path(folder).rglob("*.manifest.json"))
+
+
+def _check_manifests(manifests: list) -> None:
+    """Check that the manifests cover every shard exactly once
+
+    Raises
+    ------
+    ValueError
+        If there are no manifests, the shards disagree on the number of
+        shards or the validator version, or shards are missing or
+        duplicated
+    """
+    if not manifests:
+        raise ValueError("No shard manifests found")
+    num_shards = {manifest["num_shards"] for manifest in manifests}
+    if len(num_shards) > 1:
+        raise ValueError(
+            f"Shards disagree on the number of shards: {num_shards}"
+        )
+    versions = {manifest["validator_version"] for manifest in manifests}
+    if len(versions) > 1:
+        raise ValueError(
+            f"Shards ran different validator versions: {versions}"
+        )
+
+    counts = Counter(manifest["shard"] for manifest in manifests)
+    duplicated = sorted(shard for shard, count in counts.items() if count > 1)
+    missing = sorted(set(range(num_shards.pop())) - set(counts))
+    if duplicated or missing:
+        raise ValueError(
+            f"Missing shards: {missing}, duplicated shards: {duplicated}"
+        )
+
+
+def merge_shards(manifest_paths: Iterable[Path]) -> pd.DataFrame:
+    """Combine the partial results of every shard of a run
+
+    Parameters
+    ----------
+    manifest_paths : Iterable[Path]
+        Manifests written by write_manifest, see find_manifests
+
+    Returns
+    -------
+    pd.DataFrame
+        The results of all shards, ordered by shard
+
+    Raises
+    ------
+    ValueError
+        If shards are missing or duplicated (see _check_manifests), a
+        partial does not have the rows of its manifest, or a location is
+        in more than one shard. Several records of a location in the same
+        shard are kept.
+    """
+    manifests = []
+    for path in manifest_paths:
+        with open(path) as f:
+            manifest = json.load(f)
+        manifest["path"] = Path(path).with_name(manifest["results"])
+        manifests.append(manifest)
+    _check_manifests(manifests)
+
+    partials = []
+    shards = []
+    for manifest in sorted(manifests, key=lambda item: item["shard"]):
+        df = read_results(manifest["path"], manifest["output_format"])
+        if len(df) != manifest["rows"]:
+            raise ValueError(
+                f"Shard {manifest['shard']} has {len(df)} rows, its "
+                f"manifest lists {manifest['rows']}"
+            )
+        partials.append(df)
+        shards.append(pd.Series(manifest["shard"], index=df.index))
+    df = pd.concat(partials, ignore_index=True)
+
+    # A location can have several records, but they are all in its shard
+    shards = pd.concat(shards, ignore_index=True)
+    shard_counts = shards.groupby(df["location"]).nunique()
+    overlapping = shard_counts[shard_counts > 1]
+    if len(overlapping):
+        raise ValueError(
+            f"{len(overlapping)} locations are in more than one shard, "
+            f"e.g. {overlapping.index[0]}"
+        )
+    return df
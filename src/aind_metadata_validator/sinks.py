@@ -0,0 +1,166 @@
+"""Streaming writers for validation results"""
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from aind_metadata_validator import mappings
+from aind_metadata_validator.mappings import ID_COLUMNS
+from aind_metadata_validator.results import ResultTable
+
+
+class ResultSink:
+    """Base class for writers that append result rows to a file
+
+    Rows are written as they are passed to write(), so memory use does not
+    grow with the number of records. Use as a context manager or call
+    close() when done.
+    """
+
+    def __init__(self, path: Path):
+        """Open the sink
+
+        Parameters
+        ----------
+        path : Path
+            File to write
+        """
+        self.path = Path(path)
+        self.rows_written = 0
+
+    def write(self, results: Union[list, ResultTable]) -> None:
+        """Write a batch of results
+
+        Parameters
+        ----------
+        results : Union[list, ResultTable]
+            Result dictionaries, or a table of results
+        """
+        if not isinstance(results, ResultTable):
+            results = ResultTable.from_results(results)
+        if len(results):
+            self._write_table(results)
+        self.rows_written += len(results)
+
+    def _write_table(self, table: ResultTable) -> None:
+        """Write a table of results, implemented by subclasses"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Flush and close the file"""
+
+    def __enter__(self):
+        """Enter the context"""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Close the sink when leaving the context"""
+        self.close()
+
+
+class CsvResultSink(ResultSink):
+    """Write results to a CSV file with a fixed header"""
+
+    def __init__(self, path: Path):
+        """Open the file and write the header"""
+        super().__init__(path)
+        self._file = open(self.path, "w", newline="")
+        self._file.write(",".join(mappings.RESULT_COLUMNS) + "\n")
+
+    def _write_table(self, table: ResultTable) -> None:
+        """Append rows to the file"""
+        table.to_dataframe().to_csv(self._file, header=False, index=False)
+
+    def close(self) -> None:
+        """Close the file"""
+        self._file.close()
+
+
+@lru_cache(maxsize=None)
+def result_schema() -> pa.Schema:
+    """Arrow schema of the results, strings for ids and int8 for states"""
+    return pa.schema(
+        [
+            (column, pa.string() if column in ID_COLUMNS else pa.int8())
+            for column in mappings.RESULT_COLUMNS
+        ]
+    )
+
+
+class ParquetResultSink(ResultSink):
+    """Write results to a Parquet file, one row group per write"""
+
+    def __init__(self, path: Path):
+        """Open the file"""
+        super().__init__(path)
+        self._writer = pq.ParquetWriter(self.path, result_schema())
+
+    def _write_table(self, table: ResultTable) -> None:
+        """Append rows as a new row group"""
+        arrays = []
+        for column in mappings.RESULT_COLUMNS:
+            if column in ID_COLUMNS:
+                arrays.append(pa.array(table.id_column(column), pa.string()))
+            else:
+                values, mask = table.state_values(column)
+                arrays.append(pa.array(values, mask=mask, type=pa.int8()))
+        self._writer.write_table(
+            pa.Table.from_arrays(arrays, schema=result_schema())
+        )
+
+    def close(self) -> None:
+        """Write the footer and close the file"""
+        self._writer.close()
+
+
+RESULT_SINKS = {
+    "csv": CsvResultSink,
+    "parquet": ParquetResultSink,
+}
+
+
+def open_result_sink(path: Path, output_format: str = "csv") -> ResultSink:
+    """Open a result sink for the given format
+
+    Parameters
+    ----------
+    path : Path
+        File to write
+    output_format : str
+        "csv" or "parquet"
+
+    Returns
+    -------
+    ResultSink
+
+    Raises
+    ------
+    ValueError
+        If the output format is unknown
+    """
+    if output_format not in RESULT_SINKS:
+        raise ValueError(f"Invalid output format: {output_format}")
+    return RESULT_SINKS[output_format](path)
+
+
+def result_dtypes() -> dict:
+    """pandas dtypes of the results, strings for ids and Int8 for states"""
+    return {
+        column: "string" if column in ID_COLUMNS else "Int8"
+        for column in mappings.RESULT_COLUMNS
+    }
+
+
+def read_results(path: Path, output_format: str = "csv") -> pd.DataFrame:
+    """Read a results file written by a result sink back into a DataFrame
+
+    Both formats are read with result_dtypes, so a version like 1.0 stays
+    a string and state columns with gaps stay integers.
+    """
+    if output_format == "parquet":
+        return pd.read_parquet(path).astype(result_dtypes())
+    return pd.read_csv(path, dtype=result_dtypes())
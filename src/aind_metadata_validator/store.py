@@ -0,0 +1,199 @@
+"""Local SQLite store of validation results, indexed by location"""
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+from aind_metadata_validator import mappings
+from aind_metadata_validator.results import NO_STATE, ResultTable
+from aind_metadata_validator.utils import MetadataState
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    location TEXT PRIMARY KEY,
+    _id TEXT,
+    _last_modified TEXT,
+    validator_version TEXT,
+    states BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS store_info (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Only write rows whose contents changed
+_UPSERT = """
+INSERT INTO results
+    (location, _id, _last_modified, validator_version, states)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(location) DO UPDATE SET
+    _id = excluded._id,
+    _last_modified = excluded._last_modified,
+    validator_version = excluded.validator_version,
+    states = excluded.states
+WHERE _id IS NOT excluded._id
+    OR _last_modified IS NOT excluded._last_modified
+    OR validator_version IS NOT excluded.validator_version
+    OR states IS NOT excluded.states
+"""
+
+
+class ResultStore:
+    """Validation results kept in a local SQLite database
+
+    Each location has one row holding its _id, _last_modified,
+    validator_version and its states, encoded as one int8 per
+    STATE_COLUMNS column (NO_STATE where missing). The database uses
+    write-ahead logging and every write is committed, so results written
+    before a crash are kept.
+
+    get() returns rows in the same form as the previous results table, so
+    a store can be used in place of the location -> row lookup in sync.
+    """
+
+    def __init__(self, path: Path):
+        """Open or create the store
+
+        If the store was written with different state columns (e.g. after
+        an aind-data-schema upgrade) its rows are dropped.
+
+        Parameters
+        ----------
+        path : Path
+            Database file
+        """
+        self.path = Path(path)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+            row = self._conn.execute(
+                "SELECT value FROM store_info WHERE key = 'state_columns'"
+            ).fetchone()
+            state_columns = json.dumps(mappings.STATE_COLUMNS)
+            if row is None or row[0] != state_columns:
+                self._conn.execute("DELETE FROM results")
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO store_info VALUES "
+                    "('state_columns', ?)",
+                    (state_columns,),
+                )
+
+    def __len__(self) -> int:
+        """Number of locations"""
+        row = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()
+        return row[0]
+
+    def __contains__(self, location) -> bool:
+        """Check whether a location has a result"""
+        return (
+            self._conn.execute(
+                "SELECT 1 FROM results WHERE location = ?", (location,)
+            ).fetchone()
+            is not None
+        )
+
+    @staticmethod
+    def _to_dict(row: tuple) -> dict:
+        """Convert a database row to a result dictionary"""
+        location, _id, last_modified, validator_version, states = row
+        result = {"_id": _id}
+        for column, state in zip(
+            mappings.STATE_COLUMNS,
+            np.frombuffer(states, dtype=np.int8).tolist(),
+        ):
+            if state != NO_STATE:
+                result[column] = MetadataState(state)
+        result["_last_modified"] = last_modified
+        result["validator_version"] = validator_version
+        result["location"] = location
+        return result
+
+    def get(self, location, default=None) -> Optional[dict]:
+        """Get the result of a location
+
+        Parameters
+        ----------
+        location : str
+            Record location
+        default : Any
+            Returned if the location has no result
+
+        Returns
+        -------
+        Optional[dict]
+            Result dictionary, with the states as MetadataState
+        """
+        row = self._conn.execute(
+            "SELECT location, _id, _last_modified, validator_version, states "
+            "FROM results WHERE location = ?",
+            (location,),
+        ).fetchone()
+        return default if row is None else self._to_dict(row)
+
+    def results(self) -> Iterable[dict]:
+        """Iterate over all results, ordered by location"""
+        cursor = self._conn.execute(
+            "SELECT location, _id, _last_modified, validator_version, states "
+            "FROM results ORDER BY location"
+        )
+        for row in cursor:
+            yield self._to_dict(row)
+
+    def values(self) -> Iterable[dict]:
+        """Iterate over all results, as dict.values() does for a lookup"""
+        return self.results()
+
+    @staticmethod
+    def _to_rows(results: Iterable[dict]) -> Iterable[tuple]:
+        """Convert result dictionaries with a location to database rows"""
+        table = ResultTable.from_results(
+            result for result in results if result.get("location")
+        )
+        return zip(
+            table.id_column("location"),
+            table.id_column("_id"),
+            table.id_column("_last_modified"),
+            table.id_column("validator_version"),
+            (row.tobytes() for row in table.states),
+        )
+
+    def put_many(self, results: Iterable[dict]) -> None:
+        """Insert or update results, keyed by their location
+
+        Results without a location are skipped, rows that are unchanged
+        are not written.
+        """
+        rows = self._to_rows(results)
+        with self._conn:
+            self._conn.executemany(_UPSERT, rows)
+
+    def rebuild(self, results: Iterable[dict]) -> None:
+        """Replace the contents of the store, e.g. with the remote table
+
+        Parameters
+        ----------
+        results : Iterable[dict]
+            Result dictionaries, e.g. the records of the remote table
+        """
+        rows = self._to_rows(results)
+        with self._conn:
+            self._conn.execute("DELETE FROM results")
+            self._conn.executemany(_UPSERT, rows)
+
+    def close(self) -> None:
+        """Close the database"""
+        self._conn.close()
+
+    def __enter__(self):
+        """Enter the context"""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Close the store when leaving the context"""
+        self.close()
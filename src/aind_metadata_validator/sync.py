@@ -1,10 +1,39 @@
 """Main entrypoint"""
 
-from aind_metadata_validator.metadata_validator import validate_metadata
-from aind_metadata_validator import __version__ as version
+from aind_metadata_validator.batch import is_current, iter_validated_chunks
+from aind_metadata_validator.cache import ValidationCache
+from aind_metadata_validator.checkpoint import CheckpointJournal
+from aind_metadata_validator.logs import configure_logging, events
+from aind_metadata_validator.timing import format_report, timer
+from aind_metadata_validator.utils import ValidationEngine
+from aind_metadata_validator.sinks import open_result_sink, read_results
+from aind_metadata_validator.store import ResultStore
+from aind_metadata_validator.shards import (
+    find_manifests,
+    merge_shards,
+    select_shard,
+    shard_name,
+    write_manifest,
+)
+from aind_metadata_validator.push import (
+    push_delta,
+    snapshot_checksums,
+    verify_push,
+)
+from aind_metadata_validator.fetch import (
+    fetch_ids_with_fields,
+    fetch_last_modified,
+    AdaptiveChunkSize,
+    iter_id_pages,
+    iter_record_chunks,
+    iter_unique_locations,
+    prefetch,
+)
 from aind_data_access_api.document_db import MetadataDbClient
 from biodata_cache import custom
-import pandas as pd
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+import json
 import os
 import logging
 from pathlib import Path
@@ -16,32 +45,103 @@ API_GATEWAY_HOST = os.getenv(
 
 OUTPUT_FOLDER = Path(os.getenv("OUTPUT_FOLDER", "/results"))
 
-client = MetadataDbClient(
-    host=API_GATEWAY_HOST,
-    version="v2",
-)
+
+def get_client() -> MetadataDbClient:
+    """Get the DocDB client, created on first use
+
+    Also available as the module attribute client.
+    """
+    if "client" not in globals():
+        globals()["client"] = MetadataDbClient(
+            host=API_GATEWAY_HOST,
+            version="v2",
+        )
+    return globals()["client"]
+
+
+def __getattr__(name: str):
+    """Create the DocDB client on first access of sync.client"""
+    if name == "client":
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 DEV_OR_PROD = "dev" if "test" in API_GATEWAY_HOST else "prod"
 TABLE_NAME = f"metadata_status_{DEV_OR_PROD}_v2"
-CHUNK_SIZE = 50
+# Locations per request at the start of a run, adapted to the latency
+CHUNK_SIZE = int(os.getenv("VALIDATOR_CHUNK_SIZE", "50"))
+MAX_CHUNK_SIZE = int(os.getenv("VALIDATOR_MAX_CHUNK_SIZE", "200"))
+FETCH_CONCURRENCY = int(os.getenv("VALIDATOR_FETCH_CONCURRENCY", "4"))
+FETCH_RETRIES = int(os.getenv("VALIDATOR_FETCH_RETRIES", "3"))
+LOCATION_PAGE_SIZE = int(os.getenv("VALIDATOR_LOCATION_PAGE_SIZE", "5000"))
+# "location" requests lists of locations, "id_range" pages through _id
+FETCH_STRATEGY = os.getenv("VALIDATOR_FETCH_STRATEGY", "location")
+PAGE_SIZE = int(os.getenv("VALIDATOR_PAGE_SIZE", "500"))
+WORKERS = int(os.getenv("VALIDATOR_WORKERS", "1"))
+# "legacy" or "single_pass", see ValidationEngine
+ENGINE = os.getenv("VALIDATOR_ENGINE", ValidationEngine.LEGACY.value)
+PREFETCH = int(os.getenv("VALIDATOR_PREFETCH", "0"))
+OUTPUT_FORMAT = os.getenv("VALIDATOR_OUTPUT_FORMAT", "csv")
+CACHE_PATH = os.getenv("VALIDATOR_CACHE_PATH")
+CACHE_SIZE = int(os.getenv("VALIDATOR_CACHE_SIZE", "4096"))
+STORE_PATH = os.getenv("VALIDATOR_STORE_PATH")
+TIMING = os.getenv("VALIDATOR_TIMING") == "1"
+# Journal of completed chunks in OUTPUT_FOLDER, see checkpoint.py
+CHECKPOINT_NAME = "checkpoint.jsonl"
 
+# Core file and field states by content, shared by the records of a run
+validation_cache = ValidationCache(maxsize=CACHE_SIZE)
 
-def _fetch_unique_locations(test_mode: bool) -> list:  # pragma: no cover
-    """Fetch all unique record locations from the database."""
-    uniquelocations = client.aggregate_docdb_records(
-        pipeline=[
-            {"$group": {"_id": None, "locations": {"$addToSet": "$location"}}},
-            {"$project": {"_id": 0, "locations": 1}},
-        ],
-    )
-    uniquelocations = list(uniquelocations[0]["locations"])
-    logging.info(
-        f"(METADATA VALIDATOR): Retrieved {len(uniquelocations)} records"
+
+def _iter_unique_locations(
+    test_mode: bool, shard: Optional[int] = None, num_shards: int = 1
+) -> Iterator[str]:
+    """Stream the unique record locations from the database.
+
+    Locations are read from pages of a projection sorted by _id (see
+    fetch.iter_id_pages), so validation starts with the first page. Failed
+    requests are retried like record requests. Only the locations of the
+    shard are kept if given.
+    """
+    pages = iter_id_pages(
+        get_client(),
+        LOCATION_PAGE_SIZE,
+        projection={"_id": 1, "location": 1},
+        retries=FETCH_RETRIES,
     )
+    locations = iter_unique_locations(timer.iterate("locations", pages))
     if test_mode:
         logging.info("(METADATA VALIDATOR): Running in test mode")
-        uniquelocations = uniquelocations[:10]
-    return uniquelocations
+        locations = islice(locations, 10)
+    if shard is not None:
+        logging.info(
+            f"(METADATA VALIDATOR): Validating shard {shard} of {num_shards}"
+        )
+        locations = select_shard(locations, shard, num_shards)
+    return locations
+
+
+def _iter_run_locations(
+    journal: CheckpointJournal,
+    test_mode: bool,
+    shard: Optional[int] = None,
+    num_shards: int = 1,
+    fetch_strategy: str = FETCH_STRATEGY,
+) -> Optional[Iterator[str]]:
+    """Locations of a run, see _iter_unique_locations
+
+    Returns None for full, unsharded "id_range" runs that start from an
+    empty journal: every record is paged directly, so the collection is
+    not paged once for the locations and again for the records.
+    """
+    if (
+        fetch_strategy == "id_range"
+        and not test_mode
+        and shard is None
+        and not journal.chunks
+    ):
+        return None
+    return _iter_unique_locations(test_mode, shard, num_shards)
 
 
 def _load_prev_validation_map() -> dict:  # pragma: no cover
@@ -67,70 +167,463 @@ def _load_prev_validation_map() -> dict:  # pragma: no cover
     }
 
 
+def _open_result_store(path, rebuild: bool = False) -> ResultStore:
+    """Open the local result store, filling it from the remote table if it
+    is empty or a rebuild is requested."""
+    store = ResultStore(path)
+    if rebuild or len(store) == 0:
+        logging.info(
+            "(METADATA VALIDATOR): Rebuilding local result store from "
+            f"table {TABLE_NAME}"
+        )
+        store.rebuild(_load_prev_validation_map().values())
+    logging.info(
+        f"(METADATA VALIDATOR): Local result store has {len(store)} records"
+    )
+    return store
+
+
+def _split_unchanged(
+    uniquelocations: Iterable,
+    prev_validation_map: dict,
+    last_modified_map: dict,
+    engine: str = ENGINE,
+) -> tuple:
+    """Split locations into reusable previous results and stale locations.
+
+    Returns
+    -------
+    tuple
+        (unchanged_results, stale_locations)
+    """
+    unchanged_results = []
+    stale_locations = []
+    for location in uniquelocations:
+        prev = prev_validation_map.get(location)
+        last_modified = last_modified_map.get(location)
+        if last_modified is not None and is_current(
+            prev, last_modified, engine
+        ):
+            unchanged_results.append(prev)
+        else:
+            stale_locations.append(location)
+    return unchanged_results, stale_locations
+
+
+def _iter_fetched_chunks(
+    uniquelocations: Optional[Iterable],
+    fetch_strategy: str,
+    projection: Optional[dict],
+    fetch_concurrency: int,
+) -> Iterator[list]:
+    """Fetch records in chunks with the fetch strategy
+
+    "id_range" pages through every record, so it is only used when every
+    record is validated (uniquelocations is None). Runs over a list of
+    locations, e.g. shards or the stale locations of an incremental run,
+    fetch those locations with the "location" strategy instead.
+    """
+    if fetch_strategy == "id_range" and uniquelocations is not None:
+        logging.info(
+            "(METADATA VALIDATOR): Fetching listed locations by location "
+            "instead of by _id range"
+        )
+        fetch_strategy = "location"
+    if fetch_strategy == "location":
+        page_size = AdaptiveChunkSize(CHUNK_SIZE, maximum=MAX_CHUNK_SIZE)
+    else:
+        page_size = PAGE_SIZE
+    return iter_record_chunks(
+        get_client(),
+        uniquelocations,
+        fetch_strategy,
+        page_size,
+        projection=projection,
+        concurrency=fetch_concurrency,
+        retries=FETCH_RETRIES,
+    )
+
+
+def _iter_core_file_chunks(
+    uniquelocations: Optional[Iterable],
+    fetch_strategy: str,
+    fetch_concurrency: int,
+    core_files: list,
+) -> Iterator[list]:
+    """Fetch records with only the fields needed to validate core_files
+
+    The core files that make others required are only fetched if they are
+    selected. The records that have the others get them as None, which is
+    all validate_metadata looks at.
+    """
+    # Imported here so that importing sync does not import aind-data-schema
+    from aind_metadata_validator.metadata_validator import (
+        core_file_projection,
+        requirement_files,
+    )
+
+    ids_by_field = fetch_ids_with_fields(
+        get_client(),
+        requirement_files(core_files),
+        LOCATION_PAGE_SIZE,
+        retries=FETCH_RETRIES,
+    )
+    for chunk in _iter_fetched_chunks(
+        uniquelocations,
+        fetch_strategy,
+        core_file_projection(core_files),
+        fetch_concurrency,
+    ):
+        for record in chunk:
+            for field, ids in ids_by_field.items():
+                if record.get("_id") in ids:
+                    record[field] = None
+        yield chunk
+
+
+def _iter_result_chunks(
+    uniquelocations: Iterable,
+    prev_validation_map: dict,
+    force: bool,
+    workers: int = 1,
+    prefetch_depth: int = 0,
+    incremental: bool = False,
+    fetch_concurrency: int = FETCH_CONCURRENCY,
+    fetch_strategy: str = FETCH_STRATEGY,
+    core_files: Optional[list] = None,
+    engine: str = ENGINE,
+) -> Iterator[list]:
+    """Fetch records in chunks and validate, skipping unchanged records.
+
+    With the "location" fetch strategy, up to fetch_concurrency requests
+    run at a time, each for a chunk of locations whose size starts at
+    CHUNK_SIZE and adapts to the latency (see fetch.py). Chunks are
+    yielded in the order of the locations. With "id_range", every record
+    is fetched in pages of PAGE_SIZE records in _id order, see
+    _iter_fetched_chunks. Failed requests are retried with backoff.
+
+    With workers > 1 the records of each chunk are validated in a pool of
+    worker processes (see batch.py), results keep the order of the fetched
+    records. With prefetch_depth > 0 up to that many chunks are fetched in
+    a background thread while the current chunk is validated. With
+    incremental, only the _last_modified of each record is fetched first
+    and full records are only fetched for new or modified locations, the
+    previous results of the other locations are yielded first.
+
+    uniquelocations is None to fetch every record with "id_range" without
+    listing the locations first, see _iter_run_locations.
+
+    With core_files, only those core files are fetched and validated (see
+    _iter_core_file_chunks), and their states are merged into the previous
+    results, see validate_metadata. Every record is validated again, incremental and force are ignored.
+
+    Records are validated with the engine, see validate_metadata.
+
+    Yields
+    ------
+    list
+        The results for each chunk of records
+    """
+    if incremental and not force and core_files is None:
+        last_modified_map = fetch_last_modified(
+            get_client(), LOCATION_PAGE_SIZE, retries=FETCH_RETRIES
+        )
+        if uniquelocations is None:
+            uniquelocations = (
+                location
+                for location in last_modified_map
+                if location is not None
+            )
+        unchanged_results, uniquelocations = _split_unchanged(
+            uniquelocations, prev_validation_map, last_modified_map, engine
+        )
+        logging.info(
+            f"(METADATA VALIDATOR): {len(unchanged_results)} records "
+            f"unchanged, fetching {len(uniquelocations)} records"
+        )
+        yield unchanged_results
+
+    if core_files is None:
+        chunks = _iter_fetched_chunks(
+            uniquelocations, fetch_strategy, None, fetch_concurrency
+        )
+    else:
+        chunks = _iter_core_file_chunks(
+            uniquelocations, fetch_strategy, fetch_concurrency, core_files
+        )
+        force = False
+    if prefetch_depth > 0:
+        chunks = prefetch(chunks, prefetch_depth)
+    # With prefetching, this is the time spent waiting for fetched chunks
+    chunks = timer.iterate("fetch", chunks)
+
+    yield from iter_validated_chunks(
+        chunks,
+        None if force else prev_validation_map,
+        workers,
+        engine,
+        cache=validation_cache,
+        core_files=core_files,
+    )
+
+
+def _iter_checkpointed_chunks(
+    journal: CheckpointJournal, locations: Iterable, *args, **kwargs
+) -> Iterator[list]:
+    """Yield the journaled results of a run, then validate the locations
+    without a journaled result, journaling each chunk before it is yielded.
+
+    The arguments after the locations are passed to _iter_result_chunks.
+    locations is None to validate every record, only when starting a run.
+    """
+    if locations is not None:
+        locations = journal.remaining(locations)
+    elif journal.chunks:
+        raise ValueError("Resuming a run needs its locations")
+    if journal.chunks:
+        logging.info(
+            f"(METADATA VALIDATOR): Resuming after chunk "
+            f"{journal.chunks[-1]['chunk']} at location {journal.cursor}"
+        )
+        yield list(journal.results())
+    for chunk_results in _iter_result_chunks(locations, *args, **kwargs):
+        journal.append(chunk_results)
+        yield chunk_results
+
+
+def _shard_suffix(shard: Optional[int], num_shards: int) -> str:
+    """Suffix of the file names of a shard, empty when not sharded"""
+    return "" if shard is None else f".{shard_name(shard, num_shards)}"
+
+
+def _open_journal(
+    resume: bool, shard: Optional[int] = None, num_shards: int = 1
+) -> CheckpointJournal:
+    """Open the journal of the previous run (of the shard if given) to
+    resume it, or start a new journal."""
+    name = Path(CHECKPOINT_NAME)
+    path = OUTPUT_FOLDER / (
+        f"{name.stem}{_shard_suffix(shard, num_shards)}{name.suffix}"
+    )
+    journal = CheckpointJournal.open(path) if resume else None
+    if journal is None:
+        if resume:
+            logging.info(
+                "(METADATA VALIDATOR): No checkpoint to resume from, "
+                "starting a new run"
+            )
+        journal = CheckpointJournal.create(path)
+    return journal
+
+
 def _build_results(
-    uniquelocations: list, prev_validation_map: dict, force: bool
-) -> list:  # pragma: no cover
-    """Fetch records in chunks and validate, skipping unchanged records."""
+    uniquelocations: Iterable,
+    prev_validation_map: dict,
+    force: bool,
+    workers: int = 1,
+    prefetch_depth: int = 0,
+    incremental: bool = False,
+) -> list:
+    """Fetch and validate all records, see _iter_result_chunks."""
     results = []
-    for i in range(0, len(uniquelocations), CHUNK_SIZE):
-        chunk = uniquelocations[i : i + CHUNK_SIZE]
-        response = client.retrieve_docdb_records(
-            filter_query={"location": {"$in": chunk}},
-            limit=0,
-        )
-        for record in response:
-            location = record.get("location")
-            prev = None if force else prev_validation_map.get(location)
-            if (
-                prev is not None
-                and prev.get("_last_modified") == record.get("_last_modified")
-                and prev.get("validator_version") == version
-            ):
-                # Record unchanged and validated with current version; reuse
-                results.append(prev)
-            else:
-                result = validate_metadata(record, None)
-                result["location"] = location
-                results.append(result)
+    for chunk_results in _iter_result_chunks(
+        uniquelocations,
+        prev_validation_map,
+        force,
+        workers,
+        prefetch_depth,
+        incremental,
+    ):
+        results.extend(chunk_results)
     return results
 
 
-def run(test_mode: bool = False, force: bool = False):  # pragma: no cover
-    """Main function to run the metadata validation process."""
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[logging.StreamHandler()],
+def _push_results(
+    df, test_mode: bool, prev_checksums=None
+) -> bool:  # pragma: no cover
+    """Push the results table, only if rows changed when prev_checksums of
+    the previous results are given. Returns whether the push verified."""
+    if test_mode:
+        logging.info(
+            "(METADATA VALIDATOR) Running in test mode, would have written table"
+        )
+        return True
+    with timer.stage("push"):
+        if prev_checksums is not None:
+            return push_delta(TABLE_NAME, df, prev_checksums)["verified"]
+
+        custom(TABLE_NAME, df)
+        # Check the row count and checksum of the pushed table
+        return verify_push(TABLE_NAME, df)
+
+
+def _write_timing_report(path: Path) -> dict:
+    """Write the timing report as JSON and log it as a table."""
+    report = timer.report()
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    logging.info(
+        f"(METADATA VALIDATOR): Timings, written to {path}\n"
+        f"{format_report(report)}"
     )
+    return report
+
+
+def _write_result_file(
+    journal: CheckpointJournal,
+    locations: Iterable,
+    output_path: Path,
+    output_format: str,
+    store: Optional[ResultStore],
+    *args,
+) -> int:
+    """Validate locations into a results file, see
+    _iter_checkpointed_chunks for the other arguments.
+
+    Each chunk of results is also written to the store if given.
+
+    Returns
+    -------
+    int
+        Number of rows written
+    """
+    with open_result_sink(output_path, output_format) as sink, journal:
+        for chunk_results in _iter_checkpointed_chunks(
+            journal, locations, *args
+        ):
+            with timer.stage("write"):
+                sink.write(chunk_results)
+                if store is not None:
+                    store.put_many(chunk_results)
+    return sink.rows_written
+
+
+def merge_and_push(
+    folder: Path, test_mode: bool = False, delta: bool = False
+) -> bool:  # pragma: no cover
+    """Merge the partial results of every shard of a run and push them
+    once, see shards.merge_shards. Returns whether the push verified."""
+    df = merge_shards(find_manifests(folder))
     logging.info(
-        f"(METADATA VALIDATOR): Starting run, targeting: {API_GATEWAY_HOST}"
+        f"(METADATA VALIDATOR): Merged {len(df)} records from shards in "
+        f"{folder}"
+    )
+    prev_checksums = (
+        snapshot_checksums(_load_prev_validation_map().values())
+        if delta
+        else None
     )
+    return _push_results(df, test_mode, prev_checksums)
 
-    uniquelocations = _fetch_unique_locations(test_mode)
-    prev_validation_map = _load_prev_validation_map()
-    results = _build_results(uniquelocations, prev_validation_map, force)
 
-    df = pd.DataFrame(results)
-    OUTPUT_FOLDER.mkdir(parents=True, exist_ok=True)
-    df.to_csv(OUTPUT_FOLDER / "validation_results.csv", index=False)
-    logging.info("(METADATA VALIDATOR) Dataframe built -- pushing to cache")
+def run(
+    *,
+    test_mode: bool = False,
+    force: bool = False,
+    workers: int = WORKERS,
+    prefetch_depth: int = PREFETCH,
+    incremental: bool = False,
+    output_format: str = OUTPUT_FORMAT,
+    cache_path: Optional[str] = CACHE_PATH,
+    store_path: Optional[str] = STORE_PATH,
+    rebuild_store: bool = False,
+    delta: bool = False,
+    quiet: bool = False,
+    structured_logs: bool = False,
+    timing: bool = TIMING,
+    fetch_concurrency: int = FETCH_CONCURRENCY,
+    resume: bool = False,
+    shard: Optional[int] = None,
+    num_shards: int = 1,
+    fetch_strategy: str = FETCH_STRATEGY,
+    core_files: Optional[list] = None,
+    engine: str = ENGINE,
+):  # pragma: no cover
+    """Main function to run the metadata validation process.
 
-    if test_mode:
+    Every parameter matches a flag of ``python -m
+    aind_metadata_validator.sync`` and is described in the "Redshift
+    sync" section of the README. The stages of a run are documented in
+    the modules that implement them: fetching in fetch.py, validation in
+    batch.py, results in sinks.py and store.py, the journal used by
+    resume in checkpoint.py, sharding in shards.py, pushing in push.py,
+    events in logs.py and timings in timing.py.
+    """
+    configure_logging(quiet=quiet, structured=structured_logs)
+    timer.enabled = timing
+    logging.info(
+        f"(METADATA VALIDATOR): Starting run, targeting: {API_GATEWAY_HOST}"
+    )
+
+    if cache_path:
+        loaded = validation_cache.load(cache_path)
         logging.info(
-            "(METADATA VALIDATOR) Running in test mode, would have written table"
+            f"(METADATA VALIDATOR): Loaded {loaded} validation cache entries"
         )
-    else:
-        custom(TABLE_NAME, df)
 
-    # Roundtrip the table and ensure that the number of rows matches
-    df_in_cache = custom(TABLE_NAME)
+    OUTPUT_FOLDER.mkdir(parents=True, exist_ok=True)
+    suffix = _shard_suffix(shard, num_shards)
+    journal = _open_journal(resume, shard, num_shards)
+    store = None
+    with timer.stage("previous_results"):
+        if store_path:
+            store = _open_result_store(store_path, rebuild_store)
+            prev_validation_map = store
+        else:
+            prev_validation_map = _load_prev_validation_map()
+    prev_checksums = (
+        snapshot_checksums(prev_validation_map.values())
+        if delta and shard is None
+        else None
+    )
+    output_path = OUTPUT_FOLDER / f"validation_results{suffix}.{output_format}"
+    rows = _write_result_file(
+        journal,
+        _iter_run_locations(
+            journal, test_mode, shard, num_shards, fetch_strategy
+        ),
+        output_path,
+        output_format,
+        store,
+        prev_validation_map,
+        force,
+        workers,
+        prefetch_depth,
+        incremental,
+        fetch_concurrency,
+        fetch_strategy,
+        core_files,
+        engine,
+    )
 
-    if not test_mode and (len(df) != len(df_in_cache)):
-        logging.error(
-            f"(METADATA VALIDATOR) Mismatch in number of rows between input and output: {len(df)} vs {len(df_in_cache)}"
+    if store is not None:
+        store.close()
+    events.flush()
+    logging.info(
+        f"(METADATA VALIDATOR): Validation cache {validation_cache.stats()}"
+    )
+    if cache_path:
+        validation_cache.save(cache_path)
+
+    if shard is not None:
+        write_manifest(output_path, shard, num_shards, rows, output_format)
+        logging.info(
+            f"(METADATA VALIDATOR): Shard {shard} of {num_shards} written "
+            f"to {output_path}"
         )
+        journal.remove()
     else:
-        logging.info("(METADATA VALIDATOR) Success")
+        with timer.stage("dataframe"):
+            df = read_results(output_path, output_format)
+        logging.info(
+            "(METADATA VALIDATOR) Dataframe built -- pushing to cache"
+        )
+
+        if _push_results(df, test_mode, prev_checksums):
+            logging.info("(METADATA VALIDATOR) Success")
+            journal.remove()
+    if timing:
+        _write_timing_report(OUTPUT_FOLDER / f"timing_report{suffix}.json")
 
 
 if __name__ == "__main__":
@@ -138,6 +631,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "--test",
+        dest="test_mode",
         help="Run in test mode with a limited number of records",
         action="store_true",
     )
@@ -146,5 +640,130 @@ if __name__ == "__main__":
         help="Force validation to ignore previous results",
         action="store_true",
     )
-    args = parser.parse_args()
-    run(args.test, args.force)
+    parser.add_argument(
+        "--workers",
+        help="Number of worker processes used for validation "
+        "(default: VALIDATOR_WORKERS or 1)",
+        type=int,
+        default=WORKERS,
+    )
+    parser.add_argument(
+        "--prefetch",
+        dest="prefetch_depth",
+        help="Number of chunks fetched ahead of validation "
+        "(default: VALIDATOR_PREFETCH or 0, fetch and validate in turn)",
+        type=int,
+        default=PREFETCH,
+    )
+    parser.add_argument(
+        "--incremental",
+        help="Only fetch full records that are new or modified since the "
+        "previous results",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--output-format",
+        help="Format of the results file "
+        "(default: VALIDATOR_OUTPUT_FORMAT or csv)",
+        choices=["csv", "parquet"],
+        default=OUTPUT_FORMAT,
+    )
+    parser.add_argument(
+        "--cache",
+        dest="cache_path",
+        help="File the validation cache is loaded from and saved to "
+        "(default: VALIDATOR_CACHE_PATH, not persisted)",
+        default=CACHE_PATH,
+    )
+    parser.add_argument(
+        "--store",
+        dest="store_path",
+        help="Local SQLite store of results used to skip unchanged records "
+        "(default: VALIDATOR_STORE_PATH, read the remote table instead)",
+        default=STORE_PATH,
+    )
+    parser.add_argument(
+        "--rebuild-store",
+        help="Rebuild the local result store from the remote table",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--delta",
+        help="Only push the results table if any row changed",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--quiet",
+        help="Only log validator warnings and errors",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--structured-logs",
+        help="Log one JSON object per line",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--timing",
+        help="Time each stage of the run and write timing_report.json "
+        "(default: VALIDATOR_TIMING=1)",
+        action="store_true",
+        default=TIMING,
+    )
+    parser.add_argument(
+        "--fetch-concurrency",
+        help="Number of DocDB requests run at a time "
+        "(default: VALIDATOR_FETCH_CONCURRENCY or 4)",
+        type=int,
+        default=FETCH_CONCURRENCY,
+    )
+    parser.add_argument(
+        "--resume",
+        help=f"Resume the previous run from {CHECKPOINT_NAME} in "
+        "OUTPUT_FOLDER instead of starting over",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--shard",
+        help="Only validate the locations of this shard, from 0 to "
+        "--num-shards - 1, and write partial results without pushing",
+        type=int,
+    )
+    parser.add_argument(
+        "--num-shards",
+        help="Number of shards the locations are split into",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--merge-shards",
+        help="Merge the partial results of every shard found in this "
+        "folder and push them, instead of validating",
+    )
+    parser.add_argument(
+        "--fetch-strategy",
+        help="Fetch records by lists of locations or by _id ranges "
+        "(default: VALIDATOR_FETCH_STRATEGY or location)",
+        choices=["location", "id_range"],
+        default=FETCH_STRATEGY,
+    )
+    parser.add_argument(
+        "--core-files",
+        help="Only fetch and validate these core files, keeping the other "
+        "states of the previous results",
+        nargs="+",
+    )
+    parser.add_argument(
+        "--engine",
+        help="Validate with the legacy or the single pass engine "
+        "(default: VALIDATOR_ENGINE or legacy)",
+        choices=[engine.value for engine in ValidationEngine],
+        default=ENGINE,
+    )
+    kwargs = vars(parser.parse_args())
+    merge_folder = kwargs.pop("merge_shards")
+    if merge_folder:
+        merge_and_push(
+            Path(merge_folder), kwargs["test_mode"], kwargs["delta"]
+        )
+        raise SystemExit
+    run(**kwargs)
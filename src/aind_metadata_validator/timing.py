@@ -0,0 +1,330 @@
+"""Opt-in timing of validation stages and single record profiling
+
+Run the validator on one record in a loop, e.g. under py-spy:
+
+    python -m aind_metadata_validator.timing record.json --repeat 100
+
+or with cProfile, writing stats that pstats or snakeviz can read:
+
+    python -m aind_metadata_validator.timing record.json --profile out.prof
+"""
+
+import argparse
+import bisect
+import cProfile
+import heapq
+import json
+import os
+import pstats
+import time
+from typing import Iterable, Iterator, Optional
+
+# Upper bounds in seconds of the histogram buckets, the last is unbounded
+BUCKETS = [0.001, 0.01, 0.1, 1.0, 10.0]
+BUCKET_LABELS = [f"<{bound}s" for bound in BUCKETS] + [f">={BUCKETS[-1]}s"]
+
+
+class _NullStage:
+    """Context manager that does nothing, used while timing is disabled"""
+
+    def __enter__(self):
+        """Do nothing"""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Do nothing"""
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+# Marks the end of an iterable in StageTimer.iterate
+_DONE = object()
+
+
+class _Stage:
+    """Context manager that adds its duration to the timer"""
+
+    __slots__ = ("timer", "names", "record", "start")
+
+    def __init__(self, timer, names: tuple, record=None):
+        """Time a stage under each of names, and as a record if given"""
+        self.timer = timer
+        self.names = names
+        self.record = record
+
+    def __enter__(self):
+        """Start timing"""
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Add the duration, also when the stage raised"""
+        seconds = time.perf_counter() - self.start
+        for name in self.names:
+            self.timer.add(name, seconds)
+        if self.record is not None:
+            self.timer.add_record(self.record, seconds)
+        return False
+
+
+class StageTimer:
+    """Registry of timings per validation stage
+
+    Each stage keeps a count, total, min, max and a histogram of
+    durations (see BUCKETS). The slowest records are kept by location.
+    While disabled, stage() returns a shared context manager that does
+    nothing, so instrumented code only pays for one method call. Worker
+    processes send their timings to the parent with take(), which adds
+    them to its own with merge().
+    """
+
+    def __init__(self, enabled: bool = False, slowest: int = 10):
+        """Create an empty timer
+
+        Parameters
+        ----------
+        enabled : bool
+            Whether stages are timed
+        slowest : int
+            Number of slowest records kept
+        """
+        self.enabled = enabled
+        self.slowest = slowest
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget all timings"""
+        self.stages = {}
+        self._records = []
+
+    def stage(self, name: str, key: Optional[str] = None):
+        """Time a block as a stage
+
+        Parameters
+        ----------
+        name : str
+            Stage name, e.g. "core"
+        key : Optional[str]
+            Also time the block as the stage "name.key", e.g. "core.subject"
+
+        Returns
+        -------
+        Context manager timing the block
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        names = (name,) if key is None else (name, f"{name}.{key}")
+        return _Stage(self, names)
+
+    def record(self, location):
+        """Time the validation of a record, as the stage "record" and as
+        one of the slowest records"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, ("record",), location)
+
+    def iterate(self, name: str, items: Iterable) -> Iterator:
+        """Time getting each item of an iterable as a stage, e.g. fetching
+        chunks from a generator"""
+        if not self.enabled:
+            return iter(items)
+        return self._iterate(name, iter(items))
+
+    def _iterate(self, name: str, items: Iterator) -> Iterator:
+        """Yield from items, timing each next()"""
+        while True:
+            with self.stage(name):
+                item = next(items, _DONE)
+            if item is _DONE:
+                return
+            yield item
+
+    def add(self, name: str, seconds: float) -> None:
+        """Add a duration to a stage"""
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = {
+                "count": 0,
+                "total_s": 0.0,
+                "min_s": seconds,
+                "max_s": seconds,
+                "histogram": [0] * len(BUCKET_LABELS),
+            }
+        stats["count"] += 1
+        stats["total_s"] += seconds
+        stats["min_s"] = min(stats["min_s"], seconds)
+        stats["max_s"] = max(stats["max_s"], seconds)
+        stats["histogram"][bisect.bisect_right(BUCKETS, seconds)] += 1
+
+    def add_record(self, location, seconds: float) -> None:
+        """Keep a record's duration if it is one of the slowest"""
+        item = (seconds, str(location))
+        if len(self._records) < self.slowest:
+            heapq.heappush(self._records, item)
+        else:
+            heapq.heappushpop(self._records, item)
+
+    def take(self) -> dict:
+        """Get the timings since the last take or reset and forget them
+
+        Returns
+        -------
+        dict
+            "stages": stage name -> count, total, min, max and histogram
+            counts, "records": (seconds, location) of the slowest records
+        """
+        taken = {"stages": self.stages, "records": self._records}
+        self.reset()
+        return taken
+
+    def merge(self, taken: dict) -> None:
+        """Add timings taken from another timer, e.g. in a worker process
+
+        Parameters
+        ----------
+        taken : dict
+            Timings, see take()
+        """
+        for name, other in taken["stages"].items():
+            stats = self.stages.get(name)
+            if stats is None:
+                self.stages[name] = dict(
+                    other, histogram=list(other["histogram"])
+                )
+                continue
+            stats["count"] += other["count"]
+            stats["total_s"] += other["total_s"]
+            stats["min_s"] = min(stats["min_s"], other["min_s"])
+            stats["max_s"] = max(stats["max_s"], other["max_s"])
+            stats["histogram"] = [
+                count + other_count
+                for count, other_count in zip(
+                    stats["histogram"], other["histogram"]
+                )
+            ]
+        for seconds, location in taken["records"]:
+            self.add_record(location, seconds)
+
+    def report(self) -> dict:
+        """Get the timings
+
+        Returns
+        -------
+        dict
+            "stages": stage name -> count, total/mean/min/max seconds and
+            histogram (bucket label -> count), "slowest_records": location
+            and seconds of the slowest records, slowest first
+        """
+        stages = {}
+        for name, stats in sorted(self.stages.items()):
+            stages[name] = {
+                "count": stats["count"],
+                "total_s": stats["total_s"],
+                "mean_s": stats["total_s"] / stats["count"],
+                "min_s": stats["min_s"],
+                "max_s": stats["max_s"],
+                "histogram": dict(zip(BUCKET_LABELS, stats["histogram"])),
+            }
+        return {
+            "stages": stages,
+            "slowest_records": [
+                {"location": location, "seconds": seconds}
+                for seconds, location in sorted(self._records, reverse=True)
+            ],
+        }
+
+
+def format_report(report: dict) -> str:
+    """Format a timing report (see StageTimer.report) as text tables,
+    stages by total time"""
+    lines = [
+        f"{'stage':<32} {'count':>8} {'total_s':>10} {'mean_s':>10} "
+        f"{'max_s':>10}"
+    ]
+    stages = sorted(
+        report["stages"].items(),
+        key=lambda item: item[1]["total_s"],
+        reverse=True,
+    )
+    for name, stats in stages:
+        lines.append(
+            f"{name:<32} {stats['count']:>8} {stats['total_s']:>10.3f} "
+            f"{stats['mean_s']:>10.4f} {stats['max_s']:>10.3f}"
+        )
+    if report["slowest_records"]:
+        lines.append("")
+        lines.append(f"{'slowest records':<54} {'seconds':>10}")
+        for item in report["slowest_records"]:
+            lines.append(f"{item['location']:<54} {item['seconds']:>10.3f}")
+    return "\n".join(lines)
+
+
+# Timings of the current process, enabled with VALIDATOR_TIMING=1
+timer = StageTimer(enabled=os.getenv("VALIDATOR_TIMING") == "1")
+
+
+def profile_record(
+    record: dict,
+    output: Optional[str] = None,
+    repeat: int = 1,
+    **kwargs,
+) -> pstats.Stats:
+    """Validate a record under cProfile
+
+    Parameters
+    ----------
+    record : dict
+        Record to validate
+    output : Optional[str]
+        File the profile is written to, e.g. for snakeviz
+    repeat : int
+        Number of times the record is validated
+    **kwargs
+        Passed to validate_metadata, e.g. engine
+
+    Returns
+    -------
+    pstats.Stats
+        The profile
+    """
+    from aind_metadata_validator.metadata_validator import validate_metadata
+
+    profiler = cProfile.Profile()
+    for _ in range(repeat):
+        profiler.runcall(validate_metadata, dict(record), **kwargs)
+    if output:
+        profiler.dump_stats(output)
+    return pstats.Stats(profiler)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    parser = argparse.ArgumentParser(
+        description="Validate one record, to profile the validator"
+    )
+    parser.add_argument("record", help="JSON file of the record")
+    parser.add_argument(
+        "--repeat", help="Times the record is validated", type=int, default=1
+    )
+    parser.add_argument("--engine", help="Validation engine", default="legacy")
+    parser.add_argument(
+        "--profile", help="Write a cProfile profile to this file"
+    )
+    args = parser.parse_args()
+    with open(args.record) as f:
+        record = json.load(f)
+    if args.profile:
+        stats = profile_record(
+            record, args.profile, args.repeat, engine=args.engine
+        )
+        stats.sort_stats("cumulative").print_stats(30)
+    else:
+        from aind_metadata_validator.metadata_validator import (
+            validate_metadata,
+        )
+
+        timer.enabled = True
+        for _ in range(args.repeat):
+            with timer.record(args.record):
+                validate_metadata(dict(record), engine=args.engine)
+        print(format_report(timer.report()))
@@ -2,6 +2,8 @@
 
 from enum import Enum
 
+from aind_metadata_validator import __version__ as version
+
 
 class FileRequirement(Enum):
     """Enum to represent file requirement status."""
@@ -20,6 +22,27 @@ class MetadataState(int, Enum):
     CORRUPT = -3  # corrupt, can't be loaded from json
 
 
+class ValidationEngine(str, Enum):
+    """Enum to select how a record is validated."""
+
+    LEGACY = "legacy"  # validate metadata, core files and fields separately
+    SINGLE_PASS = "single_pass"  # validate each core file once
+
+
+def result_version(engine: ValidationEngine = ValidationEngine.LEGACY) -> str:
+    """validator_version of the results of an engine
+
+    The engines report some field states differently. Legacy results carry
+    the package version, single pass results add the engine as a local
+    version label (e.g. 0.11.11+single_pass), so that the results of one
+    engine are not current for the other.
+    """
+    engine = ValidationEngine(engine)
+    if engine == ValidationEngine.LEGACY:
+        return version
+    return f"{version}+{engine.value}"
+
+
 REMAPS = {
     "OPHYS": "POPHYS",
     "EPHYS": "ECEPHYS",
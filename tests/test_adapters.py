@@ -0,0 +1,74 @@
+"""Test cached TypeAdapters."""
+
+import unittest
+from typing import Optional, Union
+from pydantic import BaseModel, model_validator
+from aind_data_schema.components.devices import Device
+from aind_metadata_validator.adapters import (
+    DeferredTypeAdapter,
+    get_type_adapter,
+    is_model_class,
+    validate_copy,
+    validates,
+)
+
+
+class _PoppingModel(BaseModel):
+    """Model whose validator modifies its input in place"""
+
+    name: str
+
+    @model_validator(mode="before")
+    @classmethod
+    def pop_extra(cls, data):
+        """Remove the extra key from the input dictionary"""
+        data.pop("extra", None)
+        return data
+
+
+class AdapterTest(unittest.TestCase):
+    """TypeAdapter cache tests."""
+
+    def test_is_model_class(self):
+        """Only pydantic model classes are model classes"""
+        self.assertTrue(is_model_class(Device))
+        self.assertFalse(is_model_class(dict))
+        self.assertFalse(is_model_class(Optional[Device]))
+
+    def test_adapters_are_cached(self):
+        """Adapters are built once per annotation"""
+        self.assertIs(get_type_adapter(Device), get_type_adapter(Device))
+        self.assertIs(
+            get_type_adapter(Union[Device, dict]),
+            get_type_adapter(Union[Device, dict]),
+        )
+
+    def test_deferred_adapter(self):
+        """Deferred adapters are built on first use, from the cache"""
+        adapter = DeferredTypeAdapter(list[_PoppingModel])
+        self.assertIsNone(adapter._adapter)
+        self.assertTrue(validates(adapter, [{"name": "a"}]))
+        self.assertIs(adapter.adapter, get_type_adapter(list[_PoppingModel]))
+        self.assertEqual(validate_copy(get_type_adapter(int), 1), 1)
+
+    def test_validates(self):
+        """validates reports whether data validates"""
+        adapter = get_type_adapter(list[Device])
+        self.assertTrue(validates(adapter, [{"name": "a"}, {"name": "b"}]))
+        self.assertFalse(validates(adapter, [{"name": "a"}, {"bad": "b"}]))
+
+    def test_validate_copy_keeps_data(self):
+        """Validators modifying their input don't change the caller's data"""
+        data = {"name": "a", "extra": 1}
+        validate_copy(get_type_adapter(_PoppingModel), data)
+        self.assertEqual(data, {"name": "a", "extra": 1})
+
+        items = [{"name": "a", "extra": 1}]
+        self.assertTrue(
+            validates(get_type_adapter(list[_PoppingModel]), items)
+        )
+        self.assertEqual(items, [{"name": "a", "extra": 1}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,200 @@
+"""Test batch validation."""
+
+import unittest
+from itertools import islice
+from unittest.mock import patch
+from aind_metadata_validator import __version__ as version
+from aind_metadata_validator import batch
+from aind_metadata_validator.batch import (
+    _validate_records,
+    is_current,
+    iter_chunks,
+    iter_validated_chunks,
+    validate_many,
+)
+from aind_metadata_validator.logs import events
+from aind_metadata_validator.metadata_validator import validate_metadata
+from aind_metadata_validator.timing import timer
+from aind_metadata_validator.utils import ValidationEngine
+
+
+class BatchTest(unittest.TestCase):
+    """validate_many tests."""
+
+    def setUp(self):
+        """Small records, one of which has a current previous result"""
+        self.records = [
+            {
+                "_id": f"id{i}",
+                "name": f"name{i}",
+                "location": f"loc{i}",
+                "_last_modified": "2025-01-01",
+                "subject": {"subject_id": str(i)},
+            }
+            for i in range(5)
+        ]
+        self.prev = {
+            "loc1": {
+                "location": "loc1",
+                "_last_modified": "2025-01-01",
+                "validator_version": version,
+            }
+        }
+
+    def test_iter_chunks(self):
+        """Items are grouped lazily into chunks"""
+        self.assertEqual(
+            list(iter_chunks(iter(range(5)), 2)), [[0, 1], [2, 3], [4]]
+        )
+
+    def test_is_current(self):
+        """Only unchanged results of this version and engine are current"""
+        prev = self.prev["loc1"]
+        self.assertTrue(is_current(prev, "2025-01-01"))
+        self.assertFalse(is_current(prev, "2025-01-02"))
+        self.assertFalse(is_current(None, "2025-01-01"))
+        self.assertFalse(
+            is_current(dict(prev, validator_version="0.0.0"), "2025-01-01")
+        )
+        self.assertFalse(
+            is_current(prev, "2025-01-01", ValidationEngine.SINGLE_PASS)
+        )
+
+    def test_validate_many_in_order(self):
+        """Results of a generator of records match validate_metadata"""
+        results = list(
+            validate_many(
+                (record for record in self.records), self.prev, chunk_size=2
+            )
+        )
+        self.assertEqual(
+            [result["location"] for result in results],
+            [record["location"] for record in self.records],
+        )
+        self.assertIs(results[1], self.prev["loc1"])
+        expected = dict(validate_metadata(dict(self.records[0])))
+        expected["location"] = "loc0"
+        self.assertEqual(results[0], expected)
+
+    def test_validate_many_workers(self):
+        """A pool gives the same results, in order or as completed"""
+        serial = list(validate_many(self.records, self.prev, chunk_size=2))
+        parallel = list(
+            validate_many(self.records, self.prev, workers=2, chunk_size=1)
+        )
+        self.assertEqual(parallel, serial)
+
+        records = self.records * 2
+        completed = list(
+            validate_many(
+                records, self.prev, workers=2, chunk_size=1, ordered=False
+            )
+        )
+        self.assertEqual(
+            sorted(completed, key=lambda result: result["location"]),
+            sorted(serial * 2, key=lambda result: result["location"]),
+        )
+
+    def test_worker_events(self):
+        """Events counted by the workers are merged into this process"""
+        for record in self.records:
+            record["subject"]["unknown"] = 1
+        key = ("unknown_field", "subject.unknown")
+        for ordered in [True, False]:
+            events.reset()
+            list(
+                validate_many(
+                    self.records, workers=2, chunk_size=1, ordered=ordered
+                )
+            )
+            self.assertEqual(events.counts[key], 5)
+        events.reset()
+        list(validate_many(self.records))
+        self.assertEqual(events.counts[key], 5)
+        events.reset()
+
+    def test_worker_timings(self):
+        """Timings and slowest records of the workers are merged into this
+        process's timer"""
+        timer.reset()
+        timer.enabled = True
+        try:
+            list(validate_many(self.records, workers=2, chunk_size=2))
+            report = timer.report()
+        finally:
+            timer.enabled = False
+            timer.reset()
+        self.assertEqual(report["stages"]["record"]["count"], 5)
+        self.assertIn("core.subject", report["stages"])
+        self.assertEqual(
+            {item["location"] for item in report["slowest_records"]},
+            {f"loc{i}" for i in range(5)},
+        )
+
+    def test_worker_cache(self):
+        """Records validated by a worker share the worker's cache"""
+        results = _validate_records(self.records[:2], ValidationEngine.LEGACY)[
+            "results"
+        ]
+        self.assertEqual(
+            [result["location"] for result in results], ["loc0", "loc1"]
+        )
+        self.assertGreater(batch._worker_cache.stats()["entries"], 0)
+
+    def test_core_files(self):
+        """Selected core files are validated again and merged into the
+        previous results, in this process and in a pool"""
+        self.prev["loc1"]["metadata"] = "kept"
+        serial = list(
+            validate_many(self.records, self.prev, core_files=["subject"])
+        )
+        self.assertIsNot(serial[1], self.prev["loc1"])
+        self.assertEqual(serial[1]["metadata"], "kept")
+        self.assertEqual(serial[1]["_last_modified"], "2025-01-01")
+        self.assertIn("subject", serial[1])
+        self.assertNotIn("procedures", serial[1])
+        self.assertIsNone(serial[0]["_last_modified"])
+
+        parallel = list(
+            validate_many(
+                self.records,
+                self.prev,
+                workers=2,
+                chunk_size=2,
+                core_files=["subject"],
+            )
+        )
+        self.assertEqual(parallel, serial)
+        results = _validate_records(
+            self.records[1:2],
+            ValidationEngine.LEGACY,
+            ["subject"],
+            [self.prev["loc1"]],
+        )
+        self.assertEqual(results["results"], serial[1:2])
+
+    def test_pool_context(self):
+        """Workers are not forked from the threaded parent process"""
+        self.assertEqual(
+            batch._pool_context().get_start_method(), "forkserver"
+        )
+        with patch(
+            "aind_metadata_validator.batch.multiprocessing"
+            ".get_all_start_methods",
+            return_value=["spawn"],
+        ):
+            self.assertEqual(batch._pool_context().get_start_method(), "spawn")
+        batch._init_worker()
+
+    def test_stop_early(self):
+        """Closing the results stops the pool"""
+        chunks = iter_validated_chunks(
+            iter_chunks(self.records * 4, 1), workers=2
+        )
+        first = list(islice(chunks, 1))
+        chunks.close()
+        self.assertEqual(first[0][0]["location"], "loc0")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+"""Test the benchmark record generator."""
+
+import unittest
+from aind_metadata_validator.mappings import CORE_FILES
+from benchmarks.records import (
+    VARIANTS,
+    FakeMetadataDbClient,
+    generate_records,
+    load_sample_record,
+)
+from benchmarks.run_benchmarks import bench_fetch_strategies
+
+
+class RecordGeneratorTest(unittest.TestCase):
+    """Synthetic record generator tests."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Generate the records once"""
+        cls.base = load_sample_record()
+        cls.records = generate_records(8, base_record=cls.base, seed=1)
+
+    def test_variants(self):
+        """Records cycle through the variants with unique locations"""
+        self.assertEqual(
+            [r["_variant"] for r in self.records], VARIANTS + VARIANTS
+        )
+        locations = {r["location"] for r in self.records}
+        self.assertEqual(len(locations), 8)
+
+        missing = self.records[2]
+        self.assertTrue(any(not missing.get(name) for name in CORE_FILES[:-1]))
+        huge = self.records[3]
+        self.assertEqual(
+            len(huge["acquisition"]["stimulus_epochs"]),
+            20 * len(self.base["acquisition"]["stimulus_epochs"]),
+        )
+        self.assertNotEqual(self.records[1], self.records[0])
+
+    def test_deterministic(self):
+        """The same seed gives the same records"""
+        self.assertEqual(
+            generate_records(4, base_record=self.base, seed=1),
+            self.records[:4],
+        )
+
+    def test_fake_client(self):
+        """The fake client filters, projects and counts requests"""
+        client = FakeMetadataDbClient(self.records[:2])
+        location = self.records[0]["location"]
+        response = client.retrieve_docdb_records(
+            filter_query={"location": {"$in": [location]}}
+        )
+        self.assertEqual(response, [self.records[0]])
+        response = client.retrieve_docdb_records(
+            projection={"location": 1, "_last_modified": 1}
+        )
+        self.assertEqual(set(response[0]), {"location", "_last_modified"})
+        self.assertEqual(client.requests, 2)
+
+    def test_fake_client_id_pages(self):
+        """The fake client pages through _id ranges"""
+        client = FakeMetadataDbClient(self.records)
+        query = {"$and": [{}, {"_id": {"$gt": self.records[5]["_id"]}}]}
+        response = client.retrieve_docdb_records(
+            filter_query=query, sort={"_id": 1}, limit=1
+        )
+        self.assertEqual(response, [self.records[6]])
+
+    def test_fetch_strategies(self):
+        """_id ranges take fewer requests than lists of locations"""
+        results = {
+            result["name"]: result
+            for result in bench_fetch_strategies(1200, request_latency=0)
+        }
+        self.assertEqual(results["fetch[location]"]["requests"], 24)
+        self.assertEqual(results["fetch[id_range]"]["requests"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+"""Test the content-hash validation cache."""
+
+import copy
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from aind_metadata_validator.cache import ValidationCache, content_hash
+from aind_metadata_validator.core_validator import validate_core_metadata
+from aind_metadata_validator.metadata_validator import validate_metadata
+from aind_metadata_validator.utils import MetadataState, ValidationEngine
+
+
+class ContentHashTest(unittest.TestCase):
+    """content_hash tests."""
+
+    def test_key_order(self):
+        """Key order does not change the hash, content does"""
+        self.assertEqual(
+            content_hash({"a": 1, "b": [1, 2]}),
+            content_hash({"b": [1, 2], "a": 1}),
+        )
+        self.assertNotEqual(content_hash({"a": 1}), content_hash({"a": 2}))
+
+
+class ValidationCacheTest(unittest.TestCase):
+    """ValidationCache tests."""
+
+    def test_get_put_and_counters(self):
+        """Entries roundtrip as MetadataState and lookups are counted"""
+        cache = ValidationCache()
+        key = cache.make_key("subject", {"subject_id": "1"}, "legacy")
+        self.assertIsNone(cache.get(key))
+        cache.put(key, MetadataState.VALID, {"subject_id": 2})
+        self.assertEqual(
+            cache.get(key),
+            (MetadataState.VALID, {"subject_id": MetadataState.VALID}),
+        )
+        self.assertEqual(
+            cache.stats(),
+            {"entries": 1, "hits": 1, "misses": 1, "hit_rate": 0.5},
+        )
+        self.assertEqual(ValidationCache().stats()["hit_rate"], 0.0)
+
+    def test_key_parts(self):
+        """Keys differ by core file name and engine"""
+        data = {"subject_id": "1"}
+        self.assertNotEqual(
+            ValidationCache.make_key("subject", data, "legacy"),
+            ValidationCache.make_key("procedures", data, "legacy"),
+        )
+        self.assertNotEqual(
+            ValidationCache.make_key("subject", data, "legacy"),
+            ValidationCache.make_key("subject", data, "single_pass"),
+        )
+
+    def test_lru_eviction(self):
+        """The least recently used entry is evicted"""
+        cache = ValidationCache(maxsize=2)
+        cache.put(("a",), MetadataState.VALID, {})
+        cache.put(("b",), MetadataState.VALID, {})
+        cache.get(("a",))
+        cache.put(("c",), MetadataState.VALID, {})
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(("b",)))
+        self.assertIsNotNone(cache.get(("a",)))
+
+    def test_save_and_load(self):
+        """Entries persist across caches, other versions are dropped"""
+        cache = ValidationCache()
+        key = cache.make_key("subject", {"subject_id": "1"}, "legacy")
+        cache.put(key, MetadataState.PRESENT, {"subject_id": 1})
+        cache.put(key[:3] + ("0.0.0", "0.0.0"), MetadataState.VALID, {})
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "cache.json"
+            cache.save(path)
+            loaded = ValidationCache()
+            self.assertEqual(loaded.load(path), 1)
+            self.assertEqual(
+                loaded.get(key),
+                (MetadataState.PRESENT, {"subject_id": MetadataState.PRESENT}),
+            )
+            self.assertEqual(loaded.load(Path(tmpdir) / "missing.json"), 0)
+
+
+class CachedValidationTest(unittest.TestCase):
+    """validate_metadata with a cache."""
+
+    def setUp(self):
+        """Load example data"""
+        with open("./tests/resources/metadata.json") as f:
+            self.data = json.load(f)
+
+    def test_cached_results_match(self):
+        """Cached core and field states match validating again"""
+        for engine in ValidationEngine:
+            cache = ValidationCache()
+            expected = validate_metadata(
+                copy.deepcopy(self.data), None, engine
+            )
+            first = validate_metadata(
+                copy.deepcopy(self.data), None, engine, cache
+            )
+            with patch(
+                "aind_metadata_validator.metadata_validator."
+                "validate_core_metadata",
+                wraps=validate_core_metadata,
+            ) as mock_core, patch(
+                "aind_metadata_validator.metadata_validator."
+                "_parse_core_file"
+            ) as mock_parse:
+                second = validate_metadata(
+                    copy.deepcopy(self.data), None, engine, cache
+                )
+            # Only empty core files, which are not cached, are validated
+            for call in mock_core.call_args_list:
+                self.assertFalse(call.args[1])
+            mock_parse.assert_not_called()
+            self.assertEqual(first, expected)
+            self.assertEqual(second, expected)
+            self.assertEqual(cache.hits, cache.misses)
+
+
+if __name__ == "__main__":
+    unittest.main()
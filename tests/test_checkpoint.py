@@ -0,0 +1,107 @@
+"""Test the checkpoint journal."""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from aind_metadata_validator.checkpoint import CheckpointJournal
+from aind_metadata_validator.utils import MetadataState
+
+
+class CheckpointJournalTest(unittest.TestCase):
+    """CheckpointJournal tests."""
+
+    def setUp(self):
+        """Create a journal path"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmpdir.name) / "checkpoint.jsonl"
+
+    def tearDown(self):
+        """Remove the journal"""
+        self.tmpdir.cleanup()
+
+    def test_round_trip(self):
+        """Journaled results are read back with their states"""
+        result = {
+            "_id": "id0",
+            "location": "a",
+            "_last_modified": None,
+            "validator_version": "1",
+            "metadata": MetadataState.VALID,
+            "subject": MetadataState.MISSING,
+            "not_a_column": 1,
+        }
+        with CheckpointJournal.create(self.path) as journal:
+            self.assertIsNone(journal.cursor)
+            journal.append([result])
+            journal.append([])
+
+        with open(self.path) as f:
+            header, line = json.loads(next(f)), json.loads(next(f))
+        (encoded,) = line["results"]
+        self.assertEqual(
+            len(encoded),
+            len(header["id_columns"]) + len(header["state_columns"]),
+        )
+        self.assertEqual(encoded[:4], ["id0", None, "1", "a"])
+        self.assertEqual(
+            sorted(state for state in encoded[4:] if state is not None),
+            sorted([MetadataState.VALID.value, MetadataState.MISSING.value]),
+        )
+
+        journal = CheckpointJournal.open(self.path)
+        journal.close()
+        self.assertEqual(
+            journal.chunks,
+            [{"chunk": 0, "cursor": "a"}, {"chunk": 1, "cursor": None}],
+        )
+        self.assertEqual(journal.cursor, None)
+        (read,) = journal.results()
+        self.assertEqual(
+            read,
+            {
+                "_id": "id0",
+                "location": "a",
+                "validator_version": "1",
+                "metadata": MetadataState.VALID,
+                "subject": MetadataState.MISSING,
+            },
+        )
+        self.assertIsInstance(read["metadata"], MetadataState)
+        self.assertEqual(list(journal.remaining("abc")), ["b", "c"])
+
+        journal.remove()
+        self.assertFalse(self.path.exists())
+        self.assertIsNone(CheckpointJournal.open(self.path))
+
+    def test_cut_line_dropped(self):
+        """A line cut short by a crash is dropped and overwritten"""
+        with CheckpointJournal.create(self.path) as journal:
+            journal.append([{"location": "a"}])
+        with open(self.path, "a") as f:
+            f.write('{"chunk": 1, "cursor": "b", "resu')
+
+        with CheckpointJournal.open(self.path) as journal:
+            self.assertEqual(len(journal.chunks), 1)
+            journal.append([{"location": "b"}])
+        with CheckpointJournal.open(self.path) as journal:
+            self.assertEqual(journal.cursor, "b")
+            self.assertEqual(list(journal.remaining("ab")), [])
+
+    def test_other_version_not_resumed(self):
+        """Journals of another validator version or other columns are not
+        resumed"""
+        CheckpointJournal.create(self.path).close()
+        with patch("aind_metadata_validator.checkpoint.version", "0.0.0"):
+            self.assertIsNone(CheckpointJournal.open(self.path))
+        with patch(
+            "aind_metadata_validator.checkpoint.mappings.STATE_COLUMNS", []
+        ):
+            self.assertIsNone(CheckpointJournal.open(self.path))
+        with patch("aind_metadata_validator.checkpoint.ID_COLUMNS", []):
+            self.assertIsNone(CheckpointJournal.open(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,386 @@
+"""Test fetching functions."""
+
+import threading
+import time
+import unittest
+from typing import Iterator
+from aind_metadata_validator.fetch import (
+    AdaptiveChunkSize,
+    fetch_ids_with_fields,
+    fetch_last_modified,
+    iter_concurrent_chunks,
+    iter_id_pages,
+    iter_id_range_chunks,
+    iter_record_chunks,
+    iter_unique_locations,
+    prefetch,
+)
+
+
+class FakeClient:
+    """Local stand-in for MetadataDbClient."""
+
+    def __init__(
+        self,
+        records: list = None,
+        delay: float = 0.0,
+        fail_on_call: int = None,
+    ):
+        """Set up the fake client
+
+        Without records, one record is made up for each requested location.
+        """
+        self.records = records
+        self.delay = delay
+        self.fail_on_call = fail_on_call
+        self.calls = 0
+        self.queries = []
+        self.lock = threading.Lock()
+
+    def retrieve_docdb_records(
+        self,
+        filter_query: dict = None,
+        projection: dict = None,
+        sort: dict = None,
+        limit: int = 0,
+    ):
+        """Return the records matching the filter and projection"""
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+            self.queries.append((filter_query, projection))
+        if call == self.fail_on_call:
+            raise ConnectionError("gateway error")
+        time.sleep(self.delay)
+
+        if self.records is None:
+            locations = filter_query["location"]["$in"]
+            return [{"location": location} for location in locations]
+
+        records = [
+            record
+            for record in self.records
+            if self._matches(record, filter_query or {})
+        ]
+        if sort:
+            records.sort(key=lambda record: record["_id"])
+        if limit:
+            records = records[:limit]
+        if projection:
+            records = [
+                {k: v for k, v in record.items() if k in projection}
+                for record in records
+            ]
+        return records
+
+    @classmethod
+    def _matches(cls, record: dict, query: dict) -> bool:
+        """Match the query operators used by the validator"""
+        for key, condition in query.items():
+            if key == "$and":
+                if not all(cls._matches(record, q) for q in condition):
+                    return False
+            elif "$in" in condition:
+                if record.get(key) not in condition["$in"]:
+                    return False
+            elif "$exists" in condition:
+                if (key in record) != condition["$exists"]:
+                    return False
+            elif not record.get(key) > condition["$gt"]:
+                return False
+        return True
+
+
+def serial_chunks(client, locations: list, chunk_size: int) -> Iterator:
+    """Fetch chunks of locations one request at a time, without retries"""
+    return iter_record_chunks(
+        client, locations, page_size=chunk_size, concurrency=1, retries=0
+    )
+
+
+class FetchTest(unittest.TestCase):
+    """Fetch tests."""
+
+    def test_location_chunks(self):
+        """Locations are requested in chunks of the given size"""
+        client = FakeClient()
+        chunks = list(serial_chunks(client, list(range(7)), 3))
+        self.assertEqual(client.calls, 3)
+        self.assertEqual(
+            [[r["location"] for r in chunk] for chunk in chunks],
+            [[0, 1, 2], [3, 4, 5], [6]],
+        )
+
+    def test_prefetch_keeps_order(self):
+        """Prefetched chunks arrive in the same order as serial fetches"""
+        serial = list(serial_chunks(FakeClient(), list(range(20)), 3))
+        prefetched = list(
+            prefetch(serial_chunks(FakeClient(), list(range(20)), 3), 2)
+        )
+        self.assertEqual(serial, prefetched)
+
+    def test_prefetch_overlaps_fetch_and_work(self):
+        """Fetching the next chunks happens while the consumer works"""
+        client = FakeClient(delay=0.05)
+        start = time.perf_counter()
+        for _ in prefetch(serial_chunks(client, list(range(5)), 1), 2):
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - start
+        # Serial fetch + work would take 0.5s
+        self.assertLess(elapsed, 0.45)
+
+    def test_prefetch_backpressure(self):
+        """The producer stops fetching once the buffer is full"""
+        client = FakeClient()
+        chunks = prefetch(serial_chunks(client, list(range(100)), 1), 2)
+        next(chunks)
+        time.sleep(0.3)
+        # One consumed, two buffered, one waiting to be buffered
+        self.assertLessEqual(client.calls, 4)
+        chunks.close()
+        self.assertLess(client.calls, 100)
+
+    def test_prefetch_reraises_errors(self):
+        """Errors raised while fetching reach the consumer"""
+        client = FakeClient(fail_on_call=2)
+        chunks = prefetch(serial_chunks(client, list(range(5)), 1), 2)
+        self.assertEqual(next(chunks), [{"location": 0}])
+        self.assertRaises(ConnectionError, next, chunks)
+
+    def test_fetch_last_modified(self):
+        """Only the projected fields are fetched, in retried pages"""
+        client = FakeClient(
+            records=[
+                {"_id": 1, "location": "a", "_last_modified": "1", "x": {}},
+                {"_id": 2, "location": "b", "_last_modified": "2", "x": {}},
+                {"_id": 3, "location": "b", "_last_modified": "3", "x": {}},
+            ],
+            fail_on_call=2,
+        )
+        with self.assertLogs("aind_metadata_validator", level="WARNING"):
+            last_modified = fetch_last_modified(
+                client, page_size=2, retries=1, backoff=0
+            )
+        self.assertEqual(last_modified, {"a": "1", "b": None})
+        # 2 pages and one retry
+        self.assertEqual(client.calls, 3)
+        self.assertNotIn("x", client.queries[0][1])
+
+    def test_fetch_ids_with_fields(self):
+        """Records with a field are listed by _id, null fields included"""
+        client = FakeClient(
+            records=[
+                {"_id": 1, "subject": {"subject_id": "1"}, "model": None},
+                {"_id": 2, "subject": None},
+                {"_id": 3},
+            ]
+        )
+        self.assertEqual(
+            fetch_ids_with_fields(client, ["subject", "model"], page_size=2),
+            {"subject": {1, 2}, "model": {1}},
+        )
+        self.assertEqual(
+            {tuple(projection) for _, projection in client.queries}, {("_id",)}
+        )
+
+    def test_iter_id_pages(self):
+        """Pages follow _id order, each starting after the previous one"""
+        records = [
+            {"_id": f"id{i:02d}", "location": f"loc{i % 4}", "name": "x"}
+            for i in reversed(range(10))
+        ]
+        client = FakeClient(records=records)
+        pages = list(iter_id_pages(client, 4, {"_id": 1, "location": 1}))
+        self.assertEqual([len(page) for page in pages], [4, 4, 2])
+        self.assertEqual(pages[1][0], {"_id": "id04", "location": "loc0"})
+        self.assertEqual(
+            client.queries[1][0],
+            {"$and": [{}, {"_id": {"$gt": "id03"}}]},
+        )
+        self.assertEqual(
+            list(iter_unique_locations(pages)),
+            ["loc0", "loc1", "loc2", "loc3"],
+        )
+
+        # A full last page takes one more request to find the end
+        client = FakeClient(records=records[2:])
+        self.assertEqual(len(list(iter_id_pages(client, 4))), 2)
+        self.assertEqual(client.calls, 3)
+
+    def test_iter_unique_locations_lazy(self):
+        """Locations are yielded before later pages are fetched"""
+        client = FakeClient(
+            records=[{"_id": i, "location": f"loc{i}"} for i in range(10)]
+        )
+        locations = iter_unique_locations(iter_id_pages(client, 2))
+        self.assertEqual(next(locations), "loc0")
+        self.assertEqual(client.calls, 1)
+        chunks = iter_concurrent_chunks(FakeClient(), locations, 3, 2)
+        self.assertEqual(
+            [[r["location"] for r in chunk] for chunk in chunks],
+            [
+                ["loc1", "loc2", "loc3"],
+                ["loc4", "loc5", "loc6"],
+                ["loc7", "loc8", "loc9"],
+            ],
+        )
+        self.assertEqual(client.calls, 6)
+
+    def test_iter_id_range_chunks(self):
+        """Pages of every record keep the records of the locations"""
+        records = [
+            {"_id": f"id{i:02d}", "location": f"loc{i % 5}", "name": "x"}
+            for i in range(10)
+        ]
+        client = FakeClient(records=records, fail_on_call=2)
+        with self.assertLogs("aind_metadata_validator", level="WARNING"):
+            chunks = list(
+                iter_id_range_chunks(
+                    client,
+                    iter(["loc1", "loc3"]),
+                    page_size=3,
+                    projection={"name": 1},
+                    backoff=0,
+                )
+            )
+        self.assertEqual(
+            chunks,
+            [
+                [{"_id": "id01", "location": "loc1", "name": "x"}],
+                [{"_id": "id03", "location": "loc3", "name": "x"}],
+                [
+                    {"_id": "id06", "location": "loc1", "name": "x"},
+                    {"_id": "id08", "location": "loc3", "name": "x"},
+                ],
+            ],
+        )
+        # 4 pages, the last one short, and one retry
+        self.assertEqual(client.calls, 5)
+
+        client = FakeClient(records=records, fail_on_call=1)
+        chunks = iter_id_range_chunks(client, ["loc1"], retries=0)
+        self.assertRaises(ConnectionError, list, chunks)
+
+    def test_iter_record_chunks(self):
+        """Both strategies fetch the same records"""
+        records = [
+            {"_id": f"id{i:02d}", "location": f"loc{i}"} for i in range(10)
+        ]
+        locations = [f"loc{i}" for i in range(0, 10, 2)]
+        by_strategy = {}
+        for strategy in ["location", "id_range"]:
+            client = FakeClient(records=records)
+            by_strategy[strategy] = [
+                record
+                for chunk in iter_record_chunks(
+                    client,
+                    locations,
+                    strategy,
+                    page_size=4,
+                    projection={"_id": 1, "location": 1},
+                )
+                for record in chunk
+            ]
+            self.assertIsNotNone(client.queries[0][1])
+        self.assertEqual(
+            [record["location"] for record in by_strategy["location"]],
+            locations,
+        )
+        self.assertEqual(by_strategy["id_range"], by_strategy["location"])
+        self.assertRaises(
+            ValueError, iter_record_chunks, client, locations, "other"
+        )
+        self.assertRaises(
+            ValueError, iter_record_chunks, client, None, "location"
+        )
+
+    def test_iter_id_range_chunks_every_record(self):
+        """Without locations every record with a location is kept"""
+        records = [
+            {"_id": f"id{i:02d}", "location": f"loc{i}"} for i in range(5)
+        ]
+        records.append({"_id": "id99", "location": None})
+        client = FakeClient(records=records)
+        chunks = list(iter_record_chunks(client, None, "id_range", 4))
+        self.assertEqual(chunks, [records[:4], records[4:5]])
+        self.assertEqual(client.calls, 2)
+
+
+class ConcurrentFetchTest(unittest.TestCase):
+    """Concurrent fetch tests."""
+
+    def test_adaptive_chunk_size(self):
+        """The size follows the latency, within a factor 2 and the bounds"""
+        size = AdaptiveChunkSize(initial=10, minimum=2, maximum=40)
+        # 10 locations in 0.5s, 40 would take 2s but growth is capped at 2x
+        self.assertEqual(size.update(10, 10, 0.5), 20)
+        self.assertEqual(size.update(20, 20, 0.0), 40)
+        self.assertEqual(size.update(40, 40, 0.1), 40)
+        # Slow requests halve the size at most, records count as locations
+        self.assertEqual(size.update(40, 80, 100.0), 20)
+        self.assertEqual(size.update(20, 20, 20.0), 10)
+        for _ in range(5):
+            size.update(1, 1, 100.0)
+        self.assertEqual(size.size, 2)
+
+    def test_ordered_matches_serial(self):
+        """Concurrent chunks arrive in the same order as serial fetches"""
+        serial = list(serial_chunks(FakeClient(), list(range(20)), 3))
+        concurrent = list(
+            iter_concurrent_chunks(FakeClient(), list(range(20)), 3, 4)
+        )
+        self.assertEqual(serial, concurrent)
+
+    def test_requests_overlap(self):
+        """Up to concurrency requests run at a time"""
+        client = FakeClient(delay=0.1)
+        start = time.perf_counter()
+        chunks = list(iter_concurrent_chunks(client, list(range(8)), 1, 4))
+        elapsed = time.perf_counter() - start
+        self.assertEqual(len(chunks), 8)
+        # Serial requests would take 0.8s
+        self.assertLess(elapsed, 0.6)
+
+    def test_unordered_and_adaptive(self):
+        """Unordered chunks hold every location, adaptive sizes grow"""
+        size = AdaptiveChunkSize(initial=2, maximum=64)
+        chunks = list(
+            iter_concurrent_chunks(
+                FakeClient(), list(range(100)), size, 3, ordered=False
+            )
+        )
+        locations = [r["location"] for chunk in chunks for r in chunk]
+        self.assertEqual(sorted(locations), list(range(100)))
+        self.assertLess(len(chunks), 50)
+
+    def test_retries(self):
+        """Failed requests are retried, or raised without retries left"""
+        client = FakeClient(fail_on_call=2)
+        with self.assertLogs("aind_metadata_validator", level="WARNING"):
+            chunks = list(
+                iter_concurrent_chunks(
+                    client, list(range(4)), 1, 1, retries=1, backoff=0
+                )
+            )
+        self.assertEqual(chunks, [[{"location": i}] for i in range(4)])
+        self.assertEqual(client.calls, 5)
+
+        client = FakeClient(fail_on_call=2)
+        chunks = iter_concurrent_chunks(client, list(range(4)), 1, 1, 0)
+        self.assertEqual(next(chunks), [{"location": 0}])
+        self.assertRaises(ConnectionError, next, chunks)
+
+    def test_early_close(self):
+        """Closing the generator stops requesting chunks"""
+        client = FakeClient(delay=0.01)
+        chunks = iter_concurrent_chunks(client, list(range(100)), 1, 2)
+        next(chunks)
+        chunks.close()
+        calls = client.calls
+        time.sleep(0.05)
+        self.assertEqual(client.calls, calls)
+        self.assertLess(calls, 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,21 @@
 """Field validator tests"""
 
-from typing import Annotated, Optional, Union
+from typing import Annotated, Literal, Optional, Union
 import unittest
 import json
+from unittest.mock import patch
+from pydantic import BaseModel, ConfigDict, Field
 from aind_data_schema.components.devices import Device
 from aind_data_schema_models.data_name_patterns import DataLevel
 from aind_data_schema_models.organizations import Organization
 from aind_metadata_validator.utils import MetadataState
+from aind_metadata_validator.mappings import SECOND_LAYER_MAPPING
 from aind_metadata_validator.field_validator import (
+    compile_field_validators,
+    FIELD_VALIDATORS,
+    TaggedModelUnion,
+    compile_field,
+    union_state,
     validate_field_metadata,
     validate_field,
     validate_field_list,
@@ -250,5 +258,226 @@ class TestValidateFieldMetadata(unittest.TestCase):
         )
 
 
+class _Lens(BaseModel):
+    """Model used to build unions of models"""
+
+    model_config = ConfigDict(extra="forbid")
+
+    focal_length: float
+
+
+class _Camera(BaseModel):
+    """Member of a discriminated union"""
+
+    object_type: Literal["Camera"] = "Camera"
+    name: str
+
+
+class _Lamp(BaseModel):
+    """Member of a discriminated union"""
+
+    object_type: Literal["Lamp"] = "Lamp"
+    wavelength: int
+
+
+_Tagged = Annotated[Union[_Camera, _Lamp], Field(discriminator="object_type")]
+
+
+class TestCompiledFieldValidators(unittest.TestCase):
+    """Test compiled field validators"""
+
+    def test_compiled_matches_validate_field(self):
+        """Compiled validators return the same states as validate_field"""
+        cases = [
+            (str, ["string", 1, None]),
+            (Optional[str], ["string", 1, None, ""]),
+            (list[Annotated[Union[str, int], "none"]], [1, [1, "a"], []]),
+            (list[Optional[int]], [[1, None], ["a"]]),
+            (Annotated[Optional[int], "none"], [1, "a"]),
+            (str | int, [1, {"a": 1}]),
+            (dict[str, str], [{"a": 1}]),
+            (list[dict[str, int]], [[{"a": 1}], [{"a": "b"}], []]),
+            (DataLevel, [DataLevel.DERIVED.value, "not a level"]),
+        ]
+        for origin_type in [None, Optional, Union]:
+            validator = compile_field(origin_type, str)
+            self.assertEqual(
+                validator("string"),
+                validate_field("string", origin_type, str),
+            )
+        for expected_class, values in cases:
+            origin_type = getattr(expected_class, "__origin__", None)
+            validator = compile_field(origin_type, expected_class)
+            for value in values:
+                self.assertEqual(
+                    validator(value),
+                    validate_field(value, origin_type, expected_class),
+                )
+
+    def test_model_fast_paths(self):
+        """Lists and unions of models validated in one call match legacy"""
+        device = {"name": "device_name"}
+        lens = {"focal_length": 1.0}
+        cases = [
+            (
+                list[Device],
+                [[device, device], [device, {"bad": 1}], [device, {}], []],
+            ),
+            (
+                list[Annotated[Union[Device, _Lens], "none"]],
+                [[device, lens], [device, {"bad": 1}], ["a"]],
+            ),
+            (Optional[Device], [device, {"bad": 1}, None, {}, "a"]),
+            (Union[Device, str], [device]),
+        ]
+        for expected_class, values in cases:
+            origin_type = getattr(expected_class, "__origin__", None)
+            validator = compile_field(origin_type, expected_class)
+            for value in values:
+                self.assertEqual(
+                    validator(value),
+                    validate_field(value, origin_type, expected_class),
+                )
+
+    def test_empty_data(self):
+        """Every compiled field gives validate_field's state for empty data,
+        unions without trying their members"""
+        for fields in SECOND_LAYER_MAPPING.values():
+            for expected_class in fields.values():
+                origin_type = getattr(expected_class, "__origin__", None)
+                validator = compile_field(origin_type, expected_class)
+                for value in [None, {}, "", 0]:
+                    self.assertEqual(
+                        validator(value),
+                        validate_field(value, origin_type, expected_class),
+                    )
+
+        validator = compile_field(Union, Union[int, None])
+        self.assertEqual(
+            validator.keywords["empty_state"], MetadataState.OPTIONAL
+        )
+        with patch(
+            "aind_metadata_validator.field_validator.try_instantiate"
+        ) as try_instantiate:
+            self.assertEqual(validator(None), MetadataState.OPTIONAL)
+        try_instantiate.assert_not_called()
+
+    def test_unresolvable_type_falls_back(self):
+        """Types that can't be compiled are validated on each call"""
+        validator = compile_field(list, list)
+        self.assertEqual(validator("not a list"), MetadataState.PRESENT)
+
+    def test_every_field_compiled(self):
+        """Every field of every core file has a compiled validator"""
+        for core_file_name, fields in SECOND_LAYER_MAPPING.items():
+            self.assertEqual(
+                set(FIELD_VALIDATORS[core_file_name]), set(fields)
+            )
+
+    def test_adapters_built_on_first_use(self):
+        """Compiling doesn't build the adapters of a field"""
+        validator = compile_field(list, list[_Lens])
+        adapter = validator.keywords["union"].adapter
+        self.assertIsNone(adapter._adapter)
+        self.assertEqual(
+            validator([{"focal_length": 1.0}]), MetadataState.VALID
+        )
+        self.assertIsNotNone(adapter._adapter)
+
+    def test_discriminated_union(self):
+        """Tagged data is validated against its member, like legacy"""
+        camera = {"object_type": "Camera", "name": "cam"}
+        lamp = {"object_type": "Lamp", "wavelength": 488}
+        cases = [
+            (
+                list[_Tagged],
+                [
+                    [camera, lamp],
+                    [camera, dict(lamp, wavelength="blue")],
+                    [{"name": "untagged"}, lamp],
+                    [{"object_type": "Unknown", "name": "cam"}],
+                    [camera, "a"],
+                    [dict(camera, name=None), "a"],
+                ],
+            ),
+            (_Tagged, [camera, dict(camera, name=None), {"name": "cam"}]),
+        ]
+        for expected_class, values in cases:
+            origin_type = getattr(expected_class, "__origin__", None)
+            validator = compile_field(origin_type, expected_class)
+            for value in values:
+                self.assertEqual(
+                    validator(value),
+                    validate_field(value, origin_type, expected_class),
+                )
+
+        validator = compile_field(list, list[_Tagged])
+        self.assertEqual(validator([camera, lamp]), MetadataState.VALID)
+        self.assertIsNotNone(
+            validator.keywords["tagged"].list_adapter._adapter
+        )
+        self.assertIsNone(validator.keywords["union"].adapter._adapter)
+
+    def test_tagged_union_requires_literal_tags(self):
+        """Only unions of models with a Literal discriminator are tagged"""
+        self.assertIsNotNone(TaggedModelUnion.from_annotation(_Tagged))
+        self.assertIsNone(
+            TaggedModelUnion.from_annotation(Union[_Camera, _Lamp])
+        )
+        self.assertIsNone(
+            TaggedModelUnion.from_annotation(
+                Annotated[Union[_Camera, _Lens], Field(discriminator="x")]
+            )
+        )
+        self.assertIsNone(
+            TaggedModelUnion.from_annotation(
+                Annotated[Union[_Camera, _Lamp], Field(discriminator="name")]
+            )
+        )
+
+    @patch("aind_metadata_validator.field_validator.UNION_REORDER_INTERVAL", 2)
+    def test_union_members_reordered_by_matches(self):
+        """Members that match most often are tried first"""
+        validator = compile_field(Union, Union[int, str])
+        for _ in range(2):
+            self.assertEqual(validator("a"), MetadataState.VALID)
+        self.assertEqual(validator.keywords["members"].members, (str, int))
+        self.assertEqual(validator(1), MetadataState.VALID)
+        self.assertEqual(validator(None), MetadataState.MISSING)
+
+        validator = compile_field(Union, Union[Device, _Lens])
+        union = validator.keywords["union"]
+        for _ in range(2):
+            self.assertEqual(
+                validator({"focal_length": 1.0}), MetadataState.VALID
+            )
+        self.assertEqual(union.members.members, (_Lens, Device))
+        self.assertEqual(
+            validator({"name": "device_name"}), MetadataState.VALID
+        )
+        self.assertEqual(validator({"bad": 1}), MetadataState.PRESENT)
+
+    def test_union_state_stops_at_valid(self):
+        """Member states after the first VALID one are not computed"""
+        states = iter(
+            [MetadataState.MISSING, MetadataState.VALID, MetadataState.PRESENT]
+        )
+        self.assertEqual(union_state(states), MetadataState.VALID)
+        self.assertEqual(list(states), [MetadataState.PRESENT])
+        self.assertEqual(
+            union_state([MetadataState.MISSING, MetadataState.OPTIONAL]),
+            MetadataState.OPTIONAL,
+        )
+
+    def test_compile_field_validators(self):
+        """Compiling a whole mapping gives the same fields as the lazy one"""
+        subject = {"subject": SECOND_LAYER_MAPPING["subject"]}
+        compiled = compile_field_validators(subject)
+        self.assertEqual(set(compiled), {"subject"})
+        self.assertEqual(
+            set(compiled["subject"]), set(FIELD_VALIDATORS["subject"])
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,64 @@
+"""Test import time."""
+
+import os
+import subprocess
+import sys
+import unittest
+
+# Seconds allowed for importing sync, override with IMPORT_TIME_BUDGET
+IMPORT_TIME_BUDGET = float(os.getenv("IMPORT_TIME_BUDGET", "2.0"))
+
+
+def import_times(statement: str) -> dict:
+    """Run a statement with -X importtime in a fresh interpreter
+
+    Returns
+    -------
+    dict
+        Module name -> cumulative import time in seconds
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+class ImportTimeTest(unittest.TestCase):
+    """Import time tests."""
+
+    def test_sync_import_budget(self):
+        """Importing sync doesn't import aind-data-schema or connect"""
+        times = import_times(
+            "import aind_metadata_validator.sync as sync; "
+            "assert 'client' not in vars(sync)"
+        )
+        schema_modules = [
+            name for name in times if name.startswith("aind_data_schema")
+        ]
+        self.assertEqual(schema_modules, [])
+        self.assertLess(
+            times["aind_metadata_validator.sync"], IMPORT_TIME_BUDGET
+        )
+
+    def test_validator_modules_import_lazily(self):
+        """Mappings and field validators are only built when used"""
+        times = import_times(
+            "import aind_metadata_validator.field_validator, "
+            "aind_metadata_validator.core_validator"
+        )
+        self.assertFalse(
+            any(name.startswith("aind_data_schema") for name in times)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
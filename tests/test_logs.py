@@ -0,0 +1,153 @@
+"""Test validator logging."""
+
+import io
+import json
+import logging
+import sys
+import unittest
+from aind_metadata_validator.field_validator import iter_expected_fields
+from aind_metadata_validator.logs import (
+    EventLog,
+    StructuredFormatter,
+    configure_logging,
+    events,
+    logger,
+)
+
+
+class EventLogTest(unittest.TestCase):
+    """EventLog tests."""
+
+    def test_repeated_events_logged_once(self):
+        """Events past the limit are only logged at DEBUG and counted"""
+        log = EventLog(limit=1)
+        with self.assertLogs(logger, level="DEBUG") as cm:
+            for _ in range(3):
+                log.event(logging.WARNING, "unknown_field", "x", "field %s", 1)
+            log.event(logging.INFO, "ignored_field", "y", "field y")
+        self.assertEqual(
+            [record.levelno for record in cm.records],
+            [logging.WARNING, logging.DEBUG, logging.DEBUG, logging.INFO],
+        )
+        self.assertEqual(cm.records[0].getMessage(), "field 1")
+        self.assertEqual(cm.records[0].event, "unknown_field")
+        self.assertEqual(
+            log.summary(),
+            [
+                {
+                    "event": "unknown_field",
+                    "key": "x",
+                    "level": "WARNING",
+                    "count": 3,
+                },
+                {
+                    "event": "ignored_field",
+                    "key": "y",
+                    "level": "INFO",
+                    "count": 1,
+                },
+            ],
+        )
+
+    def test_flush(self):
+        """Flushing logs one line per event with its count and resets"""
+        log = EventLog(limit=0)
+        for _ in range(12):
+            log.event(logging.WARNING, "unknown_field", "x", "field x")
+        with self.assertLogs(logger, level="INFO") as cm:
+            summary = log.flush()
+        self.assertEqual(summary[0]["count"], 12)
+        self.assertEqual(
+            cm.records[0].getMessage(),
+            "(METADATA_VALIDATOR): unknown_field x, 12 occurrences",
+        )
+        self.assertEqual(log.summary(), [])
+
+    def test_take_and_merge(self):
+        """Events taken from a log are merged into another one"""
+        worker = EventLog(limit=1)
+        parent = EventLog()
+        with self.assertLogs(logger, level="DEBUG") as cm:
+            for _ in range(2):
+                worker.event(logging.WARNING, "unknown_field", "x", "x")
+            parent.merge(worker.take())
+            worker.event(logging.WARNING, "unknown_field", "x", "x")
+            parent.merge(worker.take())
+        self.assertEqual(
+            [record.levelno for record in cm.records],
+            [logging.WARNING, logging.DEBUG, logging.DEBUG],
+        )
+        self.assertEqual(worker.take(), [])
+        self.assertEqual(parent.summary(), worker.summary())
+        self.assertEqual(parent.summary()[0]["count"], 3)
+        self.assertEqual(
+            parent.levels[("unknown_field", "x")], logging.WARNING
+        )
+
+    def test_iter_expected_fields_counts(self):
+        """Unknown and ignored fields are counted per core file and field"""
+        events.reset()
+        data = {"a": 1, "unknown": 2, "object_type": "Subject"}
+        with self.assertLogs(logger, level="DEBUG"):
+            for _ in range(2):
+                fields = list(
+                    iter_expected_fields("subject", data, {"a": int})
+                )
+        self.assertEqual(fields, [("a", 1, int)])
+        self.assertEqual(
+            events.counts[("unknown_field", "subject.unknown")], 2
+        )
+        self.assertEqual(
+            events.counts[("ignored_field", "subject.object_type")], 2
+        )
+        events.reset()
+
+
+class ConfigureLoggingTest(unittest.TestCase):
+    """configure_logging tests."""
+
+    def tearDown(self):
+        """Restore the default logging configuration"""
+        logging.basicConfig(handlers=[logging.NullHandler()], force=True)
+        logger.setLevel(logging.NOTSET)
+
+    def test_structured_and_quiet(self):
+        """Structured logs are JSON lines, quiet drops validator info"""
+        stream = io.StringIO()
+        configure_logging(
+            quiet=True,
+            structured=True,
+            handler=logging.StreamHandler(stream),
+        )
+        logger.info("hidden")
+        logger.warning("shown %s", "once", extra={"event": "e", "key": "k"})
+        logging.getLogger("other").info("app")
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(
+            [line["message"] for line in lines], ["shown once", "app"]
+        )
+        self.assertEqual(lines[0]["event"], "e")
+        self.assertEqual(lines[0]["key"], "k")
+        self.assertEqual(lines[0]["level"], "WARNING")
+
+    def test_plain(self):
+        """Plain logs use the text format, exceptions are formatted"""
+        stream = io.StringIO()
+        configure_logging(handler=logging.StreamHandler(stream))
+        logger.info("plain")
+        self.assertIn(
+            "aind_metadata_validator - INFO - plain", stream.getvalue()
+        )
+
+        try:
+            raise ValueError("bad")
+        except ValueError:
+            record = logger.makeRecord(
+                logger.name, logging.ERROR, "", 0, "failed", (), sys.exc_info()
+            )
+        entry = json.loads(StructuredFormatter().format(record))
+        self.assertIn("ValueError: bad", entry["exc_info"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,15 @@
 """Test mappings."""
 
 import unittest
+from aind_metadata_validator import mappings
 from aind_metadata_validator.mappings import (
     FIRST_LAYER_MAPPING,
+    LazyCoreMapping,
+    gen_first_layer_mapping,
+    gen_second_layer_mapping,
     SECOND_LAYER_MAPPING,
+    RESULT_COLUMNS,
+    STATE_COLUMNS,
     unwrap_annotated,
 )
 from aind_data_schema.core.acquisition import Acquisition
@@ -31,6 +37,64 @@ class MappingTest(unittest.TestCase):
             SECOND_LAYER_MAPPING["acquisition"]["notes"], Optional[str]
         )
 
+    def test_result_columns(self):
+        """Check that result columns cover every core file field"""
+        self.assertEqual(STATE_COLUMNS[:2], ["metadata", "subject"])
+        self.assertIn("acquisition.protocol_id", STATE_COLUMNS)
+        self.assertEqual(RESULT_COLUMNS[0], "_id")
+        self.assertEqual(RESULT_COLUMNS[-1], "location")
+        self.assertEqual(len(RESULT_COLUMNS), len(set(RESULT_COLUMNS)))
+
+    def test_lazy_mappings_match_eager(self):
+        """Mappings built per core file match building them all at once"""
+        self.assertEqual(gen_first_layer_mapping(), dict(FIRST_LAYER_MAPPING))
+        core_files = mappings.CORE_FILES
+        self.assertEqual(
+            gen_second_layer_mapping(
+                [FIRST_LAYER_MAPPING[name] for name in core_files]
+            ),
+            {name: SECOND_LAYER_MAPPING[name] for name in core_files},
+        )
+
+    def test_lazy_core_mapping(self):
+        """Values are built once per core file, on first access"""
+        built = []
+
+        def build(core_file_name):
+            """Record the core files that are built"""
+            built.append(core_file_name)
+            return core_file_name.upper()
+
+        mapping = LazyCoreMapping(build)
+        self.assertIn("subject", mapping)
+        self.assertNotIn("metadata", mapping)
+        self.assertEqual(built, [])
+
+        self.assertEqual(mapping["subject"], "SUBJECT")
+        self.assertEqual(mapping["subject"], "SUBJECT")
+        self.assertEqual(built, ["subject"])
+        with self.assertRaises(KeyError):
+            mapping["metadata"]
+
+        mapping["extra"] = "EXTRA"
+        self.assertEqual(list(mapping)[-1], "extra")
+        self.assertEqual(len(mapping), len(mappings.CORE_FILES) + 1)
+        del mapping["extra"]
+        self.assertNotIn("extra", mapping)
+
+        mapping.clear()
+        self.assertEqual(
+            mapping.copy(),
+            {name: name.upper() for name in mappings.CORE_FILES},
+        )
+        self.assertEqual(built.count("subject"), 2)
+
+    def test_lazy_attributes(self):
+        """Column lists are computed once, unknown attributes raise"""
+        self.assertIs(mappings.STATE_COLUMNS, STATE_COLUMNS)
+        with self.assertRaises(AttributeError):
+            mappings.UNKNOWN_COLUMNS
+
     def test_unwrap(self):
         """Check that the unwrap function works"""
         self.assertEqual(unwrap_annotated(Annotated[str, "none"]), str)
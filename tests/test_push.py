@@ -0,0 +1,133 @@
+"""Test pushing results to the results table."""
+
+import unittest
+import pandas as pd
+from biodata_cache.backend import MemoryBackend
+from aind_metadata_validator.push import (
+    diff_results,
+    push_delta,
+    row_checksums,
+    snapshot_checksums,
+    table_checksum,
+    verify_push,
+)
+from aind_metadata_validator.utils import MetadataState
+
+TABLE_NAME = "metadata_status_test"
+
+
+class _NoProjectionBackend(MemoryBackend):
+    """Backend that can only read whole tables"""
+
+    def read_filtered(self, table_name, **kwargs):
+        """Projections are not supported"""
+        raise NotImplementedError
+
+
+class _BrokenBackend(MemoryBackend):
+    """Backend whose reads fail"""
+
+    def read_filtered(self, table_name, **kwargs):
+        """Reads fail"""
+        raise ConnectionError("unreachable")
+
+
+class PushTest(unittest.TestCase):
+    """Delta push tests."""
+
+    def setUp(self):
+        """Previous results and a local stand-in for the cache backend"""
+        self.prev = [
+            {
+                "_id": f"id{i}",
+                "metadata": MetadataState.VALID,
+                "subject": MetadataState.PRESENT,
+                "_last_modified": "2025-01-01",
+                "validator_version": "0.0.0",
+                "location": f"loc{i}",
+            }
+            for i in range(4)
+        ]
+        self.df = pd.DataFrame(self.prev)
+        self.backend = MemoryBackend()
+        self.backend.write(TABLE_NAME, self.df)
+
+    def test_checksums_ignore_dtypes_and_order(self):
+        """Results hash the same after a CSV-style float roundtrip"""
+        floats = self.df.copy()
+        floats["metadata"] = floats["metadata"].astype(float)
+        floats["model"] = float("nan")
+        self.assertTrue(
+            row_checksums(floats).equals(snapshot_checksums(self.prev))
+        )
+        self.assertEqual(
+            table_checksum(row_checksums(self.df)),
+            table_checksum(row_checksums(self.df.iloc[::-1])),
+        )
+
+    def test_diff_results(self):
+        """Inserted, updated and deleted locations are found"""
+        new = self.df.drop(index=3).copy()
+        new.loc[1, "subject"] = MetadataState.VALID
+        new.loc[4] = dict(self.prev[0], _id="id4", location="loc4")
+        self.assertEqual(
+            diff_results(snapshot_checksums(self.prev), row_checksums(new)),
+            {"inserted": ["loc4"], "updated": ["loc1"], "deleted": ["loc3"]},
+        )
+        self.assertEqual(
+            diff_results(snapshot_checksums([]), row_checksums(self.df))[
+                "inserted"
+            ],
+            ["loc0", "loc1", "loc2", "loc3"],
+        )
+
+    def test_push_unchanged_skips_write(self):
+        """Unchanged results are not written"""
+        writes = []
+        self.backend.write = lambda name, df: writes.append(name)
+        pushed = push_delta(
+            TABLE_NAME, self.df, snapshot_checksums(self.prev), self.backend
+        )
+        self.assertFalse(pushed["pushed"])
+        self.assertTrue(pushed["verified"])
+        self.assertEqual(writes, [])
+
+    def test_push_changed(self):
+        """Changed results are written and verified"""
+        new = self.df.copy()
+        new.loc[0, "_last_modified"] = "2025-01-02"
+        pushed = push_delta(
+            TABLE_NAME, new, snapshot_checksums(self.prev), self.backend
+        )
+        self.assertEqual(pushed["updated"], ["loc0"])
+        self.assertTrue(pushed["pushed"])
+        self.assertTrue(pushed["verified"])
+        self.assertTrue(self.backend.read(TABLE_NAME).equals(new))
+
+    def test_push_stale_table(self):
+        """A table that doesn't match the snapshot is written anyway"""
+        self.backend.write(TABLE_NAME, self.df.iloc[:2])
+        pushed = push_delta(
+            TABLE_NAME, self.df, snapshot_checksums(self.prev), self.backend
+        )
+        self.assertTrue(pushed["pushed"])
+        self.assertTrue(pushed["verified"])
+
+    def test_verify_push(self):
+        """Count and checksum mismatches and read errors fail verification"""
+        self.assertTrue(verify_push(TABLE_NAME, self.df, self.backend))
+        self.assertFalse(
+            verify_push(TABLE_NAME, self.df.iloc[:3], self.backend)
+        )
+        changed = self.df.copy()
+        changed.loc[2, "validator_version"] = "0.0.1"
+        self.assertFalse(verify_push(TABLE_NAME, changed, self.backend))
+
+        backend = _NoProjectionBackend()
+        backend.write(TABLE_NAME, self.df)
+        self.assertTrue(verify_push(TABLE_NAME, self.df, backend))
+        self.assertFalse(verify_push(TABLE_NAME, self.df, _BrokenBackend()))
+
+
+if __name__ == "__main__":
+    unittest.main()
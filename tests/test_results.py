@@ -0,0 +1,64 @@
+"""Test compact result storage."""
+
+import unittest
+import numpy as np
+from aind_metadata_validator.mappings import RESULT_COLUMNS, STATE_COLUMNS
+from aind_metadata_validator.results import NO_STATE, ResultTable
+from aind_metadata_validator.utils import MetadataState
+
+
+class ResultTableTest(unittest.TestCase):
+    """ResultTable tests."""
+
+    def setUp(self):
+        """Set up result dictionaries"""
+        self.results = [
+            {
+                "_id": f"id{i}",
+                "metadata": MetadataState.VALID,
+                "subject": MetadataState.PRESENT,
+                "subject.subject_id": MetadataState.MISSING,
+                "model": 0,
+                "_last_modified": "2025-01-01",
+                "validator_version": "0.0.0",
+                "location": f"loc{i}",
+            }
+            for i in range(5)
+        ]
+
+    def test_roundtrip(self):
+        """Result dictionaries convert to rows and back"""
+        table = ResultTable.from_results(iter(self.results))
+        self.assertEqual(len(table), 5)
+        self.assertEqual(table.states.dtype, np.int8)
+        self.assertEqual(table.states.shape, (5, len(STATE_COLUMNS)))
+        self.assertEqual(table.to_dicts(), self.results)
+        self.assertIsInstance(table.to_dict(0)["model"], MetadataState)
+
+    def test_missing_and_unknown_values(self):
+        """Missing values are NO_STATE / None, unknown keys are dropped"""
+        table = ResultTable(capacity=0)
+        table.append({"metadata": None, "subject": float("nan"), "x": 1})
+        self.assertTrue((table.states == NO_STATE).all())
+        self.assertEqual(table.to_dict(0), {})
+        self.assertIsNone(table.id_column("_id")[0])
+
+    def test_grows(self):
+        """Rows beyond the initial capacity are added"""
+        table = ResultTable(capacity=2)
+        table.extend(self.results)
+        self.assertEqual(len(table), 5)
+        self.assertEqual(table.to_dicts(), self.results)
+
+    def test_to_dataframe(self):
+        """DataFrames have the result columns with nullable int8 states"""
+        df = ResultTable.from_results(self.results).to_dataframe()
+        self.assertEqual(list(df.columns), RESULT_COLUMNS)
+        self.assertEqual(str(df["metadata"].dtype), "Int8")
+        self.assertEqual(df["subject.subject_id"].tolist(), [-1] * 5)
+        self.assertTrue(df["acquisition"].isna().all())
+        self.assertEqual(df["location"].tolist()[0], "loc0")
+
+
+if __name__ == "__main__":
+    unittest.main()
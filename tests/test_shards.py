@@ -0,0 +1,164 @@
+"""Test sharded runs and merging their results."""
+
+import json
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+from aind_metadata_validator import __version__ as version
+from aind_metadata_validator.shards import (
+    _check_manifests,
+    find_manifests,
+    merge_shards,
+    select_shard,
+    shard_name,
+    write_manifest,
+)
+from aind_metadata_validator.sinks import open_result_sink
+from aind_metadata_validator.sync import (
+    _iter_unique_locations,
+    _open_journal,
+    _write_result_file,
+)
+from tests.test_fetch import FakeClient
+
+RECORDS = [
+    {
+        "_id": f"id{i}",
+        "name": f"name{i}",
+        "location": f"s3://bucket/loc{i}",
+        "_last_modified": "2025-01-02",
+        "subject": {"subject_id": str(i)},
+    }
+    for i in range(12)
+]
+LOCATIONS = [record["location"] for record in RECORDS]
+
+
+def run_shard(folder: str, shard: int, num_shards: int) -> int:
+    """Validate a shard into its own folder, as a capsule would"""
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    with patch("aind_metadata_validator.sync.OUTPUT_FOLDER", folder), patch(
+        "aind_metadata_validator.sync.client", FakeClient(RECORDS)
+    ):
+        journal = _open_journal(False, shard, num_shards)
+        locations = _iter_unique_locations(False, shard, num_shards)
+        path = (
+            folder / f"validation_results.{shard_name(shard, num_shards)}.csv"
+        )
+        rows = _write_result_file(
+            journal, locations, path, "csv", None, {}, True
+        )
+        write_manifest(path, shard, num_shards, rows)
+        journal.remove()
+    return rows
+
+
+class ShardsTest(unittest.TestCase):
+    """Shard tests."""
+
+    def test_select_shard(self):
+        """Shards split the locations into disjoint parts"""
+        shards = [list(select_shard(LOCATIONS, i, 3)) for i in range(3)]
+        self.assertEqual(
+            sorted(location for shard in shards for location in shard),
+            sorted(LOCATIONS),
+        )
+        self.assertEqual(list(select_shard(LOCATIONS, 1, 3)), shards[1])
+        self.assertEqual(list(select_shard(LOCATIONS, 0, 1)), LOCATIONS)
+        self.assertRaises(ValueError, select_shard, LOCATIONS, 3, 3)
+
+    def test_merge_shards_from_processes(self):
+        """Shards run in separate processes merge into the full table"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with ProcessPoolExecutor(max_workers=3) as executor:
+                rows = list(
+                    executor.map(
+                        run_shard,
+                        [f"{tmpdir}/capsule{i}" for i in range(3)],
+                        range(3),
+                        [3] * 3,
+                    )
+                )
+            self.assertEqual(sum(rows), len(RECORDS))
+            manifests = find_manifests(tmpdir)
+            self.assertEqual(len(manifests), 3)
+            self.assertEqual(list(Path(tmpdir).rglob("checkpoint*")), [])
+
+            df = merge_shards(manifests)
+            self.assertEqual(sorted(df["location"]), sorted(LOCATIONS))
+            self.assertEqual(set(df["validator_version"]), {version})
+
+            with self.assertRaisesRegex(ValueError, r"Missing shards: \[1\]"):
+                merge_shards(manifests[:1] + manifests[2:])
+
+            # The same shard run twice, e.g. by two capsules
+            run_shard(f"{tmpdir}/again", 1, 3)
+            with self.assertRaisesRegex(
+                ValueError, r"duplicated shards: \[1\]"
+            ):
+                merge_shards(find_manifests(tmpdir))
+            shutil.rmtree(f"{tmpdir}/again")
+
+            # A partial that lost rows
+            with open(manifests[0]) as f:
+                manifest = json.load(f)
+            manifest["rows"] += 1
+            with open(manifests[0], "w") as f:
+                json.dump(manifest, f)
+            with self.assertRaisesRegex(ValueError, "manifest lists"):
+                merge_shards(manifests)
+
+    def test_merge_detects_overlapping_shards(self):
+        """A location in two shards is reported"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for shard in range(2):
+                path = Path(tmpdir) / f"results.{shard_name(shard, 2)}.csv"
+                with open_result_sink(path) as sink:
+                    sink.write([{"location": "a", "_id": str(shard)}])
+                write_manifest(path, shard, 2, 1)
+            with self.assertRaisesRegex(ValueError, "more than one shard"):
+                merge_shards(find_manifests(tmpdir))
+            with self.assertRaisesRegex(ValueError, "No shard manifests"):
+                merge_shards(find_manifests(Path(tmpdir) / "missing"))
+
+    def test_merge_keeps_records_of_a_location(self):
+        """Several records of a location in one shard are not overlaps"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for shard in range(2):
+                path = Path(tmpdir) / f"results.{shard_name(shard, 2)}.csv"
+                rows = [
+                    {"location": f"s3://{shard}", "_id": f"{shard}{i}"}
+                    for i in range(2)
+                ]
+                with open_result_sink(path) as sink:
+                    sink.write(rows)
+                write_manifest(path, shard, 2, 2)
+            df = merge_shards(find_manifests(tmpdir))
+            self.assertEqual(
+                list(df["location"]), ["s3://0", "s3://0", "s3://1", "s3://1"]
+            )
+
+    def test_check_manifests(self):
+        """Shards of different runs are not merged"""
+        manifest = {"shard": 0, "num_shards": 2, "validator_version": "1"}
+        self.assertRaisesRegex(
+            ValueError,
+            "number of shards",
+            _check_manifests,
+            [manifest, dict(manifest, shard=1, num_shards=3)],
+        )
+        self.assertRaisesRegex(
+            ValueError,
+            "validator versions",
+            _check_manifests,
+            [manifest, dict(manifest, shard=1, validator_version="2")],
+        )
+        _check_manifests([manifest, dict(manifest, shard=1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
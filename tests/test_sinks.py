@@ -0,0 +1,99 @@
+"""Test result sinks."""
+
+import tempfile
+import unittest
+from pathlib import Path
+import pandas as pd
+import pyarrow.parquet as pq
+from aind_metadata_validator.sinks import (
+    ResultSink,
+    open_result_sink,
+    read_results,
+)
+from aind_metadata_validator.mappings import RESULT_COLUMNS
+from aind_metadata_validator.results import ResultTable
+from aind_metadata_validator.utils import MetadataState
+
+
+def _make_result(i: int) -> dict:
+    """Make a result dictionary like validate_metadata returns"""
+    return {
+        "_id": f"id{i}",
+        "metadata": MetadataState.VALID,
+        "subject": MetadataState.PRESENT,
+        "subject.subject_id": MetadataState.MISSING,
+        "model": 0,
+        "unknown_column": "dropped",
+        "_last_modified": "2025-01-01",
+        "validator_version": "0.0.0",
+        "location": f"loc{i}",
+    }
+
+
+class SinkTest(unittest.TestCase):
+    """Result sink tests."""
+
+    def setUp(self):
+        """Make a temporary output folder"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = Path(self.tmp.name)
+
+    def tearDown(self):
+        """Remove the temporary output folder"""
+        self.tmp.cleanup()
+
+    def test_roundtrip(self):
+        """Rows written in several batches are read back in order"""
+        for output_format in ["csv", "parquet"]:
+            path = self.folder / f"results.{output_format}"
+            with open_result_sink(path, output_format) as sink:
+                sink.write([_make_result(0), _make_result(1)])
+                sink.write([])
+                sink.write(ResultTable.from_results([_make_result(2)]))
+            self.assertEqual(sink.rows_written, 3)
+
+            df = read_results(path, output_format)
+            self.assertEqual(list(df.columns), RESULT_COLUMNS)
+            self.assertEqual(list(df["location"]), ["loc0", "loc1", "loc2"])
+            self.assertEqual(list(df["subject"]), [1, 1, 1])
+            self.assertTrue(df["acquisition"].isna().all())
+
+    def test_read_results_dtypes(self):
+        """Both formats are read back with the same dtypes"""
+        result = dict(_make_result(0), validator_version="1.0")
+        frames = {}
+        for output_format in ["csv", "parquet"]:
+            path = self.folder / f"dtypes.{output_format}"
+            with open_result_sink(path, output_format) as sink:
+                sink.write([result, _make_result(1)])
+            frames[output_format] = read_results(path, output_format)
+        pd.testing.assert_frame_equal(frames["csv"], frames["parquet"])
+        self.assertEqual(list(frames["csv"]["validator_version"])[0], "1.0")
+        self.assertEqual(frames["csv"]["acquisition"].dtype, "Int8")
+
+    def test_parquet_row_groups(self):
+        """Each batch is written as its own row group"""
+        path = self.folder / "results.parquet"
+        with open_result_sink(path, "parquet") as sink:
+            sink.write([_make_result(0)])
+            sink.write([_make_result(1)])
+        self.assertEqual(pq.ParquetFile(path).num_row_groups, 2)
+        self.assertEqual(
+            str(pq.read_schema(path).field("metadata").type), "int8"
+        )
+
+    def test_invalid_format(self):
+        """Unknown formats raise a ValueError"""
+        self.assertRaises(
+            ValueError, open_result_sink, self.folder / "results", "xlsx"
+        )
+
+    def test_base_sink(self):
+        """The base sink does not know how to write rows"""
+        sink = ResultSink(self.folder / "results")
+        self.assertRaises(NotImplementedError, sink.write, [_make_result(0)])
+        sink.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
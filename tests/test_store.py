@@ -0,0 +1,107 @@
+"""Test the local result store."""
+
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+from aind_metadata_validator.store import ResultStore
+from aind_metadata_validator.utils import MetadataState
+
+
+class ResultStoreTest(unittest.TestCase):
+    """ResultStore tests."""
+
+    def setUp(self):
+        """Create a store in a temporary directory"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmpdir.name) / "results.sqlite"
+        self.results = [
+            {
+                "_id": f"id{i}",
+                "metadata": MetadataState.VALID,
+                "subject": MetadataState.PRESENT,
+                "subject.subject_id": MetadataState.MISSING,
+                "_last_modified": "2025-01-01",
+                "validator_version": "0.0.0",
+                "location": f"loc{i}",
+            }
+            for i in range(3)
+        ]
+
+    def tearDown(self):
+        """Remove the temporary directory"""
+        self.tmpdir.cleanup()
+
+    def test_put_and_get(self):
+        """Results roundtrip by location and persist across connections"""
+        with ResultStore(self.path) as store:
+            store.put_many(self.results + [{"_id": "no_location"}])
+            self.assertEqual(len(store), 3)
+
+        with ResultStore(self.path) as store:
+            self.assertEqual(store.get("loc1"), self.results[1])
+            self.assertIn("loc1", store)
+            self.assertNotIn("loc9", store)
+            self.assertIsNone(store.get("loc9"))
+            self.assertEqual(list(store.results()), self.results)
+            self.assertEqual(list(store.values()), self.results)
+            mode = store._conn.execute("PRAGMA journal_mode").fetchone()
+            self.assertEqual(mode[0], "wal")
+
+    def test_only_changed_rows_written(self):
+        """Unchanged rows are not rewritten, changed rows are updated"""
+        with ResultStore(self.path) as store:
+            store.put_many(self.results)
+            changes = store._conn.total_changes
+            store.put_many(self.results)
+            self.assertEqual(store._conn.total_changes, changes)
+
+            updated = dict(self.results[0], subject=MetadataState.VALID)
+            store.put_many([updated])
+            self.assertEqual(store._conn.total_changes, changes + 1)
+            self.assertEqual(store.get("loc0"), updated)
+
+    def test_rebuild(self):
+        """Rebuilding replaces the rows, NaN states are dropped"""
+        with ResultStore(self.path) as store:
+            store.put_many(self.results)
+            store.rebuild(
+                [
+                    {
+                        "_id": "id9",
+                        "metadata": 2.0,
+                        "subject": float("nan"),
+                        "_last_modified": "2025-01-02",
+                        "validator_version": "0.0.1",
+                        "location": "loc9",
+                    }
+                ]
+            )
+            self.assertEqual(len(store), 1)
+            self.assertEqual(
+                store.get("loc9"),
+                {
+                    "_id": "id9",
+                    "metadata": MetadataState.VALID,
+                    "_last_modified": "2025-01-02",
+                    "validator_version": "0.0.1",
+                    "location": "loc9",
+                },
+            )
+
+    def test_state_columns_changed(self):
+        """Rows written with other state columns are dropped"""
+        with ResultStore(self.path) as store:
+            store.put_many(self.results)
+        with sqlite3.connect(self.path) as conn:
+            conn.execute(
+                "UPDATE store_info SET value = '[]' "
+                "WHERE key = 'state_columns'"
+            )
+        conn.close()
+        with ResultStore(self.path) as store:
+            self.assertEqual(len(store), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
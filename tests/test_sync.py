@@ -1,25 +1,57 @@
 """Unit tests for the sync module of aind_metadata_validator."""
 
+import json
+import tempfile
 import unittest
+import warnings
+from pathlib import Path
 from unittest.mock import patch
 import pandas as pd
 from aind_metadata_validator import __version__ as version
+from aind_metadata_validator.metadata_validator import validate_metadata
+from aind_metadata_validator.store import ResultStore
+from aind_metadata_validator.utils import MetadataState, ValidationEngine
+from tests.test_fetch import FakeClient
 from aind_metadata_validator.sync import (
-    _fetch_unique_locations,
     _load_prev_validation_map,
     _build_results,
+    _iter_checkpointed_chunks,
+    _iter_result_chunks,
+    _iter_run_locations,
+    _iter_unique_locations,
+    _open_journal,
+    _open_result_store,
+    _write_result_file,
 )
 
 
 class TestSync(unittest.TestCase):
     """Unit tests for the sync module."""
 
-    @patch("aind_metadata_validator.sync.client.aggregate_docdb_records")
-    def test_fetch_unique_locations_test_mode(self, mock_agg):
-        """test_mode=True should truncate the location list to 10."""
-        mock_agg.return_value = [{"locations": list(range(20))}]
-        result = _fetch_unique_locations(test_mode=True)
-        self.assertEqual(len(result), 10)
+    @patch("aind_metadata_validator.sync.LOCATION_PAGE_SIZE", 4)
+    def test_iter_unique_locations_test_mode(self):
+        """test_mode=True should stop streaming locations after 10."""
+        client = FakeClient(
+            records=[{"_id": i, "location": f"loc{i}"} for i in range(20)]
+        )
+        with patch("aind_metadata_validator.sync.client", client):
+            result = list(_iter_unique_locations(test_mode=True))
+        self.assertEqual(result, [f"loc{i}" for i in range(10)])
+        self.assertEqual(client.calls, 3)
+
+    @patch("aind_metadata_validator.sync.LOCATION_PAGE_SIZE", 4)
+    def test_iter_unique_locations_retries(self):
+        """A failed location page is requested again."""
+        client = FakeClient(
+            records=[{"_id": i, "location": f"loc{i}"} for i in range(6)],
+            fail_on_call=2,
+        )
+        with patch("aind_metadata_validator.sync.client", client), patch(
+            "aind_metadata_validator.fetch.time.sleep"
+        ):
+            result = list(_iter_unique_locations(test_mode=False))
+        self.assertEqual(result, [f"loc{i}" for i in range(6)])
+        self.assertEqual(client.calls, 3)
 
     @patch(
         "aind_metadata_validator.sync.custom",
@@ -54,6 +86,483 @@ class TestSync(unittest.TestCase):
         results = _build_results(["loc1"], {"loc1": prev}, force=False)
         self.assertEqual(results, [prev])
 
+    @patch("aind_metadata_validator.sync.client.retrieve_docdb_records")
+    def test_build_results_parallel_matches_serial(self, mock_retrieve):
+        """Validating in a process pool gives the same ordered results."""
+        records = [
+            {
+                "_id": f"id{i}",
+                "name": f"name{i}",
+                "location": f"loc{i}",
+                "_last_modified": "2025-01-01T00:00:00.000Z",
+                "subject": {"subject_id": str(i)},
+            }
+            for i in range(6)
+        ]
+        prev = {
+            "location": "loc2",
+            "_last_modified": "2025-01-01T00:00:00.000Z",
+            "validator_version": version,
+        }
+        mock_retrieve.return_value = records
+        locations = [record["location"] for record in records]
+
+        serial = _build_results(locations, {"loc2": prev}, force=False)
+        parallel = _build_results(
+            locations, {"loc2": prev}, force=False, workers=2
+        )
+        self.assertEqual(serial, parallel)
+        self.assertEqual(
+            [result["location"] for result in parallel], locations
+        )
+        self.assertIs(parallel[2], prev)
+
+    @patch("aind_metadata_validator.sync.client.retrieve_docdb_records")
+    def test_build_results_prefetch(self, mock_retrieve):
+        """Prefetching chunks gives the same results as fetching in turn."""
+        mock_retrieve.side_effect = lambda filter_query, limit: [
+            {
+                "location": location,
+                "_last_modified": "2025-01-01",
+                "validator_version": version,
+            }
+            for location in filter_query["location"]["$in"]
+        ]
+        locations = [f"loc{i}" for i in range(120)]
+        prev_map = {
+            location: {
+                "location": location,
+                "_last_modified": "2025-01-01",
+                "validator_version": version,
+            }
+            for location in locations
+        }
+        serial = _build_results(locations, prev_map, force=False)
+        prefetched = _build_results(
+            locations, prev_map, force=False, prefetch_depth=2
+        )
+        self.assertEqual(serial, prefetched)
+        self.assertEqual(len(prefetched), 120)
+
+    def test_build_results_incremental(self):
+        """Only new or modified records are fetched in full."""
+        records = [
+            {
+                "_id": f"id{i}",
+                "name": f"name{i}",
+                "location": f"loc{i}",
+                "_last_modified": "2025-01-02",
+                "subject": {"subject_id": str(i)},
+            }
+            for i in range(5)
+        ]
+        prev_map = {
+            f"loc{i}": {
+                "location": f"loc{i}",
+                "_last_modified": "2025-01-02" if i != 1 else "2025-01-01",
+                "validator_version": version,
+            }
+            for i in range(4)
+        }
+        fake_client = FakeClient(records=records)
+        locations = [record["location"] for record in records]
+        with patch("aind_metadata_validator.sync.client", fake_client):
+            results = _build_results(
+                locations, prev_map, force=False, incremental=True
+            )
+
+        self.assertEqual(
+            [result["location"] for result in results],
+            ["loc0", "loc2", "loc3", "loc1", "loc4"],
+        )
+        self.assertIs(results[0], prev_map["loc0"])
+        self.assertEqual(results[3]["_last_modified"], "2025-01-02")
+        full_queries = [
+            query for query, projection in fake_client.queries if query
+        ]
+        self.assertEqual(
+            full_queries, [{"location": {"$in": ["loc1", "loc4"]}}]
+        )
+
+    def test_result_store_resume(self):
+        """Results kept in the store are skipped when a run is resumed."""
+        records = [
+            {
+                "_id": f"id{i}",
+                "name": f"name{i}",
+                "location": f"loc{i}",
+                "_last_modified": "2025-01-02",
+                "subject": {"subject_id": str(i)},
+            }
+            for i in range(4)
+        ]
+        remote = {
+            "loc0": {
+                "_id": "id0",
+                "location": "loc0",
+                "_last_modified": "2025-01-02",
+                "validator_version": version,
+            }
+        }
+        locations = [record["location"] for record in records]
+        with tempfile.TemporaryDirectory() as tmpdir, patch(
+            "aind_metadata_validator.sync._load_prev_validation_map",
+            return_value=remote,
+        ), patch(
+            "aind_metadata_validator.sync.client",
+            FakeClient(records=records),
+        ), patch(
+            "aind_metadata_validator.sync.CHUNK_SIZE", 2
+        ):
+            path = Path(tmpdir) / "results.sqlite"
+            with _open_result_store(path) as store:
+                self.assertEqual(store.get("loc0"), remote["loc0"])
+                # Crash after the first chunk has been stored
+                chunks = _iter_result_chunks(locations, store, force=False)
+                store.put_many(next(chunks))
+                chunks.close()
+
+            with patch(
+                "aind_metadata_validator.metadata_validator."
+                "validate_metadata",
+                side_effect=AssertionError("validated again"),
+            ), _open_result_store(path) as store:
+                resumed = _build_results(locations[:2], store, force=False)
+            self.assertEqual(
+                [result["location"] for result in resumed], ["loc0", "loc1"]
+            )
+
+            with _open_result_store(path, rebuild=True) as store:
+                self.assertEqual(len(store), 1)
+
+    def test_checkpoint_resume(self):
+        """A run that failed mid-way resumes from its journal."""
+        records = [
+            {
+                "_id": f"id{i}",
+                "name": f"name{i}",
+                "location": f"loc{i}",
+                "_last_modified": "2025-01-02",
+                "subject": {"subject_id": str(i)},
+            }
+            for i in range(6)
+        ]
+        locations = [record["location"] for record in records]
+        with tempfile.TemporaryDirectory() as tmpdir, patch(
+            "aind_metadata_validator.sync.OUTPUT_FOLDER", Path(tmpdir)
+        ), patch("aind_metadata_validator.sync.CHUNK_SIZE", 2), patch(
+            "aind_metadata_validator.sync.FETCH_RETRIES", 0
+        ):
+            # The second request fails and the run dies
+            failing = FakeClient(records=records, fail_on_call=2)
+            with patch(
+                "aind_metadata_validator.sync.client", failing
+            ), _open_journal(resume=True) as journal:
+                chunks = _iter_checkpointed_chunks(
+                    journal, iter(locations), {}, False, fetch_concurrency=1
+                )
+                first = next(chunks)
+                self.assertRaises(ConnectionError, next, chunks)
+
+            client = FakeClient(records=records)
+            with patch(
+                "aind_metadata_validator.sync.client", client
+            ), _open_journal(resume=True) as journal:
+                self.assertEqual(journal.cursor, "loc1")
+                resumed = [
+                    result
+                    for chunk in _iter_checkpointed_chunks(
+                        journal, iter(locations), {}, False
+                    )
+                    for result in chunk
+                ]
+            self.assertEqual(
+                [result["location"] for result in resumed], locations
+            )
+            self.assertEqual(resumed[:2], first)
+            self.assertEqual(
+                client.queries[0][0],
+                {"location": {"$in": ["loc2", "loc3"]}},
+            )
+
+            # Without resume, a new journal is started
+            with _open_journal(resume=False) as journal:
+                self.assertEqual(journal.chunks, [])
+                self.assertEqual(list(journal.remaining(locations)), locations)
+
+    def test_iter_result_chunks_workers_with_concurrent_fetch(self):
+        """A worker pool starts safely while fetch threads are running."""
+        records = [
+            {
+                "_id": f"id{i}",
+                "name": f"name{i}",
+                "location": f"loc{i}",
+                "_last_modified": "2025-01-02",
+                "subject": {"subject_id": str(i)},
+            }
+            for i in range(12)
+        ]
+        locations = [record["location"] for record in records]
+        results = {}
+        for workers in [1, 2]:
+            client = FakeClient(records=records, delay=0.01)
+            with patch("aind_metadata_validator.sync.client", client), patch(
+                "aind_metadata_validator.sync.CHUNK_SIZE", 2
+            ), warnings.catch_warnings():
+                warnings.simplefilter("error", DeprecationWarning)
+                results[workers] = [
+                    result
+                    for chunk in _iter_result_chunks(
+                        locations,
+                        {},
+                        True,
+                        workers,
+                        prefetch_depth=2,
+                        fetch_concurrency=4,
+                    )
+                    for result in chunk
+                ]
+        self.assertEqual(results[2], results[1])
+        self.assertEqual(
+            [result["location"] for result in results[2]], locations
+        )
+
+    def test_iter_result_chunks_id_range(self):
+        """Listed locations are fetched by location, not by _id range."""
+        records = [
+            {
+                "_id": f"id{i}",
+                "name": f"name{i}",
+                "location": f"loc{i}",
+                "_last_modified": "2025-01-02",
+            }
+            for i in range(6)
+        ]
+        locations = ["loc1", "loc2", "loc4"]
+        client = FakeClient(records=records)
+        with patch("aind_metadata_validator.sync.client", client):
+            results = [
+                result
+                for chunk in _iter_result_chunks(
+                    locations, {}, True, fetch_strategy="id_range"
+                )
+                for result in chunk
+            ]
+        self.assertEqual([result["location"] for result in results], locations)
+        self.assertEqual(client.calls, 1)
+        self.assertEqual(
+            client.queries[0][0], {"location": {"$in": locations}}
+        )
+
+    def test_incremental_id_range_requests(self):
+        """Incremental id_range runs only fetch the stale records."""
+        records = [
+            {
+                "_id": f"id{i:02d}",
+                "name": f"name{i}",
+                "location": f"loc{i}",
+                "_last_modified": "2025-01-02",
+            }
+            for i in range(20)
+        ]
+        prev_map = {
+            record["location"]: dict(record, validator_version=version)
+            for record in records[2:]
+        }
+        client = FakeClient(records=records)
+        with patch("aind_metadata_validator.sync.client", client), patch(
+            "aind_metadata_validator.sync.PAGE_SIZE", 4
+        ):
+            results = [
+                result
+                for chunk in _iter_result_chunks(
+                    None,
+                    prev_map,
+                    False,
+                    incremental=True,
+                    fetch_strategy="id_range",
+                )
+                for result in chunk
+            ]
+        self.assertEqual(len(results), 20)
+        # The _last_modified of every record, then the 2 stale records
+        self.assertEqual(client.calls, 2)
+        full_queries = [
+            query for query, projection in client.queries if projection is None
+        ]
+        self.assertEqual(
+            full_queries, [{"location": {"$in": ["loc0", "loc1"]}}]
+        )
+
+    def test_iter_result_chunks_engine(self):
+        """The engine is passed on to the validator."""
+        with open("./tests/resources/metadata.json") as f:
+            record = json.load(f)
+        record["location"] = "loc0"
+        states = {}
+        for engine in ValidationEngine:
+            client = FakeClient(records=[record])
+            with patch("aind_metadata_validator.sync.client", client):
+                chunks = list(
+                    _iter_result_chunks(["loc0"], {}, True, engine=engine)
+                )
+            states[engine] = chunks[0][0]["data_description.source_data"]
+        self.assertEqual(
+            states,
+            {
+                ValidationEngine.LEGACY: MetadataState.PRESENT,
+                ValidationEngine.SINGLE_PASS: MetadataState.VALID,
+            },
+        )
+
+    def test_iter_result_chunks_core_files(self):
+        """Only the selected core files are fetched and validated, the
+        previous results are kept for the rest."""
+        records = [
+            {
+                "_id": f"id{i}",
+                "name": f"name{i}",
+                "location": f"loc{i}",
+                "_last_modified": "2025-01-02",
+                "subject": {"subject_id": str(i)},
+                "procedures": None,
+                "processing": {"data_processes": ["large"]},
+            }
+            for i in range(2)
+        ]
+        del records[1]["subject"]
+        prev = {
+            "loc0": {
+                "location": "loc0",
+                "_last_modified": "2025-01-02",
+                "validator_version": version,
+                "subject": MetadataState.VALID,
+            }
+        }
+        client = FakeClient(records=records)
+        with patch("aind_metadata_validator.sync.client", client):
+            results = [
+                result
+                for chunk in _iter_result_chunks(
+                    ["loc0", "loc1"],
+                    prev,
+                    True,
+                    incremental=True,
+                    core_files=["procedures"],
+                )
+                for result in chunk
+            ]
+        # The requirement files are only looked up by _id
+        for _, projection in client.queries:
+            self.assertNotIn("subject", projection)
+            self.assertNotIn("processing", projection)
+        self.assertIn("procedures", client.queries[-1][1])
+        self.assertEqual(results[0]["subject"], MetadataState.VALID)
+        self.assertEqual(results[0]["_last_modified"], "2025-01-02")
+        self.assertNotIn("subject", results[1])
+        # Records with a subject require procedures
+        for record, result in zip(records, results):
+            self.assertEqual(
+                result["procedures"],
+                validate_metadata(record)["procedures"],
+            )
+        self.assertNotEqual(results[0]["procedures"], results[1]["procedures"])
+
+    def test_full_id_range_run(self):
+        """Full id_range runs page the records without listing locations."""
+        records = [
+            {
+                "_id": f"id{i}",
+                "name": f"name{i}",
+                "location": f"loc{i}",
+                "_last_modified": "2025-01-02",
+            }
+            for i in range(4)
+        ]
+        locations = [record["location"] for record in records]
+        prev_map = {"loc0": dict(records[0], validator_version=version)}
+        client = FakeClient(records=records)
+        with tempfile.TemporaryDirectory() as tmpdir, patch(
+            "aind_metadata_validator.sync.OUTPUT_FOLDER", Path(tmpdir)
+        ), patch("aind_metadata_validator.sync.client", client):
+            journal = _open_journal(resume=False)
+            self.assertIsNone(
+                _iter_run_locations(journal, False, fetch_strategy="id_range")
+            )
+            self.assertIsNotNone(
+                _iter_run_locations(journal, True, fetch_strategy="id_range")
+            )
+            self.assertIsNotNone(_iter_run_locations(journal, False))
+            results = [
+                result
+                for chunk in _iter_checkpointed_chunks(
+                    journal, None, {}, False, fetch_strategy="id_range"
+                )
+                for result in chunk
+            ]
+            self.assertEqual(
+                [result["location"] for result in results], locations
+            )
+            self.assertEqual(client.calls, 1)
+
+            # A journal with chunks is resumed from the listed locations
+            self.assertIsNotNone(
+                _iter_run_locations(journal, False, fetch_strategy="id_range")
+            )
+            chunks = _iter_checkpointed_chunks(journal, None, {}, False)
+            self.assertRaises(ValueError, next, chunks)
+            journal.remove()
+
+            incremental = [
+                result
+                for chunk in _iter_result_chunks(
+                    None,
+                    prev_map,
+                    False,
+                    incremental=True,
+                    fetch_strategy="id_range",
+                )
+                for result in chunk
+            ]
+        self.assertIs(incremental[0], prev_map["loc0"])
+        self.assertEqual(
+            [result["location"] for result in incremental], locations
+        )
+
+    def test_write_result_file(self):
+        """Results are written to the results file, journal and store."""
+        records = [
+            {
+                "_id": f"id{i}",
+                "name": f"name{i}",
+                "location": f"loc{i}",
+                "_last_modified": "2025-01-02",
+            }
+            for i in range(3)
+        ]
+        with tempfile.TemporaryDirectory() as tmpdir, patch(
+            "aind_metadata_validator.sync.OUTPUT_FOLDER", Path(tmpdir)
+        ), patch("aind_metadata_validator.sync.client", FakeClient(records)):
+            journal = _open_journal(resume=False, shard=0, num_shards=1)
+            self.assertTrue(journal.path.name.startswith("checkpoint.shard"))
+            path = Path(tmpdir) / "results.csv"
+            with ResultStore(Path(tmpdir) / "store.sqlite") as store:
+                rows = _write_result_file(
+                    journal,
+                    _iter_unique_locations(False, shard=0, num_shards=1),
+                    path,
+                    "csv",
+                    store,
+                    {},
+                    True,
+                )
+                self.assertEqual(len(store), 3)
+            self.assertEqual(rows, 3)
+            self.assertEqual(len(pd.read_csv(path)), 3)
+            self.assertEqual(
+                list(journal.remaining(["loc0", "loc3"])), ["loc3"]
+            )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,157 @@
+"""Test stage timing and single record profiling."""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from aind_metadata_validator.metadata_validator import validate_metadata
+from aind_metadata_validator.sync import _build_results, _write_timing_report
+from aind_metadata_validator.timing import (
+    StageTimer,
+    format_report,
+    profile_record,
+    timer,
+)
+from tests.test_fetch import FakeClient
+
+
+class StageTimerTest(unittest.TestCase):
+    """StageTimer tests."""
+
+    def test_disabled(self):
+        """A disabled timer records nothing"""
+        disabled = StageTimer()
+        with disabled.stage("core", "subject"):
+            pass
+        with disabled.record("loc"):
+            pass
+        self.assertEqual(list(disabled.iterate("fetch", [1, 2])), [1, 2])
+        self.assertEqual(
+            disabled.report(), {"stages": {}, "slowest_records": []}
+        )
+
+    def test_stages_and_histogram(self):
+        """Durations are counted per stage and key, also on errors"""
+        enabled = StageTimer(enabled=True)
+        with enabled.stage("core", "subject"):
+            pass
+        with self.assertRaises(ValueError):
+            with enabled.stage("core", "procedures"):
+                raise ValueError
+        enabled.add("core", 0.5)
+        self.assertEqual(list(enabled.iterate("fetch", "ab")), ["a", "b"])
+
+        stages = enabled.report()["stages"]
+        self.assertEqual(stages["core"]["count"], 3)
+        self.assertEqual(stages["core.subject"]["count"], 1)
+        self.assertEqual(stages["core"]["max_s"], 0.5)
+        self.assertEqual(stages["core"]["histogram"]["<1.0s"], 1)
+        self.assertEqual(sum(stages["core"]["histogram"].values()), 3)
+        # One next() per item and one for the end of the iterable
+        self.assertEqual(stages["fetch"]["count"], 3)
+
+    def test_slowest_records(self):
+        """Only the slowest records are kept, slowest first"""
+        enabled = StageTimer(enabled=True, slowest=2)
+        for location, seconds in [("a", 1.0), ("b", 3.0), ("c", 2.0)]:
+            enabled.add_record(location, seconds)
+        with enabled.record("d"):
+            pass
+        report = enabled.report()
+        self.assertEqual(
+            report["slowest_records"],
+            [
+                {"location": "b", "seconds": 3.0},
+                {"location": "c", "seconds": 2.0},
+            ],
+        )
+        self.assertEqual(report["stages"]["record"]["count"], 1)
+        text = format_report(report)
+        self.assertIn("record", text)
+        self.assertIn("slowest records", text)
+
+    def test_take_and_merge(self):
+        """Timings taken from a worker's timer add up in the parent's"""
+        worker = StageTimer(enabled=True)
+        parent = StageTimer(enabled=True, slowest=2)
+        parent.add("core", 0.5)
+        parent.add_record("a", 1.0)
+        worker.add("core", 2.0)
+        worker.add("fetch", 0.01)
+        worker.add_record("b", 3.0)
+        worker.add_record("c", 0.1)
+        parent.merge(worker.take())
+        self.assertEqual(worker.take(), {"stages": {}, "records": []})
+
+        report = parent.report()
+        self.assertEqual(report["stages"]["core"]["count"], 2)
+        self.assertEqual(report["stages"]["core"]["total_s"], 2.5)
+        self.assertEqual(report["stages"]["core"]["min_s"], 0.5)
+        self.assertEqual(report["stages"]["core"]["max_s"], 2.0)
+        self.assertEqual(report["stages"]["core"]["histogram"]["<1.0s"], 1)
+        self.assertEqual(report["stages"]["core"]["histogram"]["<10.0s"], 1)
+        self.assertEqual(report["stages"]["fetch"]["count"], 1)
+        self.assertEqual(
+            [item["location"] for item in report["slowest_records"]],
+            ["b", "a"],
+        )
+
+
+class InstrumentationTest(unittest.TestCase):
+    """Timing of validation and sync stages."""
+
+    def setUp(self):
+        """Enable the process timer"""
+        with open("./tests/resources/metadata.json") as f:
+            self.record = json.load(f)
+        timer.reset()
+        timer.enabled = True
+
+    def tearDown(self):
+        """Disable the process timer"""
+        timer.enabled = False
+        timer.reset()
+
+    def test_validate_metadata_stages(self):
+        """Validation times the full metadata and each core file"""
+        validate_metadata(dict(self.record))
+        validate_metadata(dict(self.record), engine="single_pass")
+        stages = timer.report()["stages"]
+        self.assertEqual(stages["metadata"]["count"], 2)
+        self.assertEqual(stages["core.subject"]["count"], 2)
+        self.assertEqual(stages["fields.subject"]["count"], 1)
+
+    def test_sync_stages_and_report(self):
+        """Fetching, validating and each record are timed and reported"""
+        records = [
+            dict(self.record, location=f"loc{i}", _id=f"id{i}")
+            for i in range(2)
+        ]
+        with patch("aind_metadata_validator.sync.client", FakeClient(records)):
+            _build_results(["loc0", "loc1"], {}, force=True)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "timing_report.json"
+            report = _write_timing_report(path)
+            with open(path) as f:
+                self.assertEqual(json.load(f), report)
+        self.assertEqual(report["stages"]["record"]["count"], 2)
+        self.assertIn("fetch", report["stages"])
+        self.assertIn("validate", report["stages"])
+        self.assertEqual(
+            {item["location"] for item in report["slowest_records"]},
+            {"loc0", "loc1"},
+        )
+
+    def test_profile_record(self):
+        """A record can be validated under cProfile"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output = Path(tmpdir) / "record.prof"
+            stats = profile_record(self.record, str(output), repeat=2)
+            self.assertTrue(output.exists())
+        self.assertGreater(stats.total_calls, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
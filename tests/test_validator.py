@@ -5,11 +5,20 @@ import unittest
 from unittest.mock import patch
 from aind_data_schema.core.metadata import CORE_FILES
 from aind_metadata_validator import __version__ as version
+from aind_metadata_validator.batch import is_current
 from aind_metadata_validator.metadata_validator import (
+    core_file_projection,
+    requirement_files,
     validate_metadata,
+    validate_metadata_json,
     _validate_core_files,
 )
-from aind_metadata_validator.utils import FileRequirement, MetadataState
+from aind_metadata_validator.utils import (
+    FileRequirement,
+    MetadataState,
+    ValidationEngine,
+    result_version,
+)
 
 
 class ValidatorTest(unittest.TestCase):
@@ -172,5 +181,209 @@ class ValidatorTest(unittest.TestCase):
         self.assertNotIn(first_core, results)
 
 
+class SinglePassValidatorTest(unittest.TestCase):
+    """Single pass engine tests."""
+
+    def setUp(self):
+        """Set up the tests"""
+        with open("./tests/resources/metadata.json") as f:
+            self.data = json.load(f)
+
+    def test_single_pass_matches_legacy_core_states(self):
+        """Core file and metadata states agree with the legacy engine."""
+        legacy = validate_metadata(self.data)
+        single = validate_metadata(
+            self.data, engine=ValidationEngine.SINGLE_PASS
+        )
+        self.assertEqual(list(legacy.keys()), list(single.keys()))
+        for key in ["metadata"] + CORE_FILES:
+            self.assertEqual(legacy[key], single[key])
+        # Fields that validate as part of a valid core file are VALID
+        self.assertEqual(
+            single["data_description.source_data"], MetadataState.VALID
+        )
+        self.assertEqual(single["subject.notes"], MetadataState.OPTIONAL)
+
+    def test_single_pass_invalid_field(self):
+        """Errors are mapped back to the field they point into."""
+        self.data["data_description"]["project_name"] = 5
+        self.data["procedures"] = "not a dict"
+        self.data["model"] = {}
+        result = validate_metadata(self.data, engine="single_pass")
+        self.assertEqual(result["data_description"], MetadataState.PRESENT)
+        self.assertEqual(
+            result["data_description.project_name"], MetadataState.PRESENT
+        )
+        self.assertEqual(
+            result["data_description.subject_id"], MetadataState.VALID
+        )
+        self.assertEqual(result["procedures"], MetadataState.PRESENT)
+        self.assertEqual(
+            result["procedures.subject_id"], MetadataState.MISSING
+        )
+        self.assertEqual(result["model"], MetadataState.OPTIONAL)
+        self.assertEqual(result["model.name"], MetadataState.OPTIONAL)
+
+    def test_single_pass_non_pydantic_error(self):
+        """A non-pydantic error falls back to per-field validation."""
+
+        class _BrokenModel:
+            """Model whose validation raises a non-pydantic error."""
+
+            @classmethod
+            def model_validate(cls, data):
+                """Raise an AttributeError"""
+                raise AttributeError("broken validator")
+
+        with patch.dict(
+            "aind_metadata_validator.metadata_validator.FIRST_LAYER_MAPPING",
+            {"subject": _BrokenModel},
+        ):
+            result = validate_metadata(self.data, engine="single_pass")
+        self.assertEqual(result["subject"], MetadataState.PRESENT)
+        self.assertEqual(result["subject.subject_id"], MetadataState.VALID)
+
+
+class CoreFileSelectionTest(unittest.TestCase):
+    """Revalidating a selection of core files."""
+
+    def setUp(self):
+        """Set up the tests"""
+        with open("./tests/resources/metadata.json") as f:
+            self.data = json.load(f)
+        self.full = validate_metadata(self.data)
+
+    def test_selected_core_files_merge_into_previous(self):
+        """Only the selected core files change, the rest is kept"""
+        prev = dict(self.full, metadata=MetadataState.PRESENT)
+        prev["procedures"] = MetadataState.MISSING
+        prev["subject"] = MetadataState.MISSING
+        prev["subject.subject_details"] = MetadataState.MISSING
+        prev["location"] = "s3://bucket/test"
+        projection = core_file_projection(["subject"])
+        data = {key: self.data[key] for key in projection if key in self.data}
+        self.assertNotIn("procedures", data)
+
+        for engine in ValidationEngine:
+            full = validate_metadata(self.data, engine=engine)
+            result = validate_metadata(
+                data, prev, engine=engine, core_files=["subject"]
+            )
+            self.assertEqual(result["subject"], full["subject"])
+            self.assertEqual(
+                result["subject.subject_details"],
+                full["subject.subject_details"],
+            )
+            self.assertEqual(result["procedures"], MetadataState.MISSING)
+            self.assertEqual(result["metadata"], MetadataState.PRESENT)
+            self.assertEqual(result["location"], "s3://bucket/test")
+            self.assertEqual(
+                result["validator_version"], result_version(engine)
+            )
+        # prev is only current for the legacy engine
+        self.assertIsNone(result["_last_modified"])
+        result = validate_metadata(data, prev, core_files=["subject"])
+        self.assertEqual(result["_last_modified"], prev["_last_modified"])
+        self.assertEqual(result["validator_version"], version)
+
+    def test_requirement_files(self):
+        """Requirement files are only fetched when selected, their keys
+        decide the file requirements"""
+        projection = core_file_projection(["procedures"])
+        self.assertNotIn("subject", projection)
+        self.assertNotIn("processing", projection)
+        self.assertEqual(
+            requirement_files(["procedures", "model"]),
+            ["subject", "processing"],
+        )
+        data = {key: self.data[key] for key in projection}
+        for name in requirement_files(["procedures"]):
+            if name in self.data:
+                data[name] = None
+        self.data["procedures"] = None
+        data["procedures"] = None
+        full = validate_metadata(self.data)
+        result = validate_metadata(data, full, core_files=["procedures"])
+        self.assertEqual(result["procedures"], MetadataState.MISSING)
+        self.assertEqual(result, full)
+
+    def test_changed_record_is_not_current(self):
+        """A record changed since its previous results loses its
+        _last_modified, so that a full run revalidates it"""
+        prev = dict(self.full, _last_modified="2020-01-01")
+        result = validate_metadata(self.data, prev, core_files=["model"])
+        self.assertIsNone(result["_last_modified"])
+
+        result = validate_metadata(self.data, core_files=["model"])
+        self.assertIsNone(result["_last_modified"])
+        self.assertNotIn("metadata", result)
+        self.assertNotIn("subject", result)
+        self.assertIn("model", result)
+
+    def test_previous_version_is_not_current(self):
+        """Rows validated by another version or engine are not current
+        once merged, so that the next full run validates them again"""
+        last_modified = self.data["_last_modified"]
+        for prev_version in ["0.0.1", result_version("single_pass")]:
+            prev = dict(self.full, validator_version=prev_version)
+            result = validate_metadata(self.data, prev, core_files=["subject"])
+            self.assertEqual(result["validator_version"], version)
+            self.assertFalse(is_current(result, last_modified))
+            self.assertFalse(is_current(result, last_modified, "single_pass"))
+
+    def test_engine_is_part_of_the_version(self):
+        """Results of one engine are not reused by the other"""
+        single = validate_metadata(self.data, engine="single_pass")
+        self.assertEqual(single["validator_version"], f"{version}+single_pass")
+        self.assertTrue(
+            is_current(single, self.data["_last_modified"], "single_pass")
+        )
+        self.assertFalse(is_current(single, self.data["_last_modified"]))
+        self.assertIsNot(validate_metadata(self.data, single), single)
+        self.assertIs(
+            validate_metadata(self.data, single, engine="single_pass"), single
+        )
+
+    def test_unknown_core_file(self):
+        """Names that are not core files are rejected"""
+        self.assertRaisesRegex(
+            ValueError,
+            "Unknown core files",
+            validate_metadata,
+            self.data,
+            core_files=["subject", "rig"],
+        )
+
+
+class JsonValidatorTest(unittest.TestCase):
+    """Raw JSON entry point tests."""
+
+    def test_validate_metadata_json(self):
+        """Raw JSON gives the same results as the decoded dictionary"""
+        data = {
+            "_id": "test-json-id",
+            "_last_modified": "2025-01-01T00:00:00.000Z",
+            "name": "test",
+            "location": "s3://bucket/test",
+            "subject": {"subject_id": "123"},
+        }
+        raw = json.dumps(data)
+        self.assertEqual(
+            validate_metadata_json(raw.encode()), validate_metadata(data)
+        )
+        self.assertEqual(
+            validate_metadata_json(raw, engine="single_pass"),
+            validate_metadata(data, engine="single_pass"),
+        )
+
+    def test_validate_metadata_json_corrupt(self):
+        """Documents that aren't JSON objects are CORRUPT"""
+        for raw in [b'{"_id": "abc", ', b"[1, 2]"]:
+            result = validate_metadata_json(raw)
+            self.assertEqual(result["metadata"], MetadataState.CORRUPT)
+            for core_file_name in CORE_FILES:
+                self.assertEqual(result[core_file_name], MetadataState.CORRUPT)
+
+
 if __name__ == "__main__":
     unittest.main()